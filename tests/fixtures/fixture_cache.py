@@ -0,0 +1,14 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    from django.core.cache import caches
+    from posts.content_filter import content_filter
+    from posts.groups import group_map
+    for cache in caches.all():
+        cache.clear()
+    # База между тестами очищается без сигналов.
+    group_map.forget()
+    content_filter.forget()
+    yield
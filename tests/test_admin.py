@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.admin import CachedCountPaginator
+from posts.models import Comment, Group, Post
+
+
+@pytest.fixture
+def admin_client(client, django_user_model):
+    django_user_model.objects.create_superuser('admin', password='pass')
+    client.login(username='admin', password='pass')
+    return client
+
+
+def add_content(django_user_model, start, stop):
+    for index in range(start, stop):
+        author = django_user_model.objects.create_user(f'author{index}')
+        group = Group.objects.create(title=f'Группа {index}',
+                                     slug=f'group-{index}', description='')
+        post = Post.objects.create(text=f'Пост {index}', author=author,
+                                   group=group)
+        Comment.objects.create(text=f'Комментарий {index}', author=author,
+                               post=post)
+
+
+class TestAdminChangelists:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('url', ['/admin/posts/post/',
+                                     '/admin/posts/comment/'])
+    def test_queries_do_not_grow_with_rows(self, admin_client,
+                                           django_user_model,
+                                           django_assert_num_queries, url):
+        add_content(django_user_model, 0, 2)
+        admin_client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            assert admin_client.get(url).status_code == HTTPStatus.OK
+        add_content(django_user_model, 2, 7)
+        with django_assert_num_queries(len(context.captured_queries)):
+            response = admin_client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что список в админке не делает запрос на каждую '
+            'строку.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paginator_reuses_cached_count(self, user, post, another_post,
+                                           django_assert_num_queries):
+        queryset = Post.objects.order_by('-pk')
+        with django_assert_num_queries(1):
+            assert CachedCountPaginator(queryset, 10).count == 2
+        with django_assert_num_queries(0):
+            assert CachedCountPaginator(queryset, 10).count == 2, (
+                'Проверьте, что COUNT(*) выборки changelist берётся из кеша.'
+            )
+        with django_assert_num_queries(1):
+            CachedCountPaginator(queryset.filter(author=user), 10).count
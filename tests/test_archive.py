@@ -0,0 +1,78 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts.models import (ArchivedComment, ArchivedPost, Comment, GroupStats,
+                          Post, StoredImage)
+
+
+@pytest.fixture
+def old_post(post_2, comment_1_post):
+    Comment.objects.create(author=post_2.author, post=post_2, text='Старый')
+    Post.objects.filter(pk=post_2.pk).update(
+        pub_date=timezone.now() - timedelta(days=400)
+    )
+    return post_2
+
+
+class TestArchive:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archive_moves_old_posts(self, old_post, post, group_1):
+        call_command('archive_posts', '--days', '365', '--batch-size', '1')
+        assert not Post.objects.filter(pk=old_post.pk).exists(), (
+            'Проверьте, что старые посты уходят из горячей таблицы.'
+        )
+        assert Post.objects.filter(pk=post.pk).exists()
+        assert ArchivedPost.objects.filter(pk=old_post.pk).exists()
+        assert ArchivedComment.objects.filter(post=old_post.pk).count() == 1
+        assert GroupStats.objects.get(group=group_1).posts_count == 1, (
+            'Проверьте, что перенос в архив не меняет статистику группы.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_verified_after_archive(self, old_post, group_1):
+        call_command('archive_posts', '--days', '365')
+        call_command('rebuild_group_stats', '--verify')
+        call_command('rebuild_group_stats')
+        stats = GroupStats.objects.get(group=group_1)
+        assert (stats.posts_count, stats.comments_count) == (1, 1), (
+            'Проверьте, что пересчёт статистики учитывает архив.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archived_post_served_by_id(self, user_client, old_post):
+        data = user_client.get(f'/api/v1/posts/{old_post.id}/').json()
+        call_command('archive_posts')
+        response = user_client.get(f'/api/v1/posts/{old_post.id}/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что архивный пост доступен по id.'
+        )
+        assert response['X-Archived'] == 'true'
+        assert response.json() == data, (
+            'Проверьте, что архивный пост отдаётся в том же виде.'
+        )
+        listed = [item['id'] for item in
+                  user_client.get('/api/v1/posts/').json()]
+        assert old_post.id not in listed, (
+            'Проверьте, что список постов читает только горячие данные.'
+        )
+        comments = user_client.get(f'/api/v1/posts/{old_post.id}/comments/')
+        assert comments.status_code == HTTPStatus.OK
+        assert len(comments.json()) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archive_keeps_image_refs(self, user, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        post = Post.objects.create(text='С картинкой', author=user,
+                                   image='posts/old.png')
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_posts')
+        assert StoredImage.objects.get(name='posts/old.png').refs == 1, (
+            'Проверьте, что архивный пост сохраняет ссылку на картинку.'
+        )
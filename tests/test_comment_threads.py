@@ -0,0 +1,90 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment
+
+
+@pytest.fixture
+def thread(post, user, another_user):
+    """Две ветки: root -> reply -> deep и second."""
+    root = Comment.objects.create(author=user, post=post, text='Корень')
+    reply = Comment.objects.create(author=another_user, post=post,
+                                   parent=root, text='Ответ')
+    deep = Comment.objects.create(author=user, post=post, parent=reply,
+                                  text='Ответ на ответ')
+    second = Comment.objects.create(author=user, post=post, text='Вторая')
+    return root, reply, deep, second
+
+
+class TestCommentThreads:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paths(self, thread):
+        root, reply, deep, second = thread
+        assert deep.depth == 2
+        assert deep.path.startswith(reply.path)
+        assert list(root.subtree().order_by('path')) == [root, reply, deep], (
+            'Проверьте, что поддерево выбирается по материализованному пути.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_tree(self, user_client, post, thread):
+        root, reply, deep, second = thread
+        url = f'/api/v1/posts/{post.id}/comments/tree/'
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get(url, {'page_size': 1})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert data['count'] == 2, (
+            'Проверьте, что дерево постранично разбивается по веткам.'
+        )
+        assert [item['id'] for item in data['results']] == [root.id]
+        assert data['results'][0]['replies'][0]['replies'][0]['id'] == deep.id
+        assert len(context) <= 5, (
+            'Проверьте, что ветка загружается одним запросом.'
+        )
+
+        response = user_client.get(url, {'depth': 1})
+        assert [item['id'] for item in response.json()] == [root.id,
+                                                            second.id]
+        assert response.json()[0]['replies'][0]['replies'] == [], (
+            'Проверьте, что параметр `depth` ограничивает глубину дерева.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_subtree(self, user_client, post, thread):
+        root, reply, deep, second = thread
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/comments/{reply.id}/subtree/'
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['id'] == reply.id
+        assert response.json()['replies'][0]['id'] == deep.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_create_reply(self, user_client, post, another_post, thread,
+                          settings):
+        root = thread[0]
+        url = f'/api/v1/posts/{post.id}/comments/'
+        response = user_client.post(url, data={'text': 'Ответ',
+                                               'parent': root.id})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['depth'] == 1
+
+        response = user_client.post(
+            f'/api/v1/posts/{another_post.id}/comments/',
+            data={'text': 'Ответ', 'parent': root.id}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что нельзя ответить на комментарий другого поста.'
+        )
+
+        settings.COMMENT_MAX_DEPTH = 2
+        response = user_client.post(url, data={'text': 'Глубоко',
+                                               'parent': thread[2].id})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что вложенность ответов ограничена.'
+        )
@@ -0,0 +1,44 @@
+import pytest
+
+from api.compiled import get_plan
+from api.serializers import (CommentSerializer, GroupSerializer,
+                             PostSerializer)
+from posts.models import Comment, Group, Post
+
+
+def as_serializer(serializer_class, queryset):
+    return [dict(item) for item in serializer_class(
+        queryset, many=True, context={}
+    ).data]
+
+
+class TestCompiledReadPath:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('serializer_class, model', [
+        (PostSerializer, Post),
+        (CommentSerializer, Comment),
+        (GroupSerializer, Group),
+    ])
+    def test_matches_serializer(self, serializer_class, model, post,
+                                post_2, another_post, comment_1_post,
+                                comment_2_post):
+        Post.objects.filter(pk=post.pk).update(image='posts/ab/picture.gif')
+        queryset = model.objects.order_by('pk')
+        plan = get_plan(serializer_class)
+        assert plan is not None
+        assert list(plan.serialize(queryset)) == as_serializer(
+            serializer_class, queryset
+        ), (
+            f'Проверьте, что план чтения для {serializer_class.__name__} '
+            'выдаёт то же, что и сериализатор.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_uses_plan(self, user_client, post, another_post,
+                            django_assert_num_queries):
+        with django_assert_num_queries(3):
+            response = user_client.get('/api/v1/posts/')
+        assert response.json()[0]['author'] == post.author.username, (
+            'Проверьте, что список постов собирается без лишних запросов.'
+        )
@@ -0,0 +1,64 @@
+import gzip
+import json
+from http import HTTPStatus
+
+import pytest
+
+from posts.models import Post
+
+
+class TestCompression:
+
+    @pytest.fixture
+    def many_posts(self, user):
+        return Post.objects.bulk_create(
+            Post(text=f'Длинный тестовый пост {i}' * 10, author=user)
+            for i in range(50)
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_large_list_is_gzipped(self, user_client, many_posts):
+        response = user_client.get('/api/v1/posts/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Encoding'] == 'gzip', (
+            'Проверьте, что большой список постов сжимается gzip, если '
+            'клиент его поддерживает.'
+        )
+        assert 'Accept-Encoding' in response['Vary']
+        data = json.loads(gzip.decompress(response.content))
+        assert len(data) == len(many_posts)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_small_body_not_compressed(self, user_client, post):
+        response = user_client.get(f'/api/v1/posts/{post.id}/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что ответы меньше `COMPRESSION_MIN_SIZE` не '
+            'сжимаются.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_identity_when_not_accepted(self, user_client, many_posts):
+        response = user_client.get('/api/v1/posts/',
+                                   HTTP_ACCEPT_ENCODING='gzip;q=0')
+        assert not response.has_header('Content-Encoding')
+
+    def test_streaming_response_is_compressed(self, rf):
+        from django.http import StreamingHttpResponse
+
+        from yatube_api.middleware import CompressionMiddleware
+
+        chunks = [b'{"text": "%d"}' % i * 100 for i in range(10)]
+        middleware = CompressionMiddleware(
+            lambda request: StreamingHttpResponse(
+                iter(chunks), content_type='application/json'
+            )
+        )
+        response = middleware(rf.get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        assert response['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(b''.join(response.streaming_content))
+        assert body == b''.join(chunks), (
+            'Проверьте, что потоковые ответы сжимаются по частям без потери '
+            'данных.'
+        )
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+
+from posts.models import Post
+
+
+class TestOptimisticConcurrency:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_etag_from_version(self, user_client, post):
+        response = user_client.get(f'/api/v1/posts/{post.id}/')
+        assert response['ETag'] == f'"{post.version}"', (
+            'Проверьте, что ответ с постом содержит ETag из его версии.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_if_match_update(self, user_client, post):
+        url = f'/api/v1/posts/{post.id}/'
+        etag = user_client.get(url)['ETag']
+        response = user_client.patch(url, data={'text': 'Первая правка'},
+                                     HTTP_IF_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['version'] == post.version + 1
+        assert response['ETag'] != etag
+
+        response = user_client.patch(url, data={'text': 'Вторая правка'},
+                                     HTTP_IF_MATCH=etag)
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED, (
+            'Проверьте, что обновление с устаревшим If-Match возвращает 412.'
+        )
+        assert Post.objects.get(pk=post.pk).text == 'Первая правка', (
+            'Проверьте, что обновление с устаревшим If-Match не применяется.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_if_match_invalidates_list_cache(self, user_client, post):
+        user_client.get('/api/v1/posts/')
+        user_client.put(f'/api/v1/posts/{post.id}/', data={'text': 'Новое'},
+                        HTTP_IF_MATCH=f'"{post.version}"')
+        assert user_client.get('/api/v1/posts/').json()[0]['text'] == (
+            'Новое'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_if_match(self, user_client, post, comment_1_post):
+        url = f'/api/v1/posts/{post.id}/comments/{comment_1_post.id}/'
+        response = user_client.patch(url, data={'text': 'Правка'},
+                                     HTTP_IF_MATCH='"100"')
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        response = user_client.patch(url, data={'text': 'Правка'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['version'] == comment_1_post.version + 1, (
+            'Проверьте, что сохранение комментария увеличивает версию.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unconditional_saves_get_distinct_versions(self, post):
+        first = Post.objects.get(pk=post.pk)
+        second = Post.objects.get(pk=post.pk)
+        first.text = 'Первая правка'
+        first.save()
+        second.text = 'Вторая правка'
+        second.save(update_fields=['text'])
+        assert (first.version, second.version) == (2, 3), (
+            'Проверьте, что версия увеличивается в базе, а не по копии '
+            'объекта в памяти.'
+        )
+        assert Post.objects.get(pk=post.pk).version == 3
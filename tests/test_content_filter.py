@@ -0,0 +1,141 @@
+import random
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+
+from posts.content_filter import (FLAG, REJECT, VERSION_NAME, Automaton,
+                                  ContentFilter, content_filter)
+from posts.models import BannedPhrase, ContentFlag, VersionStamp
+
+
+class TestContentFilter:
+
+    def test_automaton_matches_naive(self):
+        rng = random.Random(1)
+        phrases = {''.join(rng.choices('abc', k=rng.randint(1, 4)))
+                   for _ in range(50)}
+        automaton = Automaton(sorted(phrases))
+        for _ in range(20):
+            text = ''.join(rng.choices('abcd', k=200))
+            found = {automaton.phrases[index]
+                     for index, _ in automaton.finditer(text)}
+            assert found == {phrase for phrase in phrases if phrase in text}, (
+                'Проверьте, что автомат находит те же фразы, что и перебор.'
+            )
+
+    def test_normalization_and_words(self):
+        content_filter = ContentFilter([('Плохое  Слово', REJECT),
+                                        ('спам', FLAG)])
+        assert content_filter.check('Это ПЛОХОЕ слово!')[REJECT] == {
+            'плохое слово'
+        }
+        assert not content_filter.matches('антиспамовый фильтр'), (
+            'Проверьте, что по умолчанию ищутся только целые слова.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_shared_version(self, monkeypatch, settings):
+        content_filter.get()
+        builds = []
+        build = type(content_filter).build
+        monkeypatch.setattr(type(content_filter), 'build',
+                            lambda self: builds.append(1) or build(self))
+        for alias in caches:
+            caches[alias].clear()
+        content_filter.get()
+        assert not builds, (
+            'Проверьте, что очистка или вытеснение кеша не пересобирает '
+            'фильтр.'
+        )
+        # Другой процесс: фраза без сигналов этого процесса и новая метка.
+        BannedPhrase.objects.bulk_create([BannedPhrase(phrase='чужая')])
+        VersionStamp.bump(VERSION_NAME)
+        assert not content_filter.check('это чужая фраза')[REJECT], (
+            'Проверьте, что метка версии сверяется с базой не на каждом '
+            'обращении.'
+        )
+        settings.VERSION_STAMP_CHECK_SECONDS = 0
+        assert content_filter.check('это чужая фраза')[REJECT], (
+            'Проверьте, что фильтр пересобирается по метке версии, общей '
+            'для всех процессов.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_text_checked_once_per_save(self, user_client, monkeypatch):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        BannedPhrase.objects.create(phrase='реклама', action=FLAG)
+        user_client.post('/api/v1/posts/', data={'text': 'Прогрев'})
+        checks = []
+        check = ContentFilter.check
+        monkeypatch.setattr(ContentFilter, 'check',
+                            lambda self, text: checks.append(text)
+                            or check(self, text))
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post('/api/v1/posts/',
+                                        data={'text': 'Тут реклама'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert checks == ['Тут реклама'], (
+            'Проверьте, что текст проверяется фильтром один раз за '
+            'сохранение.'
+        )
+        assert not [query for query in context.captured_queries
+                    if 'posts_versionstamp' in query['sql']], (
+            'Проверьте, что метка версии фильтра не читается на каждой '
+            'записи.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unchanged_text_not_flagged_again(self, user_client, post,
+                                              group_1, group_2):
+        BannedPhrase.objects.create(phrase='реклама', action=FLAG)
+        url = f'/api/v1/posts/{post.id}/'
+        user_client.patch(url, data={'text': 'Тут реклама'})
+        for group in (group_1, group_2, group_1):
+            response = user_client.patch(url, data={'group': group.id})
+            assert response.status_code == HTTPStatus.OK
+        assert ContentFlag.objects.filter(post=post).count() == 1, (
+            'Проверьте, что пост отмечается снова только при правке текста.'
+        )
+        user_client.patch(url, data={'text': 'Снова реклама'})
+        assert ContentFlag.objects.filter(post=post).count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reject_post(self, user_client, post):
+        BannedPhrase.objects.create(phrase='запретная фраза')
+        response = user_client.post('/api/v1/posts/', data={
+            'text': 'Здесь Запретная фраза.'
+        })
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что пост с запрещённой фразой отклоняется.'
+        )
+        assert 'text' in response.json()
+        response = user_client.post(
+            f'/api/v1/posts/{post.id}/comments/',
+            data={'text': 'запретная фраза'}
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        BannedPhrase.objects.filter(phrase='запретная фраза').delete()
+        response = user_client.post('/api/v1/posts/', data={
+            'text': 'Здесь запретная фраза.'
+        })
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что фильтр пересобирается при изменении списка.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_flag_comment(self, user_client, post):
+        BannedPhrase.objects.create(phrase='реклама', action=FLAG)
+        response = user_client.post(
+            f'/api/v1/posts/{post.id}/comments/',
+            data={'text': 'Тут реклама'}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        flag = ContentFlag.objects.get()
+        assert flag.comment_id == response.json()['id']
+        assert flag.phrases == ['реклама'], (
+            'Проверьте, что отмеченные фразы сохраняются для модерации.'
+        )
@@ -0,0 +1,99 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+from django.db.models import F
+
+from api import fragments
+from posts.models import Post
+
+
+class TestFragmentCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_fills_fragment_cache(self, user_client, post, another_post):
+        response = user_client.get('/api/v1/posts/')
+        assert response.status_code == HTTPStatus.OK
+        cached = fragments.get_fragments(Post, {
+            post.id: post.version, another_post.id: another_post.version
+        })
+        assert set(cached) == {post.id, another_post.id}, (
+            'Проверьте, что GET-запрос к `/api/v1/posts/` сохраняет '
+            'сериализованные посты в кеш фрагментов.'
+        )
+        assert response.json() == user_client.get('/api/v1/posts/').json(), (
+            'Проверьте, что ответ, собранный из кеша фрагментов, совпадает '
+            'с исходным.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_invalidated_on_save(self, user_client, post):
+        user_client.get('/api/v1/posts/')
+        post.text = 'Изменённый текст'
+        post.save()
+        test_data = user_client.get('/api/v1/posts/').json()
+        assert test_data[0]['text'] == post.text, (
+            'Проверьте, что сохранение поста сбрасывает его фрагмент в кеше.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_invalidated_on_username_change(self, user_client, user,
+                                                     post, comment_1_post):
+        user_client.get('/api/v1/posts/')
+        user_client.get(f'/api/v1/posts/{post.id}/comments/')
+        user.username = 'RenamedUser'
+        user.save()
+        posts = user_client.get('/api/v1/posts/').json()
+        comments = user_client.get(f'/api/v1/posts/{post.id}/comments/').json()
+        assert posts[0]['author'] == 'RenamedUser', (
+            'Проверьте, что смена `username` автора сбрасывает фрагменты '
+            'его постов.'
+        )
+        assert comments[0]['author'] == 'RenamedUser', (
+            'Проверьте, что смена `username` автора сбрасывает фрагменты '
+            'его комментариев.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_url_is_absolute(self, user_client, post):
+        first = user_client.get('/api/v1/posts/').json()[0]
+        second = user_client.get('/api/v1/posts/').json()[0]
+        detail = user_client.get(f'/api/v1/posts/{post.id}/').json()
+        assert first['image'] == second['image'] == detail['image'], (
+            'Проверьте, что ссылка на картинку в списке совпадает со ссылкой '
+            'в ответе для отдельного поста.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_key_follows_version(self, user_client, post):
+        user_client.get('/api/v1/posts/')
+        # Обновление запросом не шлёт сигналов, но меняет версию.
+        Post.objects.filter(pk=post.pk).update(
+            text='Текст без сигналов', version=F('version') + 1
+        )
+        test_data = user_client.get('/api/v1/posts/').json()
+        assert test_data[0]['text'] == 'Текст без сигналов', (
+            'Проверьте, что ключ фрагмента содержит версию объекта.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_dropped_after_commit(self, user_client, post):
+        user_client.get('/api/v1/posts/')
+        with transaction.atomic():
+            post.text = 'Изменённый текст'
+            post.save()
+            assert fragments.get_fragments(Post, {post.pk: 1}), (
+                'Проверьте, что фрагмент сбрасывается после фиксации '
+                'транзакции, а не внутри неё.'
+            )
+        assert not fragments.get_fragments(Post, {post.pk: 1})
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fragment_invalidated_on_group_delete(self, user_client, group_1,
+                                                  post_2):
+        assert user_client.get('/api/v1/posts/').json()[0]['group']
+        group_1.delete()
+        test_data = user_client.get('/api/v1/posts/').json()
+        assert test_data[0]['group'] is None, (
+            'Проверьте, что удаление группы сбрасывает фрагменты её постов.'
+        )
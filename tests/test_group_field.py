@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+
+from posts.groups import VERSION_NAME, group_map
+from posts.models import Group, Post, VersionStamp
+
+
+class TestWritableGroup:
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('by', ['slug', 'id'])
+    def test_create_in_group(self, user_client, group_1, by):
+        value = getattr(group_1, by)
+        user_client.post('/api/v1/posts/', data={'text': 'Прогрев',
+                                                 'group': value})
+        response = user_client.post('/api/v1/posts/', data={
+            'text': 'Пост в группе', 'group': value
+        })
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['group'] == group_1.title
+        post = Post.objects.get(pk=response.json()['id'])
+        assert post.group_id == group_1.id, (
+            'Проверьте, что группу поста можно указать по slug или id.'
+        )
+        assert Group.objects.get(pk=group_1.pk).description == (
+            group_1.description
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_group_query(self, user_client, group_1):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        user_client.post('/api/v1/posts/', data={'text': 'Прогрев',
+                                                 'group': group_1.slug})
+        with CaptureQueriesContext(connection) as context:
+            user_client.post('/api/v1/posts/', data={
+                'text': 'Пост', 'group': group_1.slug
+            })
+        assert not [
+            query for query in context.captured_queries
+            if 'FROM "posts_group"' in query['sql']
+            or 'FROM "posts_versionstamp"' in query['sql']
+        ], 'Проверьте, что slug группы разбирается без запроса к базе.'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_update_and_errors(self, user_client, post, group_1, group_2):
+        url = f'/api/v1/posts/{post.id}/'
+        response = user_client.patch(url, data={'group': group_2.slug})
+        assert response.json()['group'] == group_2.title
+        response = user_client.patch(url, data={'group': 'missing'},
+                                     format='json')
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+        group_3 = Group.objects.create(title='Новая', slug='new',
+                                       description='Описание')
+        response = user_client.patch(url, data={'group': 'new'})
+        assert response.json()['group'] == group_3.title, (
+            'Проверьте, что новая группа доступна сразу после создания.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_by_slug(self, user_client, group_1):
+        response = user_client.get(f'/api/v1/groups/{group_1.slug}/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['id'] == group_1.id
+        response = user_client.get(f'/api/v1/groups/{group_1.slug}/stats/')
+        assert response.status_code == HTTPStatus.OK
+
+    @pytest.mark.django_db(transaction=True)
+    def test_numeric_slug_before_id(self, user_client, group_1, group_2):
+        numeric = Group.objects.create(title='Числовая', slug=str(group_1.id))
+        response = user_client.get(f'/api/v1/groups/{group_1.id}/')
+        assert response.json()['id'] == numeric.id, (
+            'Проверьте, что группа с числовым slug не скрывается за группой '
+            'с таким же id.'
+        )
+        response = user_client.get(f'/api/v1/groups/{group_2.id}/')
+        assert response.json()['id'] == group_2.id
+        assert group_map.resolve(group_1.id) == numeric
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_posts_image_url(self, user_client, group_1, post):
+        Post.objects.filter(pk=post.pk).update(group=group_1,
+                                               image='posts/image.png')
+        response = user_client.get(f'/api/v1/groups/{group_1.id}/posts/')
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()[0]['image'].startswith('http'), (
+            'Проверьте, что ссылки на картинки в постах группы абсолютные.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalidated_by_another_process(self, group_1, settings,
+                                            django_assert_num_queries):
+        assert group_map.resolve(group_1.slug) == group_1
+        # Другой процесс: строки без сигналов этого процесса и смена метки.
+        Group.objects.bulk_create([Group(title='Чужая', slug='remote',
+                                         description='')])
+        VersionStamp.bump(VERSION_NAME)
+        with django_assert_num_queries(0):
+            assert group_map.resolve('remote') is None, (
+                'Проверьте, что метка версии сверяется с базой не на '
+                'каждом обращении.'
+            )
+        settings.VERSION_STAMP_CHECK_SECONDS = 0
+        assert group_map.resolve('remote') is not None, (
+            'Проверьте, что карта групп перечитывается по метке версии, '
+            'общей для всех процессов.'
+        )
+        settings.VERSION_STAMP_CHECK_SECONDS = 60
+        for alias in caches:
+            caches[alias].clear()
+        with django_assert_num_queries(0):
+            group_map.resolve('remote')
@@ -0,0 +1,140 @@
+from http import HTTPStatus
+from importlib import import_module
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+
+from posts import stats as group_stats
+from posts.models import Comment, GroupAuthorActivity, GroupStats, Post
+
+
+class TestGroupStats:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_endpoint(self, user_client, user, another_user, group_1,
+                            post_2):
+        Comment.objects.create(author=another_user, post=post_2, text='К1')
+        Comment.objects.create(author=user, post=post_2, text='К2')
+        response = user_client.get(f'/api/v1/groups/{group_1.id}/stats/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `/api/v1/groups/{id}/stats/` возвращает 200.'
+        )
+        test_data = response.json()
+        assert test_data['posts_count'] == 1
+        assert test_data['comments_count'] == 2
+        assert test_data['authors_count'] == 2, (
+            'Проверьте, что статистика группы считает активных авторов.'
+        )
+        assert test_data['last_activity']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_follow_deletes(self, user, another_user, group_1, post_2):
+        comment = Comment.objects.create(author=another_user, post=post_2,
+                                         text='К1')
+        comment.delete()
+        stats = GroupStats.objects.get(group=group_1)
+        assert (stats.comments_count, stats.authors_count) == (0, 1)
+        post_2.delete()
+        stats.refresh_from_db()
+        assert (stats.posts_count, stats.authors_count) == (0, 0), (
+            'Проверьте, что удаление поста обновляет статистику группы.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_change_and_rebuild(self, user, group_1, group_2, post_2):
+        Comment.objects.create(author=user, post=post_2, text='К1')
+        post_2.group = group_2
+        post_2.save()
+        assert GroupStats.objects.get(group=group_1).posts_count == 0
+        assert GroupStats.objects.get(group=group_2).comments_count == 1
+
+        GroupStats.objects.filter(group=group_2).update(posts_count=10)
+        with pytest.raises(Exception):
+            call_command('rebuild_group_stats', '--verify')
+        call_command('rebuild_group_stats')
+        call_command('rebuild_group_stats', '--verify')
+        assert GroupStats.objects.get(group=group_2).posts_count == 1, (
+            'Проверьте, что команда `rebuild_group_stats` пересчитывает '
+            'агрегаты.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_of_empty_group(self, user_client, group_1):
+        response = user_client.get(f'/api/v1/groups/{group_1.id}/stats/')
+        assert response.json()['posts_count'] == 0
+        assert not Post.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_stats_follow_user_delete(self, user, another_user, group_1,
+                                      post_2):
+        another_post = Post.objects.create(author=another_user, text='П2',
+                                           group=group_1)
+        Comment.objects.create(author=user, post=another_post, text='К1')
+        Comment.objects.create(author=another_user, post=post_2, text='К2')
+        user.delete()
+        stats = GroupStats.objects.get(group=group_1)
+        assert (stats.posts_count, stats.comments_count,
+                stats.authors_count) == (1, 0, 1), (
+            'Проверьте, что удаление пользователя вычитает его посты, '
+            'комментарии и его самого из статистики групп.'
+        )
+        call_command('rebuild_group_stats', '--verify')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_change_applies_deltas(self, user_client, user,
+                                         another_user, group_1, group_2,
+                                         post_2, monkeypatch):
+        Comment.objects.create(author=another_user, post=post_2, text='К1')
+        Comment.objects.create(author=user, post=post_2, text='К2')
+
+        def rebuild(*args, **kwargs):
+            raise AssertionError('Полный пересчёт при смене группы.')
+
+        monkeypatch.setattr(group_stats, 'rebuild', rebuild)
+        response = user_client.patch(f'/api/v1/posts/{post_2.id}/',
+                                     data={'group': group_2.id})
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что смена группы поста переносит агрегаты без '
+            'полного пересчёта.'
+        )
+        moved = GroupStats.objects.get(group=group_2)
+        assert (moved.posts_count, moved.comments_count,
+                moved.authors_count) == (1, 2, 2)
+        assert group_stats.verify() == {}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_with_drifted_stats(self, user_client, user, group_1,
+                                       post_2):
+        # Комментарии до появления статистики: в обход сигналов.
+        Comment.objects.bulk_create([
+            Comment(author=user, post=post_2, text=f'Старый {number}')
+            for number in range(2)
+        ])
+        response = user_client.post(f'/api/v1/posts/{post_2.id}/comments/',
+                                    data={'text': 'Новый'})
+        assert response.status_code == HTTPStatus.CREATED
+        for comment in Comment.objects.filter(text__startswith='Старый'):
+            response = user_client.delete(
+                f'/api/v1/posts/{post_2.id}/comments/{comment.id}/'
+            )
+            assert response.status_code == HTTPStatus.NO_CONTENT, (
+                'Проверьте, что расхождение статистики не ломает удаление.'
+            )
+        assert Comment.objects.filter(post=post_2).count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_migration_backfills_stats(self, user, another_user, group_1,
+                                       post_2):
+        Comment.objects.create(author=another_user, post=post_2, text='К1')
+        GroupStats.objects.all().delete()
+        GroupAuthorActivity.objects.all().delete()
+        migration = import_module('posts.migrations.0006_group_stats')
+        migration.fill_group_stats(apps, None)
+        stats = GroupStats.objects.get(group=group_1)
+        assert (stats.posts_count, stats.comments_count,
+                stats.authors_count) == (1, 1, 2), (
+            'Проверьте, что миграция заполняет статистику существующих '
+            'групп.'
+        )
+        assert group_stats.verify() == {}
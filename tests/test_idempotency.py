@@ -0,0 +1,133 @@
+import io
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+from posts.models import Comment, IdempotencyKey, Post
+
+
+def make_image(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (10, 10), color).save(buffer, format='BMP')
+    buffer.seek(0)
+    buffer.name = 'image.bmp'
+    return buffer
+
+
+class TestIdempotency:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_returns_original_post(self, user_client):
+        data = {'text': 'Пост с повтором'}
+        first = user_client.post('/api/v1/posts/', data=data, format='json',
+                                 HTTP_IDEMPOTENCY_KEY='key-1')
+        second = user_client.post('/api/v1/posts/', data=data, format='json',
+                                  HTTP_IDEMPOTENCY_KEY='key-1')
+        assert first.status_code == second.status_code == HTTPStatus.CREATED
+        assert first.json() == second.json(), (
+            'Проверьте, что повтор запроса с тем же `Idempotency-Key` '
+            'возвращает исходный ответ.'
+        )
+        assert second['Idempotent-Replayed'] == 'true'
+        assert Post.objects.count() == 1, (
+            'Проверьте, что повтор запроса не создаёт дубликат поста.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_key_reused_with_other_payload(self, user_client):
+        user_client.post('/api/v1/posts/', data={'text': 'Первый'},
+                         format='json', HTTP_IDEMPOTENCY_KEY='key-2')
+        response = user_client.post('/api/v1/posts/', data={'text': 'Второй'},
+                                    format='json',
+                                    HTTP_IDEMPOTENCY_KEY='key-2')
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert Post.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_retry(self, user_client, post):
+        url = f'/api/v1/posts/{post.id}/comments/'
+        for _ in range(2):
+            response = user_client.post(url, data={'text': 'Коммент'},
+                                        HTTP_IDEMPOTENCY_KEY='key-3')
+            assert response.status_code == HTTPStatus.CREATED
+        assert Comment.objects.count() == 1, (
+            'Проверьте, что повтор создания комментария не создаёт дубликат.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_without_key_creates_each_time(self, user_client):
+        for _ in range(2):
+            user_client.post('/api/v1/posts/', data={'text': 'Пост'})
+        assert Post.objects.count() == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_retry_survives_cache_loss(self, user_client):
+        data = {'text': 'Пост'}
+        user_client.post('/api/v1/posts/', data=data, format='json',
+                         HTTP_IDEMPOTENCY_KEY='key-4')
+        # Другой процесс или перезапуск: локальных кешей нет.
+        for cache in caches.all():
+            cache.clear()
+        response = user_client.post('/api/v1/posts/', data=data,
+                                    format='json',
+                                    HTTP_IDEMPOTENCY_KEY='key-4')
+        assert response['Idempotent-Replayed'] == 'true'
+        assert Post.objects.count() == 1, (
+            'Проверьте, что ключи идемпотентности хранятся в базе.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_multipart_fingerprint_uses_content(self, user_client,
+                                                settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        for color, expected in (('red', HTTPStatus.CREATED),
+                                ('blue', HTTPStatus.UNPROCESSABLE_ENTITY)):
+            response = user_client.post(
+                '/api/v1/posts/', format='multipart',
+                data={'text': 'Пост', 'image': make_image(color=color)},
+                HTTP_IDEMPOTENCY_KEY='key-5'
+            )
+            assert response.status_code == expected, (
+                'Проверьте, что другой файл того же размера не считается '
+                'повтором запроса.'
+            )
+        assert Post.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_in_flight_and_abandoned_keys(self, settings, user,
+                                          user_client):
+        settings.IDEMPOTENCY_LOCK_TIMEOUT = 0.2
+        claim = IdempotencyKey.objects.create(
+            user=user, key='key-6', path='/api/v1/posts/', fingerprint=''
+        )
+        response = user_client.post('/api/v1/posts/', data={'text': 'Пост'},
+                                    format='json',
+                                    HTTP_IDEMPOTENCY_KEY='key-6')
+        assert response.status_code == HTTPStatus.CONFLICT
+        IdempotencyKey.objects.filter(pk=claim.pk).update(
+            created=timezone.now() - timedelta(seconds=1)
+        )
+        response = user_client.post('/api/v1/posts/', data={'text': 'Пост'},
+                                    format='json',
+                                    HTTP_IDEMPOTENCY_KEY='key-6')
+        assert response.status_code == HTTPStatus.CREATED, (
+            'Проверьте, что брошенный незавершённый ключ можно занять снова.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_expired_keys(self, settings, user_client):
+        user_client.post('/api/v1/posts/', data={'text': 'Пост'},
+                         format='json', HTTP_IDEMPOTENCY_KEY='key-7')
+        IdempotencyKey.objects.update(
+            created=timezone.now() - timedelta(
+                seconds=settings.IDEMPOTENCY_TTL + 1
+            )
+        )
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        assert not IdempotencyKey.objects.exists()
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+from django.utils import timezone
+
+from posts import importer
+from posts.models import (Comment, Group, GroupStats, ImportCheckpoint,
+                          Post, PostActivityBucket, StoredImage)
+
+
+@pytest.fixture
+def sources(tmp_path, user):
+    groups = tmp_path / 'groups.csv'
+    groups.write_text('title,slug,description\nИмпорт,import,Описание\n')
+    posts = tmp_path / 'posts.ndjson'
+    posts.write_text('\n'.join(json.dumps({
+        'id': 100 + number, 'text': f'Пост {number}',
+        'pub_date': '2020-01-01T10:00:00', 'author': user.username,
+        'group': 'import' if number % 2 else '',
+    }) for number in range(5)))
+    comments = tmp_path / 'comments.csv'
+    comments.write_text('post,author,text,created\n' + ''.join(
+        f'{100 + number},newcomer,Комментарий,2020-01-02T10:00:00\n'
+        for number in range(5)
+    ))
+    return {'groups': str(groups), 'posts': str(posts),
+            'comments': str(comments)}
+
+
+class TestImport:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import(self, sources, tmp_path):
+        from posts.importer import secondary_indexes
+
+        indexes = secondary_indexes(Post)
+        assert ('post_author_pub_date_idx', ['author', '-pub_date']) in indexes
+        call_command('import_yatube', batch_size=2, create_users=True,
+                     defer_indexes=True, checkpoint='import', **sources)
+        group = Group.objects.get(slug='import')
+        assert Post.objects.count() == 5
+        assert Post.objects.get(pk=101).group == group
+        assert Post.objects.get(pk=100).pub_date.year == 2020, (
+            'Проверьте, что импорт сохраняет дату публикации из источника.'
+        )
+        assert Comment.objects.filter(author__username='newcomer').count() == 5
+        stats = GroupStats.objects.get(group=group)
+        assert (stats.posts_count, stats.comments_count) == (2, 2), (
+            'Проверьте, что после импорта пересчитывается статистика групп.'
+        )
+        assert sorted(secondary_indexes(Post)) == sorted(indexes), (
+            'Проверьте, что отложенные индексы создаются после импорта '
+            'с прежним порядком полей.'
+        )
+        assert ImportCheckpoint.objects.get(name='import').state['done'] == {
+            'groups': 1, 'posts': 5, 'comments': 5
+        }
+
+    @pytest.mark.django_db(transaction=True)
+    def test_resume(self, sources):
+        ImportCheckpoint.objects.create(name='import', state={
+            'done': {'groups': 0, 'posts': 3, 'comments': 0}, 'dropped': []
+        })
+        call_command('import_yatube', posts=sources['posts'],
+                     groups=sources['groups'], checkpoint='import')
+        assert set(Post.objects.values_list('pk', flat=True)) == {103, 104}, (
+            'Проверьте, что импорт продолжается с контрольной точки.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_resume_after_failure(self, user, tmp_path, monkeypatch):
+        posts = tmp_path / 'posts.ndjson'
+        posts.write_text('\n'.join(json.dumps({
+            'id': 100 + number, 'text': f'Пост {number}',
+            'author': user.username, 'image': 'posts/shared.jpg',
+        }) for number in range(4)))
+        created = timezone.now().isoformat()
+        comments = tmp_path / 'comments.csv'
+        comments.write_text('post,author,text,created\n' + ''.join(
+            f'{100 + number % 2},{user.username},Комментарий,{created}\n'
+            for number in range(6)
+        ))
+        build_comments = importer.Importer.build_comments
+        calls = []
+
+        def failing(self, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('соединение разорвано')
+            build_comments(self, rows)
+
+        monkeypatch.setattr(importer.Importer, 'build_comments', failing)
+        with pytest.raises(RuntimeError):
+            call_command('import_yatube', posts=str(posts),
+                         comments=str(comments), batch_size=2,
+                         checkpoint='import')
+        monkeypatch.setattr(importer.Importer, 'build_comments',
+                            build_comments)
+        call_command('import_yatube', posts=str(posts),
+                     comments=str(comments), batch_size=2,
+                     checkpoint='import')
+        assert Comment.objects.count() == 6
+        assert StoredImage.objects.get(name='posts/shared.jpg').refs == 4, (
+            'Проверьте, что ссылки на картинки учитываются и после '
+            'продолжения импорта.'
+        )
+        assert PostActivityBucket.objects.aggregate(
+            total=Sum('comments')
+        )['total'] == 6, (
+            'Проверьте, что почасовые счётчики комментариев не теряются '
+            'при продолжении импорта.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unknown_user(self, sources):
+        from django.core.management.base import CommandError
+
+        with pytest.raises(CommandError):
+            call_command('import_yatube', comments=sources['comments'])
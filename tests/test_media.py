@@ -0,0 +1,106 @@
+from http import HTTPStatus
+
+import pytest
+
+from posts.models import Post
+
+IMAGE = b'\x89PNG' + bytes(range(256)) * 4
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    (tmp_path / 'posts').mkdir()
+    (tmp_path / 'posts' / 'image.png').write_bytes(IMAGE)
+    (tmp_path / 'posts' / 'orphan.png').write_bytes(IMAGE)
+    return tmp_path
+
+
+@pytest.fixture
+def image_post(user, media_root):
+    return Post.objects.create(text='Пост с картинкой', author=user,
+                               image='posts/image.png')
+
+
+class TestMediaAPI:
+    URL = '/media/posts/image.png'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_requires_auth(self, client, image_post):
+        response = client.get(self.URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что картинки постов недоступны неавторизованным '
+            'пользователям.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_full_file(self, user_client, image_post):
+        response = user_client.get(self.URL, HTTP_ACCEPT='image/*')
+        assert response.status_code == HTTPStatus.OK
+        assert b''.join(response.streaming_content) == IMAGE
+        assert response['Content-Type'] == 'image/png'
+        assert response['Accept-Ranges'] == 'bytes'
+        assert response['ETag'].startswith('"'), (
+            'Проверьте, что картинки отдаются с сильным ETag.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_not_modified(self, user_client, image_post):
+        etag = user_client.get(self.URL)['ETag']
+        response = user_client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('header,start,end', (
+        ('bytes=0-9', 0, 9),
+        ('bytes=100-', 100, len(IMAGE) - 1),
+        ('bytes=-16', len(IMAGE) - 16, len(IMAGE) - 1),
+    ))
+    def test_media_range(self, user_client, image_post, header, start, end):
+        response = user_client.get(self.URL, HTTP_RANGE=header)
+        assert response.status_code == HTTPStatus.PARTIAL_CONTENT, (
+            'Проверьте, что запрос с заголовком Range возвращает 206.'
+        )
+        assert b''.join(response.streaming_content) == IMAGE[start:end + 1]
+        assert response['Content-Range'] == (
+            f'bytes {start}-{end}/{len(IMAGE)}'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_range_not_satisfiable(self, user_client, image_post):
+        response = user_client.get(self.URL, HTTP_RANGE='bytes=5000-')
+        assert response.status_code == HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('header', ['bytes=-10', 'bytes=0-', 'bytes=0-0'])
+    def test_media_empty_file_range(self, user_client, user, media_root,
+                                    header):
+        (media_root / 'posts' / 'empty.png').write_bytes(b'')
+        Post.objects.create(text='Пустая картинка', author=user,
+                            image='posts/empty.png')
+        response = user_client.get('/media/posts/empty.png',
+                                   HTTP_RANGE=header)
+        assert response.status_code == 416, (
+            'Проверьте, что диапазон в пустом файле не удовлетворяется.'
+        )
+        assert response['Content-Range'] == 'bytes */0'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_unreferenced_file(self, user_client, image_post):
+        response = user_client.get('/media/posts/orphan.png')
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            'Проверьте, что отдаются только файлы, привязанные к постам.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_media_accel_redirect(self, settings, user_client, image_post):
+        settings.MEDIA_ACCEL_BACKEND = 'x-accel-redirect'
+        response = user_client.get(self.URL)
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Accel-Redirect'] == (
+            '/protected-media/posts/image.png'
+        ), (
+            'Проверьте, что при `MEDIA_ACCEL_BACKEND` передача файла '
+            'делегируется прокси.'
+        )
+        assert not response.content
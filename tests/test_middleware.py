@@ -0,0 +1,36 @@
+from http import HTTPStatus
+
+import pytest
+
+
+class TestRouteMiddleware:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_api_skips_site_middleware(self, user_client, post):
+        response = user_client.get('/api/v1/posts/')
+        assert response.status_code == HTTPStatus.OK
+        assert 'X-Frame-Options' not in response, (
+            'Проверьте, что запросы к `/api/` не проходят через middleware '
+            'админки.'
+        )
+        assert not response.cookies, (
+            'Проверьте, что запросы к `/api/` не создают сессию и CSRF-куки.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_uses_full_stack(self, client, django_user_model,
+                                   post_2, comment_1_post):
+        response = client.get('/admin/login/')
+        assert response.status_code == HTTPStatus.OK
+        assert response['X-Frame-Options'] == 'DENY', (
+            'Проверьте, что для админки подключён полный стек middleware.'
+        )
+        django_user_model.objects.create_superuser('admin', password='pass')
+        assert client.login(username='admin', password='pass')
+        for url in ('/admin/posts/post/', '/admin/posts/comment/',
+                    '/admin/posts/group/'):
+            response = client.get(url)
+            assert response.status_code == HTTPStatus.OK, (
+                'Проверьте, что админка работает с сессией и '
+                'аутентификацией.'
+            )
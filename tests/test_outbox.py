@@ -0,0 +1,123 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.utils import timezone
+
+from posts import outbox
+from posts.archive import archive_batch
+from posts.models import OutboxEvent, Post
+
+
+class FailingSink:
+
+    def send(self, messages):
+        raise ConnectionError
+
+
+class ListSink:
+
+    def __init__(self):
+        self.messages = []
+
+    def send(self, messages):
+        self.messages.extend(messages)
+
+
+class TestOutbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_events_written(self, user_client, post):
+        response = user_client.post('/api/v1/posts/', data={'text': 'Новый'})
+        new_id = response.json()['id']
+        user_client.patch(f'/api/v1/posts/{new_id}/', data={'text': 'Правка'})
+        user_client.delete(f'/api/v1/posts/{new_id}/')
+        events = list(OutboxEvent.objects.filter(
+            aggregate_type='post', aggregate_id=new_id
+        ).values_list('event_type', flat=True).order_by('pk'))
+        assert events == ['created', 'updated', 'deleted'], (
+            'Проверьте, что изменения поста записываются в outbox.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_with_write(self, user, monkeypatch):
+        from api import signals
+
+        def fail(*args, **kwargs):
+            raise RuntimeError
+        monkeypatch.setattr(signals.stats, 'post_created', fail)
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(text='Текст', author=user)
+        assert not OutboxEvent.objects.exists(), (
+            'Проверьте, что событие пишется в транзакции изменения.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dispatch(self, post, comment_1_post, tmp_path):
+        path = tmp_path / 'events.jsonl'
+        call_command('dispatch_outbox', sink=f'file:{path}', once=True)
+        messages = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [(message['aggregate'], message['type'])
+                for message in messages] == [('post', 'created'),
+                                             ('comment', 'created')]
+        assert not OutboxEvent.objects.filter(dispatched_at=None).exists()
+        assert outbox.metrics()['pending'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dispatch_publishes_metrics(self, post, tmp_path, caplog):
+        with caplog.at_level('INFO', logger='posts.outbox'):
+            call_command('dispatch_outbox', sink=f'file:{tmp_path / "e"}',
+                         once=True)
+        published = [json.loads(record.message) for record in caplog.records
+                     if record.name == 'posts.outbox']
+        assert published and published[0]['delivered'] == 1, (
+            'Проверьте, что метрики обработчика пишутся в журнал, а не в '
+            'локальный кеш процесса.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dispatch_requires_sink(self, post, settings):
+        settings.OUTBOX_SINK = None
+        with pytest.raises(CommandError):
+            call_command('dispatch_outbox', once=True)
+        with pytest.raises(CommandError):
+            call_command('dispatch_outbox', sink='queue', once=True)
+        assert OutboxEvent.objects.filter(dispatched_at=None).exists(), (
+            'Проверьте, что без получателя события никуда не пишутся.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_batch_retried(self, post):
+        with pytest.raises(ConnectionError):
+            outbox.dispatch_batch(FailingSink())
+        event = OutboxEvent.objects.get()
+        assert event.dispatched_at is None
+        assert event.attempts == 1, (
+            'Проверьте, что неудачная попытка доставки учитывается.'
+        )
+        sink = ListSink()
+        assert outbox.dispatch_batch(sink) == 1
+        assert sink.messages[0]['aggregate_id'] == post.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_aggregate_order(self, post, another_post):
+        first = OutboxEvent.objects.order_by('pk').first()
+        post.text = 'Правка'
+        post.save()
+        # Первое событие поста как будто забрал другой обработчик.
+        events = list(OutboxEvent.objects.exclude(pk=first.pk))
+        assert outbox.blocked_aggregates(events) == {('post', post.id)}, (
+            'Проверьте, что события агрегата не обгоняют более ранние.'
+        )
+        assert outbox.dispatch_batch(ListSink()) == 3
+
+    @pytest.mark.django_db(transaction=True)
+    def test_archiving_skipped(self, post):
+        OutboxEvent.objects.all().delete()
+        archive_batch(timezone.now() + timedelta(days=1), 10)
+        assert not OutboxEvent.objects.exists(), (
+            'Проверьте, что перенос в архив не порождает событий удаления.'
+        )
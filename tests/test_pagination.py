@@ -0,0 +1,97 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+
+from posts.models import Post
+
+
+class TestCachedCountPagination:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_list_without_page_size_is_not_paginated(self, user_client,
+                                                     post):
+        response = user_client.get('/api/v1/posts/')
+        assert isinstance(response.json(), list)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paginated_posts(self, user_client, post, another_post):
+        response = user_client.get('/api/v1/posts/?page_size=1')
+        assert response.status_code == HTTPStatus.OK
+        test_data = response.json()
+        assert test_data['count'] == 2, (
+            'Проверьте, что постраничный ответ `/api/v1/posts/` содержит '
+            'количество постов.'
+        )
+        assert len(test_data['results']) == 1
+        assert test_data['next']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_large_count_served_from_cache(self, settings, user_client,
+                                           post, another_post):
+        settings.EXACT_COUNT_THRESHOLD = 0
+        user_client.get('/api/v1/posts/?page_size=1')
+        Post.objects.create(text='Ещё пост', author=post.author)
+        test_data = user_client.get('/api/v1/posts/?page_size=1').json()
+        assert test_data['count'] == 3, (
+            'Проверьте, что счётчик постов поддерживается при создании поста.'
+        )
+        assert test_data['approximate']
+        Post.objects.bulk_create([Post(text='Мимо счётчика',
+                                       author=post.author)])
+        assert user_client.get(
+            '/api/v1/posts/?page_size=1'
+        ).json()['count'] == 3, (
+            'Проверьте, что количество берётся из кеша без COUNT(*).'
+        )
+        test_data = user_client.get(
+            '/api/v1/posts/?page_size=1&exact_count=1'
+        ).json()
+        assert test_data['count'] == 4, (
+            'Проверьте, что параметр `exact_count` возвращает точное '
+            'количество.'
+        )
+        assert not test_data['approximate']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paginated_comments(self, user_client, post, comment_1_post,
+                                comment_2_post):
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/comments/?page_size=1&page=2'
+        )
+        test_data = response.json()
+        assert test_data['count'] == 2
+        assert test_data['results'][0]['id'] == comment_2_post.id
+
+    @pytest.mark.django_db(transaction=True)
+    def test_paginated_group_posts(self, settings, user_client, user,
+                                   group_1, post, post_2):
+        settings.EXACT_COUNT_THRESHOLD = 0
+        newer = Post.objects.create(text='Новый пост в группе', author=user,
+                                    group=group_1)
+        url = f'/api/v1/groups/{group_1.slug}/posts/?page_size=1'
+        test_data = user_client.get(url).json()
+        assert test_data['count'] == 2, (
+            'Проверьте, что `/api/v1/groups/{id}/posts/` выдаёт только '
+            'посты группы.'
+        )
+        assert test_data['results'][0]['id'] == newer.id
+        Post.objects.create(text='Ещё пост', author=user, group=group_1)
+        assert user_client.get(url).json()['count'] == 3, (
+            'Проверьте, что счётчик постов группы поддерживается сигналами.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rollback_keeps_cached_count(self, settings, user_client, post,
+                                         another_post):
+        settings.EXACT_COUNT_THRESHOLD = 0
+        user_client.get('/api/v1/posts/?page_size=1')
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Post.objects.create(text='Откатится', author=post.author)
+                raise RuntimeError
+        assert user_client.get(
+            '/api/v1/posts/?page_size=1'
+        ).json()['count'] == 2, (
+            'Проверьте, что откат транзакции не меняет счётчик в кеше.'
+        )
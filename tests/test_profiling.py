@@ -0,0 +1,70 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def profile_dir(settings, tmp_path):
+    settings.PROFILE_DIR = tmp_path
+    return tmp_path
+
+
+class TestProfiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_staff_header(self, user, user_client, post, profile_dir):
+        user.is_staff = True
+        user.save()
+        response = user_client.get('/api/v1/posts/', HTTP_X_PROFILE='1',
+                                   HTTP_X_REQUEST_ID='req-1')
+        assert response.status_code == HTTPStatus.OK
+        key = response['X-Profile-Id']
+        assert (profile_dir / f'{key}.prof').exists()
+        meta = json.loads((profile_dir / f'{key}.json').read_text())
+        assert meta['request_id'] == 'req-1', (
+            'Проверьте, что в профиле сохраняется идентификатор запроса.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_request_id_does_not_name_files(self, client, post,
+                                            profile_dir, settings):
+        settings.PROFILE_SAMPLE_RATE = 1
+        first = client.get('/api/v1/posts/')['X-Profile-Id']
+        second = client.get('/api/v1/posts/', HTTP_X_REQUEST_ID=first)
+        assert second['X-Profile-Id'] != first, (
+            'Проверьте, что имя профиля генерирует сервер, а не клиент.'
+        )
+        assert len(list(profile_dir.glob('*.json'))) == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_not_staff(self, user_client, post, profile_dir):
+        response = user_client.get('/api/v1/posts/', HTTP_X_PROFILE='1')
+        assert 'X-Profile-Id' not in response, (
+            'Проверьте, что запросы обычных пользователей не профилируются.'
+        )
+        assert not list(profile_dir.iterdir())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sampling(self, client, post, profile_dir, settings):
+        settings.PROFILE_SAMPLE_RATE = 1
+        response = client.get('/api/v1/posts/')
+        assert 'X-Profile-Id' in response, (
+            'Проверьте, что запросы профилируются с `PROFILE_SAMPLE_RATE`.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_pages(self, admin_client, client, post, profile_dir,
+                         settings):
+        settings.PROFILE_SAMPLE_RATE = 1
+        key = client.get('/api/v1/posts/')['X-Profile-Id']
+        settings.PROFILE_SAMPLE_RATE = 0
+        response = admin_client.get('/admin/profiles/')
+        assert response.status_code == HTTPStatus.OK
+        assert key in response.content.decode()
+        response = admin_client.get(f'/admin/profiles/{key}.prof')
+        assert response.status_code == HTTPStatus.OK
+        response = client.get(f'/admin/profiles/{key}.prof')
+        assert response.status_code == HTTPStatus.FOUND, (
+            'Проверьте, что профили доступны только в админке.'
+        )
@@ -0,0 +1,154 @@
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api import tokens
+from posts.models import RevokedToken
+
+
+def bearer_client(access):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+    return client
+
+
+class TestSignedTokens:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_obtain_and_use(self, client, user, password, post):
+        response = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        })
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert 'access' in data and 'refresh' in data, (
+            'Проверьте, что `/api/v1/token/` выдаёт access и refresh.'
+        )
+        api = bearer_client(data['access'])
+        response = api.post('/api/v1/posts/', data={'text': 'Через токен'})
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username
+        response = api.patch(f'/api/v1/posts/{post.id}/',
+                             data={'text': 'Правка'})
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что автор с подписанным токеном может править пост.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_authentication_without_queries(self, client, user, password):
+        access = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        }).json()['access']
+        from api.authentication import SignedTokenAuthentication
+        from rest_framework.test import APIRequestFactory
+
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {access}'
+        )
+        with CaptureQueriesContext(connection) as context:
+            request_user, _ = SignedTokenAuthentication().authenticate(
+                request
+            )
+        assert len(context) == 0, (
+            'Проверьте, что проверка подписанного токена не обращается к БД.'
+        )
+        assert request_user == user
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_token(self, post):
+        response = bearer_client('bad-token').get('/api/v1/posts/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_and_revoke(self, client, user, password):
+        tokens = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        }).json()
+        response = client.post('/api/v1/token/refresh/',
+                               data={'refresh': tokens['refresh']})
+        assert response.status_code == HTTPStatus.OK
+        fresh = response.json()
+        response = client.post('/api/v1/token/refresh/',
+                               data={'refresh': tokens['refresh']})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что использованный refresh-токен нельзя применить '
+            'повторно.'
+        )
+
+        api = bearer_client(fresh['access'])
+        response = api.post('/api/v1/token/revoke/',
+                            data={'refresh': fresh['refresh']})
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        response = api.post('/api/v1/posts/', data={'text': 'Текст'})
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что отозванный access-токен отклоняется.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_expired_token(self, client, user, password, settings):
+        access = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        }).json()['access']
+        settings.SIGNED_TOKEN_ACCESS_TTL = -1
+        response = bearer_client(access).get('/api/v1/posts/')
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что просроченный access-токен отклоняется.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_refresh_revocation_survives_cache_eviction(self, client,
+                                                        user, password):
+        pair = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        }).json()
+        api = bearer_client(pair['access'])
+        response = api.post('/api/v1/token/revoke/',
+                            data={'refresh': pair['refresh']})
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        for alias in caches:
+            caches[alias].clear()
+        response = client.post('/api/v1/token/refresh/',
+                               data={'refresh': pair['refresh']})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что отозванные refresh-токены не хранятся в '
+            'вытесняемом локальном кеше.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_refresh_issues_one_pair(self, client, user,
+                                                password, monkeypatch):
+        refresh = client.post('/api/v1/token/', data={
+            'username': user.username, 'password': password
+        }).json()['refresh']
+        verify_refresh = tokens.verify_refresh
+
+        def racing_verify(token):
+            # Другой запрос обменял тот же токен сразу после проверки.
+            payload = verify_refresh(token)
+            assert tokens.deny(payload, tokens.REFRESH_SALT)
+            return payload
+
+        monkeypatch.setattr(tokens, 'verify_refresh', racing_verify)
+        response = client.post('/api/v1/token/refresh/',
+                               data={'refresh': refresh})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что обмен refresh-токена атомарен и второй '
+            'одновременный обмен не получает новую пару.'
+        )
+        assert 'access' not in response.json()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_revoked_tokens(self, settings):
+        settings.SIGNED_TOKEN_REFRESH_TTL = -1
+        tokens.deny({'jti': 'old'}, tokens.REFRESH_SALT)
+        settings.SIGNED_TOKEN_REFRESH_TTL = 60
+        tokens.deny({'jti': 'fresh'}, tokens.REFRESH_SALT)
+        call_command('purge_revoked_tokens')
+        assert list(RevokedToken.objects.values_list('jti', flat=True)) == [
+            'fresh'
+        ], 'Проверьте, что удаляются только записи об истёкших токенах.'
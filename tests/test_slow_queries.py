@@ -0,0 +1,67 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from yatube_api.querylog import fingerprint, normalize
+
+
+@pytest.fixture
+def slow_log(settings, tmp_path):
+    settings.SLOW_QUERY_THRESHOLD_MS = 0
+    settings.SLOW_QUERY_LOG_PATH = tmp_path / 'slow.log'
+    return settings.SLOW_QUERY_LOG_PATH
+
+
+def read_entries(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestSlowQueryLog:
+
+    def test_fingerprint(self):
+        first = "SELECT * FROM posts_post WHERE id IN (1, 2) AND text = 'a'"
+        second = "SELECT *  FROM posts_post WHERE id IN (7) AND text = 'b'"
+        assert normalize(first) == (
+            'SELECT * FROM posts_post WHERE id IN (...) AND text = ?'
+        )
+        assert fingerprint(first) == fingerprint(second), (
+            'Проверьте, что запросы с разными литералами имеют один отпечаток.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_logs_view_action_and_plan(self, user_client, post, slow_log):
+        user_client.get(f'/api/v1/posts/{post.id}/comments/')
+        entries = read_entries(slow_log)
+        comments = [
+            entry for entry in entries
+            if 'FROM "posts_comment"' in entry['sql']
+        ]
+        assert comments, (
+            'Проверьте, что запросы дольше порога попадают в журнал.'
+        )
+        entry = comments[0]
+        assert entry['view'] == 'api.views.CommentViewSet'
+        assert entry['action'] == 'list'
+        assert entry['plan'], (
+            'Проверьте, что для SELECT сохраняется план выполнения.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_threshold(self, user_client, post, slow_log, settings):
+        settings.SLOW_QUERY_THRESHOLD_MS = 10 ** 6
+        user_client.get('/api/v1/posts/')
+        assert not slow_log.exists(), (
+            'Проверьте, что быстрые запросы не попадают в журнал.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_command(self, user_client, post, slow_log, capsys):
+        user_client.get(f'/api/v1/posts/{post.id}/')
+        user_client.get(f'/api/v1/posts/{post.id}/')
+        call_command('slow_queries', path=slow_log)
+        output = capsys.readouterr().out
+        assert 'api.views.PostViewSet.retrieve' in output
+        assert '2 раз' in output, (
+            'Проверьте, что команда группирует запросы по отпечатку.'
+        )
@@ -0,0 +1,86 @@
+import json
+import subprocess
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from api import fragments
+from posts.models import Post
+from yatube_api import startup
+
+
+class TestWarmup:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warmup_runs_all_stages(self, post, another_post):
+        timings = startup.warmup()
+        assert list(timings) == [name for name, _ in startup.WARMUP_STEPS], (
+            'Проверьте, что `warmup()` возвращает время каждого этапа.'
+        )
+        cached = fragments.get_fragments(Post, {
+            post.id: post.version, another_post.id: another_post.version
+        })
+        assert set(cached) == {post.id, another_post.id}, (
+            'Проверьте, что прогрев заполняет кеш фрагментов постов.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_warmup_is_read_only(self, monkeypatch, post):
+        closed = []
+        monkeypatch.setattr(connections, 'close_all',
+                            lambda: closed.append(True))
+        with CaptureQueriesContext(connection) as queries:
+            startup.warmup()
+        writes = [query['sql'] for query in queries.captured_queries
+                  if not query['sql'].startswith('SELECT')]
+        assert writes == [], (
+            'Проверьте, что прогрев при старте ничего не пишет в базу.'
+        )
+        assert closed, (
+            'Проверьте, что `warmup()` закрывает открытые им соединения, '
+            'чтобы они не наследовались форкнутыми воркерами.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_failed_stage_does_not_stop_warmup(self, monkeypatch):
+        calls = []
+
+        def broken():
+            raise RuntimeError('нет соединения')
+
+        monkeypatch.setattr(startup, 'WARMUP_STEPS', (
+            ('broken', broken), ('next', lambda: calls.append('next')),
+        ))
+        timings = startup.warmup()
+        assert set(timings) == {'broken', 'next'}
+        assert calls == ['next'], (
+            'Проверьте, что ошибка одного этапа прогрева не прерывает '
+            'остальные.'
+        )
+
+
+class TestProfileStartup:
+
+    def test_command_prints_report(self, monkeypatch):
+        report = {
+            'apps': {'posts': {'import': 0.001, 'models': 0.002,
+                               'ready': 0.0}},
+            'stages': {'setup': 0.05, 'urls': 0.01},
+        }
+
+        def run(args, **kwargs):
+            assert args[1:] == ['-m', 'yatube_api.startup']
+            return subprocess.CompletedProcess(args, 0, json.dumps(report),
+                                               '')
+
+        monkeypatch.setattr(subprocess, 'run', run)
+        out = StringIO()
+        call_command('profile_startup', stdout=out)
+        output = out.getvalue()
+        assert 'posts' in output and '2.0ms' in output, (
+            'Проверьте, что `profile_startup` выводит время по приложениям.'
+        )
+        assert 'urls' in output and '50.0ms' in output
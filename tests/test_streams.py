@@ -0,0 +1,116 @@
+import json
+from http import HTTPStatus
+
+import pytest
+
+from api import streams
+from posts.models import Comment, Post
+
+
+@pytest.fixture
+def sse_settings(settings):
+    settings.SSE_HEARTBEAT = 0.05
+    settings.SSE_MAX_DURATION = 0
+    return settings
+
+
+def read_events(response):
+    return [
+        chunk.decode() if isinstance(chunk, bytes) else chunk
+        for chunk in response.streaming_content
+    ]
+
+
+class TestEventStreams:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_resume_from_last_event_id(self, user_client, post,
+                                       comment_1_post, comment_2_post,
+                                       sse_settings):
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/comments/stream/',
+            HTTP_LAST_EVENT_ID=str(comment_1_post.id),
+            HTTP_ACCEPT='text/event-stream',
+            HTTP_ACCEPT_ENCODING='gzip',
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response['Content-Type'].startswith('text/event-stream')
+        assert not response.has_header('Content-Encoding'), (
+            'Проверьте, что поток событий не сжимается.'
+        )
+        events = read_events(response)
+        assert events[0].startswith('retry:')
+        assert events[1].startswith(f'id: {comment_2_post.id}\n'), (
+            'Проверьте, что после Last-Event-ID догружаются пропущенные '
+            'комментарии.'
+        )
+        data = json.loads(events[1].split('data: ', 1)[1])
+        assert data['text'] == comment_2_post.text
+        assert len(events) == 2
+
+    @pytest.mark.django_db(transaction=True)
+    def test_live_comments(self, user_client, user, post, sse_settings):
+        sse_settings.SSE_MAX_DURATION = 10
+        response = user_client.get(
+            f'/api/v1/posts/{post.id}/comments/stream/'
+        )
+        stream = iter(response.streaming_content)
+        assert next(stream).startswith(b'retry:')
+        comment = Comment.objects.create(author=user, post=post,
+                                         text='Свежий')
+        assert next(stream).startswith(f'id: {comment.id}\n'.encode()), (
+            'Проверьте, что новые комментарии приходят подписчикам.'
+        )
+        assert next(stream) == b': heartbeat\n\n'
+        response.close()
+        channel = streams.post_comments_channel(post.id)
+        assert not streams.get_broker().has_subscribers(channel), (
+            'Проверьте, что отключившийся клиент снимается с подписки.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_stream(self, user_client, user, group_1, sse_settings):
+        post = Post.objects.create(text='В группе', author=user,
+                                   group=group_1)
+        response = user_client.get(
+            f'/api/v1/groups/{group_1.id}/stream/',
+            {'last_event_id': 0}
+        )
+        assert read_events(response)[1].startswith(f'id: {post.id}\n')
+        response = user_client.get('/api/v1/groups/999/stream/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.django_db(transaction=True)
+    def test_outbox_broker(self, user, post, sse_settings):
+        broker = streams.OutboxBroker()
+        channel = streams.post_comments_channel(post.id)
+        with streams.LocalBroker.subscribe(broker, channel) as subscription:
+            comment = Comment.objects.create(author=user, post=post,
+                                             text='Из outbox')
+            broker.poll_once(0)
+            pk, data = subscription.queue.get_nowait()
+        assert pk == comment.id, (
+            'Проверьте, что OutboxBroker раздаёт события из outbox.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_outbox_broker_skips_events_without_subscribers(
+            self, user, post, sse_settings):
+        broker = streams.OutboxBroker()
+        channel = streams.post_comments_channel(post.id)
+        Comment.objects.create(author=user, post=post, text='Без зрителей')
+        last_id = broker.poll_step(0)
+        assert last_id == broker.latest_id(), (
+            'Проверьте, что без подписчиков OutboxBroker сдвигает позицию '
+            'в outbox до последнего события.'
+        )
+        with streams.LocalBroker.subscribe(broker, channel) as subscription:
+            comment = Comment.objects.create(author=user, post=post,
+                                             text='Новый')
+            broker.poll_step(last_id)
+            events = [subscription.queue.get_nowait()
+                      for _ in range(subscription.queue.qsize())]
+        assert [pk for pk, _ in events] == [comment.id], (
+            'Проверьте, что подписчик не получает события, накопившиеся '
+            'в outbox до подписки.'
+        )
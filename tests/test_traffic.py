@@ -0,0 +1,109 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def traffic_log(settings, tmp_path):
+    settings.TRAFFIC_RECORD_PATH = tmp_path / 'traffic.log'
+    return settings.TRAFFIC_RECORD_PATH
+
+
+class TestTrafficReplay:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_record(self, user_client, post, traffic_log):
+        user_client.get('/api/v1/posts/')
+        user_client.post(f'/api/v1/posts/{post.id}/comments/',
+                         data={'text': 'Секретный комментарий'})
+        entries = [json.loads(line)
+                   for line in traffic_log.read_text().splitlines()]
+        assert [entry['route'] for entry in entries] == [
+            'posts-list', 'comments-list'
+        ]
+        assert entries[1]['kwargs'] == {'post_id': str(post.id)}
+        assert entries[1]['request_size'] > 0
+        assert 'Секретный' not in traffic_log.read_text(), (
+            'Проверьте, что содержимое запросов не записывается.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_record_hides_usernames(self, user, user_client, traffic_log):
+        user_client.get(f'/api/v1/users/{user.username}/')
+        user_client.get(f'/api/v1/users/{user.username}/')
+        first, second = [json.loads(line)['kwargs']
+                         for line in traffic_log.read_text().splitlines()]
+        assert user.username not in traffic_log.read_text(), (
+            'Проверьте, что имена пользователей не попадают в запись.'
+        )
+        assert first == second
+
+    @pytest.mark.django_db(transaction=True)
+    def test_replay(self, user, user_client, post, traffic_log, settings,
+                    capsys):
+        user_client.get('/api/v1/posts/')
+        user_client.get(f'/api/v1/posts/{post.id}/')
+        user_client.post('/api/v1/posts/', data={'text': 'Новый пост'})
+        settings.TRAFFIC_RECORD_PATH = None
+        call_command('replay_traffic', str(traffic_log), speedup=0,
+                     concurrency=2, username=user.username, json=True)
+        summary = json.loads(capsys.readouterr().out)
+        assert set(summary) == {'posts-list', 'posts-detail'}
+        assert summary['posts-list']['requests'] == 2
+        assert summary['posts-list']['error_rate'] == 0, (
+            'Проверьте, что воспроизведение запросов проходит без ошибок.'
+        )
+        assert summary['posts-detail']['p99_ms'] >= 0
+
+    def test_offline_replay_with_writes(self, tmp_path):
+        entries = [
+            {'time': 0, 'method': method, 'route': 'posts-list',
+             'kwargs': {}, 'auth': True, 'request_size': 30,
+             'response_size': 0, 'status': 200, 'duration_ms': 1.0}
+            for _ in range(20) for method in ('POST', 'GET')
+        ]
+        log = tmp_path / 'traffic.log'
+        log.write_text(''.join(json.dumps(entry) + '\n'
+                               for entry in entries))
+        users = tmp_path / 'users.json'
+        users.write_text(json.dumps([{
+            'model': 'auth.user', 'pk': 1,
+            'fields': {'username': 'replay', 'password': '!'},
+        }]))
+        manage = Path(__file__).resolve().parent.parent / 'yatube_api'
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'replay_traffic', str(log),
+             '--offline', str(users), '--username', 'replay',
+             '--concurrency', '4', '--speedup', '0', '--json'],
+            cwd=manage, capture_output=True, text=True, check=True,
+        )
+        summary = json.loads(result.stdout)
+        assert summary['posts-list']['requests'] == 40
+        assert summary['posts-list']['error_rate'] == 0, (
+            'Проверьте, что воспроизведение на тестовой базе не падает '
+            'из-за блокировок SQLite.'
+        )
+        assert summary['posts-list']['client_error_rate'] == 0
+
+    def test_offline_replay_unknown_user(self, tmp_path):
+        log = tmp_path / 'traffic.log'
+        log.write_text(json.dumps({
+            'time': 0, 'method': 'GET', 'route': 'posts-list', 'kwargs': {},
+            'auth': True, 'request_size': 0, 'response_size': 0,
+            'status': 200, 'duration_ms': 1.0,
+        }) + '\n')
+        manage = Path(__file__).resolve().parent.parent / 'yatube_api'
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'replay_traffic', str(log),
+             '--offline', '--username', 'replay'],
+            cwd=manage, capture_output=True, text=True,
+        )
+        error = 'CommandError: Пользователь replay не найден'
+        assert result.returncode == 1 and error in result.stderr, (
+            'Проверьте, что `replay_traffic --offline` без пользователя в '
+            'фикстурах завершается понятной ошибкой, а не трейсбеком.'
+        )
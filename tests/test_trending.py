@@ -0,0 +1,122 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts import trending
+from posts.models import Comment, PostActivityBucket
+
+
+class TestTrending:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_trending_ranks_by_recent_comments(self, user_client, user,
+                                               post, another_post):
+        for _ in range(3):
+            Comment.objects.create(author=user, post=another_post, text='К')
+        Comment.objects.create(author=user, post=post, text='К')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = user_client.get('/api/v1/posts/trending/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `/api/v1/posts/trending/` возвращает 200.'
+        )
+        test_data = response.json()
+        assert [item['id'] for item in test_data] == [
+            another_post.id, post.id
+        ], (
+            'Проверьте, что популярные посты упорядочены по числу свежих '
+            'комментариев.'
+        )
+        assert test_data[0]['score'] > test_data[1]['score']
+        assert not any('posts_comment' in query['sql']
+                       for query in queries.captured_queries), (
+            'Проверьте, что рейтинг не читает таблицу комментариев.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_old_activity_decays(self, user, post, another_post):
+        now = timezone.now()
+        trending.record_comment(post.id, now - timedelta(hours=12))
+        trending.record_comment(post.id, now - timedelta(hours=12))
+        trending.record_comment(another_post.id, now)
+        ranked = trending.trending(10)
+        assert [post_id for post_id, _ in ranked] == [another_post.id,
+                                                      post.id], (
+            'Проверьте, что старая активность затухает со временем.'
+        )
+        trending.get_cache().delete(trending.TOP_KEY)
+        assert [post_id for post_id, _ in trending.trending(10)] == [
+            another_post.id, post.id
+        ], 'Проверьте, что топ восстанавливается по почасовым счётчикам.'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_window_and_deletes(self, user, post):
+        comment = Comment.objects.create(author=user, post=post, text='К')
+        assert trending.trending(10)[0][0] == post.id
+        comment.delete()
+        assert trending.trending(10) == []
+        trending.record_comment(post.id, timezone.now() - timedelta(days=3))
+        assert trending.trending(10) == [], (
+            'Проверьте, что активность вне окна не учитывается.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_top_refreshed_from_buckets(self, settings, user, post,
+                                        another_post):
+        now = timezone.now()
+        trending.record_comment(post.id, now)
+        assert [post_id for post_id, _ in trending.trending(10, now)] == [
+            post.id
+        ]
+        # Комментарии, учтённые другим процессом, есть только в счётчиках.
+        PostActivityBucket.objects.create(
+            post=another_post, hour=trending.bucket_hour(now), comments=5
+        )
+        assert len(trending.trending(10, now)) == 1
+        later = now + timedelta(seconds=settings.TRENDING_REFRESH_SECONDS)
+        assert [post_id for post_id, _ in trending.trending(10, later)] == [
+            another_post.id, post.id
+        ], (
+            'Проверьте, что топ периодически пересобирается по почасовым '
+            'счётчикам.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rolled_back_comment_not_in_top(self, user, post):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                Comment.objects.create(author=user, post=post, text='К')
+                raise RuntimeError
+        assert trending.trending(10) == [], (
+            'Проверьте, что откатившийся комментарий не попадает в топ.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_concurrent_first_comment_kept(self, monkeypatch, user, post):
+        hour = trending.bucket_hour(timezone.now())
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            if queryset.model is PostActivityBucket and not calls:
+                calls.append(kwargs)
+                # Другой запрос успел создать строку часа раньше нас.
+                PostActivityBucket.objects.bulk_create([
+                    PostActivityBucket(post=post, hour=hour, comments=1)
+                ])
+                return 0
+            return update(queryset, **kwargs)
+
+        monkeypatch.setattr(QuerySet, 'update', racing_update)
+        Comment.objects.create(author=user, post=post, text='К')
+        assert Comment.objects.filter(post=post).count() == 1, (
+            'Проверьте, что одновременный первый комментарий часа не '
+            'откатывает комментарий пользователя.'
+        )
+        bucket = PostActivityBucket.objects.get(post=post, hour=hour)
+        assert bucket.comments == 2
@@ -0,0 +1,119 @@
+import io
+from http import HTTPStatus
+
+import pytest
+from django.db import transaction
+from PIL import Image
+
+from posts.models import Post, StoredImage
+
+
+def make_image(size=(10, 10), color='red'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    buffer.seek(0)
+    buffer.name = 'image.png'
+    return buffer
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def another_client(another_user):
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    token, _ = Token.objects.get_or_create(user=another_user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class TestImageUploads:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_duplicate_images_stored_once(self, user_client, another_client,
+                                          media_root):
+        for client in (user_client, another_client):
+            response = client.post(
+                '/api/v1/posts/',
+                data={'text': 'Пост с картинкой', 'image': make_image()},
+                format='multipart'
+            )
+            assert response.status_code == HTTPStatus.CREATED
+
+        names = set(Post.objects.values_list('image', flat=True))
+        assert len(names) == 1, (
+            'Проверьте, что одинаковые картинки сохраняются под одним '
+            'именем.'
+        )
+        name = names.pop()
+        assert StoredImage.objects.get(name=name).refs == 2
+        files = [path for path in media_root.rglob('*') if path.is_file()]
+        assert len(files) == 1, (
+            'Проверьте, что одинаковые картинки занимают место на диске '
+            'один раз.'
+        )
+
+        Post.objects.first().delete()
+        assert StoredImage.objects.get(name=name).refs == 1
+        assert (media_root / name).exists()
+        Post.objects.first().delete()
+        assert not StoredImage.objects.filter(name=name).exists()
+        assert not (media_root / name).exists(), (
+            'Проверьте, что файл удаляется, когда на него не осталось ссылок.'
+        )
+        assert media_root.exists(), (
+            'Проверьте, что удаление файла не затрагивает корень хранилища.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_kept_when_referenced_again(self, user_client, media_root):
+        response = user_client.post(
+            '/api/v1/posts/',
+            data={'text': 'Пост с картинкой', 'image': make_image()},
+            format='multipart'
+        )
+        post = Post.objects.get(pk=response.json()['id'])
+        name = post.image.name
+        with transaction.atomic():
+            post.delete()
+            Post.objects.create(text='Та же картинка', author=post.author,
+                                image=name)
+        assert StoredImage.objects.get(name=name).refs == 1
+        assert (media_root / name).exists(), (
+            'Проверьте, что файл не удаляется, если на него снова сослались '
+            'до удаления.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_oversized_image_rejected(self, settings, user_client):
+        settings.IMAGE_UPLOAD_MAX_SIZE = 50
+        response = user_client.post(
+            '/api/v1/posts/',
+            data={'text': 'Пост с картинкой', 'image': make_image()},
+            format='multipart'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что слишком большой файл отклоняется со статусом 400.'
+        )
+        assert 'image' in response.json()
+        assert not Post.objects.exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_image_dimensions_limited(self, settings, user_client):
+        settings.IMAGE_UPLOAD_MAX_DIMENSIONS = (5, 5)
+        response = user_client.post(
+            '/api/v1/posts/',
+            data={'text': 'Пост с картинкой', 'image': make_image()},
+            format='multipart'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что картинка со слишком большим разрешением '
+            'отклоняется со статусом 400.'
+        )
+        assert not Post.objects.exists()
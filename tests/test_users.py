@@ -0,0 +1,97 @@
+from datetime import timedelta
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from posts import stats
+from posts.models import Comment, Post, UserStats
+
+
+class TestUsers:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_endpoint(self, user_client, user, another_user, post,
+                           comment_2_post):
+        response = user_client.get(f'/api/v1/users/{user.username}/')
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что `/api/v1/users/{username}/` возвращает 200.'
+        )
+        test_data = response.json()
+        assert test_data['username'] == user.username
+        assert set(test_data) == {'id', 'username', 'stats'}, (
+            'Проверьте, что публичный профиль не раскрывает имя и фамилию '
+            'пользователя.'
+        )
+        assert test_data['stats']['posts_count'] == 1
+        assert test_data['stats']['comments_count'] == 0
+        assert test_data['stats']['last_post_at']
+        other = user_client.get(
+            f'/api/v1/users/{another_user.username}/'
+        ).json()
+        assert other['stats']['comments_count'] == 1, (
+            'Проверьте, что у пользователя считаются его комментарии.'
+        )
+        assert other['stats']['last_comment_at']
+        response = user_client.get('/api/v1/users/nobody/')
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_deletes(self, user, another_user, post,
+                                     comment_1_post, comment_2_post):
+        comment_1_post.delete()
+        assert UserStats.objects.get(user=user).comments_count == 0
+        post.delete()
+        assert UserStats.objects.get(user=user).posts_count == 0
+        assert UserStats.objects.get(user=another_user).comments_count == 0, (
+            'Проверьте, что каскадное удаление комментариев с постом '
+            'обновляет счётчики их авторов.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_matches_incremental(self, user, another_user, post,
+                                         another_post, comment_2_post):
+        Comment.objects.create(author=user, post=another_post, text='К')
+        maintained = {
+            row.pop('user_id'): row for row in UserStats.objects.values()
+        }
+        stats.rebuild_users()
+        rebuilt = {
+            row.pop('user_id'): row for row in UserStats.objects.values()
+        }
+        assert maintained == rebuilt, (
+            'Проверьте, что счётчики пользователей совпадают с пересчётом.'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_keeps_archived_activity(self, user, another_user, post,
+                                             comment_2_post):
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_posts', '--days', '365')
+        fields = ('user', 'posts_count', 'comments_count')
+        maintained = set(UserStats.objects.values_list(*fields))
+        stats.rebuild_users()
+        rebuilt = set(UserStats.objects.values_list(*fields))
+        assert maintained == rebuilt, (
+            'Проверьте, что пересчёт счётчиков пользователей учитывает архив.'
+        )
+        assert (another_user.pk, 0, 1) in rebuilt
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_posts(self, user_client, user, another_user, post,
+                        another_post):
+        newer = Post.objects.create(author=user, text='Новый пост')
+        url = f'/api/v1/users/{user.username}/posts/'
+        response = user_client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert [item['id'] for item in response.json()] == [
+            newer.id, post.id
+        ], 'Проверьте, что посты пользователя идут от новых к старым.'
+        response = user_client.get(url, {'page_size': 1})
+        test_data = response.json()
+        assert test_data['count'] == 2
+        assert [item['id'] for item in test_data['results']] == [newer.id]
+        assert test_data['next']
@@ -0,0 +1,30 @@
+from rest_framework import exceptions
+from rest_framework.authentication import (BaseAuthentication,
+                                           get_authorization_header)
+
+from . import tokens
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Аутентификация по подписанному access-токену без запросов к базе.
+
+    Заголовок: ``Authorization: Bearer <token>``.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(
+                'Некорректный заголовок Authorization.'
+            )
+        try:
+            payload = tokens.verify_access(auth[1].decode())
+        except (tokens.InvalidToken, UnicodeError) as error:
+            raise exceptions.AuthenticationFailed(str(error))
+        return tokens.token_user(payload), payload
+
+    def authenticate_header(self, request):
+        return self.keyword
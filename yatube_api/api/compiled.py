@@ -0,0 +1,77 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+# Поля, у которых to_representation не меняет значение из базы.
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField,
+               serializers.RelatedField)
+
+
+class UnsupportedField(Exception):
+    pass
+
+
+class ReadPlan:
+    """Скомпилированный план чтения для ``ModelSerializer``.
+
+    Берёт из базы только нужные столбцы через ``values_list`` и собирает
+    словари так же, как ``serializer.data`` без ``request`` в контексте.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class(context={})
+        self.model = serializer.Meta.model
+        self.names, self.lookups, self.converters = [], [], []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            lookup, converter = self.compile_field(field)
+            self.names.append(name)
+            self.lookups.append(lookup)
+            self.converters.append(converter)
+
+    def compile_field(self, field):
+        if field.source == '*' or isinstance(
+                field, serializers.SerializerMethodField):
+            raise UnsupportedField(field.field_name)
+        attrs = field.source.split('.')
+        try:
+            model_field = self.model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            raise UnsupportedField(field.field_name)
+        if isinstance(field, serializers.SlugRelatedField):
+            attrs.append(field.slug_field)
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            attrs.append('pk')
+        elif len(attrs) > 1 or model_field.is_relation:
+            raise UnsupportedField(field.field_name)
+        lookup = '__'.join(attrs)
+        if getattr(field, 'pk_field', None) is not None:
+            return lookup, field.pk_field.to_representation
+        if isinstance(field, PASSTHROUGH):
+            return lookup, None
+        if isinstance(field, serializers.FileField):
+            attr_class = model_field.attr_class
+            return lookup, lambda name: field.to_representation(
+                attr_class(None, model_field, name)
+            )
+        return lookup, field.to_representation
+
+    def serialize(self, queryset):
+        names, converters = self.names, self.converters
+        for row in queryset.values_list(*self.lookups):
+            yield {
+                name: value if convert is None or value is None
+                else convert(value)
+                for name, value, convert in zip(names, row, converters)
+            }
+
+
+@lru_cache(maxsize=None)
+def get_plan(serializer_class):
+    """План для сериализатора или ``None``, если поля не компилируются."""
+    try:
+        return ReadPlan(serializer_class)
+    except UnsupportedField:
+        return None
@@ -0,0 +1,77 @@
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Объект изменён другим запросом, получите его заново.'
+    default_code = 'precondition_failed'
+
+
+def version_etag(version):
+    return f'"{version}"'
+
+
+def parse_if_match(header):
+    """Возвращает ожидаемую версию из ``If-Match`` или ``None``."""
+    if not header or header.strip() == '*':
+        return None
+    # CompressionMiddleware ослабляет ETag сжатых ответов.
+    etag = header.split(',')[0].strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    try:
+        return int(etag.strip('"'))
+    except ValueError:
+        raise ValidationError({'If-Match': ['Некорректный ETag.']})
+
+
+def compare_and_swap(instance, values, expected_version):
+    """Сохраняет ``values`` одним UPDATE, если версия не изменилась."""
+    model = type(instance)
+    for attr, value in values.items():
+        setattr(instance, attr, value)
+    columns = {}
+    for attr in values:
+        field = model._meta.get_field(attr)
+        columns[field.attname] = field.pre_save(instance, add=False)
+    using = router.db_for_write(model, instance=instance)
+    with transaction.atomic(using=using):
+        updated = model._base_manager.using(using).filter(
+            pk=instance.pk, version=expected_version
+        ).update(version=F('version') + 1, **columns)
+        if not updated:
+            raise PreconditionFailed
+        instance.version = expected_version + 1
+        # Кеши и счётчики подписаны на post_save, а UPDATE его не шлёт.
+        post_save.send(sender=model, instance=instance, created=False,
+                       update_fields=frozenset(columns) | {'version'},
+                       raw=False, using=using)
+    return instance
+
+
+class VersionedUpdateMixin:
+    """ETag из версии объекта и обновление по ``If-Match``."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.with_etag(super().retrieve(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self.with_etag(super().update(request, *args, **kwargs))
+
+    def perform_update(self, serializer):
+        expected = parse_if_match(self.request.headers.get('If-Match'))
+        if expected is None:
+            serializer.save()
+        else:
+            compare_and_swap(serializer.instance, serializer.validated_data,
+                             expected)
+
+    def with_etag(self, response):
+        version = response.data.get('version')
+        if version is not None:
+            response['ETag'] = version_etag(version)
+        return response
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import caches
+
+FRAGMENT_CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60)
+# Меняется при изменении набора полей сериализаторов.
+FRAGMENT_SCHEMA_VERSION = 3
+
+
+def get_cache():
+    return caches[FRAGMENT_CACHE_ALIAS]
+
+
+def fragment_key(model, pk, version):
+    # Версия объекта в ключе: после сохранения читается новый ключ, и
+    # фрагмент, закешированный по данным до фиксации, уже не выдаётся.
+    return (f'fragment:{model._meta.label_lower}:'
+            f'v{FRAGMENT_SCHEMA_VERSION}:{pk}:{version}')
+
+
+def get_fragments(model, versions):
+    """Возвращает фрагменты по словарю ``{pk: version}``."""
+    keys = {fragment_key(model, pk, version): pk
+            for pk, version in versions.items()}
+    cached = get_cache().get_many(keys)
+    return {keys[key]: data for key, data in cached.items()}
+
+
+def set_fragments(model, fragments):
+    get_cache().set_many(
+        {fragment_key(model, pk, data['version']): data
+         for pk, data in fragments.items()},
+        FRAGMENT_CACHE_TIMEOUT
+    )
+
+
+def invalidate_fragments(model, versions):
+    keys = [fragment_key(model, pk, version)
+            for pk, version in dict(versions).items()]
+    if keys:
+        get_cache().delete_many(keys)
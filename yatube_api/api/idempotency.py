@@ -0,0 +1,151 @@
+import hashlib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+from posts.models import IdempotencyKey
+
+
+class IdempotencyConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Запрос с этим ключом идемпотентности ещё выполняется.'
+    default_code = 'idempotency_conflict'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = ('Ключ идемпотентности уже использован с другими '
+                      'данными запроса.')
+    default_code = 'idempotency_key_reused'
+
+
+def request_fingerprint(request):
+    content_type = request.content_type or ''
+    if not content_type.startswith('multipart/'):
+        return hashlib.sha256(request.body).hexdigest()
+    # Тело с файлами разобрано парсером: хешируем поля и содержимое
+    # файлов, не собирая их в памяти.
+    hasher = hashlib.sha256()
+    for name in sorted(request.data):
+        for value in request.data.getlist(name):
+            hasher.update(f'{len(name)}:{name}'.encode())
+            if hasattr(value, 'chunks'):
+                digest = getattr(value, 'content_hash', None)
+                if digest is None:
+                    file_hasher = hashlib.sha256()
+                    for chunk in value.chunks():
+                        file_hasher.update(chunk)
+                    value.seek(0)
+                    digest = file_hasher.hexdigest()
+                hasher.update(f'file:{digest}'.encode())
+            else:
+                value = str(value).encode()
+                hasher.update(b'%d:%s' % (len(value), value))
+    return hasher.hexdigest()
+
+
+def purge_expired():
+    """Удаляет ключи старше ``IDEMPOTENCY_TTL``, возвращает их число."""
+    return IdempotencyKey.objects.filter(
+        created__lt=timezone.now() - timedelta(
+            seconds=settings.IDEMPOTENCY_TTL
+        )
+    ).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """Повтор POST с тем же ``Idempotency-Key`` получает исходный ответ.
+
+    Ключи хранятся в таблице ``IdempotencyKey`` с уникальностью по
+    пользователю и ключу, поэтому повтор, пришедший в другой процесс или
+    после перезапуска, тоже получает сохранённый ответ. Одновременные
+    запросы с одним ключом выполняются по очереди: первый занимает ключ
+    вставкой строки, остальные ждут его ответа.
+    """
+    idempotency_header = 'Idempotency-Key'
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > 255:
+            raise ValidationError(
+                {self.idempotency_header: ['Ключ длиннее 255 символов.']}
+            )
+
+        fingerprint = request_fingerprint(request)
+        claim, created = self.claim_key(request, key, fingerprint)
+        if not created:
+            return self.replay(claim, request, fingerprint)
+
+        stored = False
+        try:
+            with transaction.atomic():
+                response = super().create(request, *args, **kwargs)
+                if status.is_success(response.status_code):
+                    IdempotencyKey.objects.filter(pk=claim.pk).update(
+                        status=response.status_code,
+                        response={
+                            'data': dict(response.data),
+                            'headers': {
+                                name: value for name, value in
+                                response.items() if name == 'Location'
+                            },
+                        },
+                    )
+                    stored = True
+            return response
+        finally:
+            if not stored:
+                # Неуспешный запрос можно повторить с тем же ключом.
+                IdempotencyKey.objects.filter(pk=claim.pk).delete()
+
+    def claim_key(self, request, key, fingerprint):
+        """Занимает ключ или находит уже сохранённый по нему ответ.
+
+        Возвращает пару (строка ключа, занят ли ключ этим запросом).
+        """
+        lookup = {'user': request.user, 'key': key}
+        deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_TIMEOUT
+        while True:
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(
+                        path=request.path, fingerprint=fingerprint, **lookup
+                    ), True
+            except IntegrityError:
+                pass
+            stored = IdempotencyKey.objects.filter(**lookup).first()
+            if stored is None:
+                continue
+            age = timezone.now() - stored.created
+            if stored.status is None:
+                if time.monotonic() >= deadline:
+                    raise IdempotencyConflict
+                # Запрос, не завершившийся за время блокировки, брошен.
+                stale = age > timedelta(
+                    seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+                )
+            else:
+                stale = age > timedelta(seconds=settings.IDEMPOTENCY_TTL)
+            if stale:
+                IdempotencyKey.objects.filter(pk=stored.pk,
+                                              created=stored.created).delete()
+            elif stored.status is not None:
+                return stored, False
+            else:
+                time.sleep(0.05)
+
+    def replay(self, stored, request, fingerprint):
+        if (stored.fingerprint, stored.path) != (fingerprint, request.path):
+            raise IdempotencyKeyReused
+        response = Response(stored.response['data'], status=stored.status,
+                            headers=stored.response['headers'])
+        response['Idempotent-Replayed'] = 'true'
+        return response
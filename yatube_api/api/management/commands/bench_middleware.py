@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from yatube_api.middleware import MiddlewareChain
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает накладные расходы полного стека middleware и '
+            'облегчённого стека для /api/.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--path', default='/api/v1/posts/')
+
+    def handle(self, *args, **options):
+        stacks = {
+            'full': [*settings.MIDDLEWARE[:-1], *settings.SITE_MIDDLEWARE],
+            'api': settings.MIDDLEWARE,
+        }
+        factory = RequestFactory()
+        results = {}
+        for name, middleware in stacks.items():
+            chain = MiddlewareChain(middleware, lambda request: HttpResponse())
+            results[name] = self.measure(chain, factory, options)
+            self.stdout.write(
+                f'{name:>5}: {len(middleware)} middleware, '
+                f'{results[name] * 1e6:.1f} мкс/запрос'
+            )
+        saved = results['full'] - results['api']
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия: {saved * 1e6:.1f} мкс/запрос '
+            f'({saved / results["full"]:.0%})'
+        ))
+
+    def measure(self, chain, factory, options):
+        requests = [factory.get(options['path'])
+                    for _ in range(options['requests'])]
+        started = time.perf_counter()
+        for request in requests:
+            chain(request)
+        return (time.perf_counter() - started) / len(requests)
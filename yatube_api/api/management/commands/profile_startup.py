@@ -0,0 +1,33 @@
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Замеряет холодный старт процесса: импорт и ready() каждого '
+            'приложения и этапы прогрева.')
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-m', 'yatube_api.startup'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr)
+        report = json.loads(result.stdout)
+
+        self.stdout.write(f'{"app":<20}{"import":>10}{"models":>10}'
+                          f'{"ready":>10}')
+        for label, row in report['apps'].items():
+            self.stdout.write(
+                f'{label:<20}' + ''.join(
+                    f'{row[key] * 1000:>8.1f}ms'
+                    for key in ('import', 'models', 'ready')
+                )
+            )
+        self.stdout.write('')
+        for stage, seconds in report['stages'].items():
+            self.stdout.write(f'{stage:<20}{seconds * 1000:>8.1f}ms')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api.tokens import purge_revoked
+
+
+class Command(BaseCommand):
+    help = 'Удаляет записи об отозванных токенах с истёкшим сроком.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Удалено записей: {purge_revoked()}')
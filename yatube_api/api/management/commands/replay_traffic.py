@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.urls import NoReverseMatch, reverse
+from rest_framework.test import APIClient
+
+from yatube_api import traffic
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH')
+
+
+class Command(BaseCommand):
+    help = ('Воспроизводит записанный трафик через тестовый клиент или '
+            'HTTP и выводит задержки и ошибки по маршрутам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--target',
+                            help='Адрес сервера; без него — тестовый клиент.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--speedup', type=float, default=1.0,
+                            help='Ускорение; 0 — без пауз между запросами.')
+        parser.add_argument('--username',
+                            help='Пользователь для авторизованных запросов '
+                                 'через тестовый клиент.')
+        parser.add_argument('--token',
+                            help='Токен для авторизованных HTTP-запросов.')
+        parser.add_argument('--offline', nargs='*', metavar='FIXTURE',
+                            help='Запуск на тестовой базе с фикстурами.')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        entries = traffic.read(options['path'])
+        if not entries:
+            raise CommandError('В записи нет запросов.')
+        if (not options['target'] and connection.vendor == 'sqlite'
+                and options['concurrency'] > 1):
+            # SQLite пропускает одну пишущую транзакцию за раз: параллельные
+            # запросы тестового клиента падают с «database is locked», а не
+            # меряют задержки.
+            self.stderr.write('База SQLite: запросы выполняются '
+                              'последовательно (--concurrency 1).')
+            options['concurrency'] = 1
+        if options['offline'] is None:
+            return self.run(entries, options)
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            if options['offline']:
+                call_command('loaddata', *options['offline'], verbosity=0)
+            return self.run(entries, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def run(self, entries, options):
+        self.options = options
+        self.local = threading.local()
+        self.user = None
+        if options['username'] and not options['target']:
+            try:
+                self.user = get_user_model().objects.get(
+                    username=options['username']
+                )
+            except get_user_model().DoesNotExist:
+                hint = (' Тестовая база создаётся пустой: передайте '
+                        'фикстуру с ним в --offline.'
+                        if options['offline'] is not None else '')
+                raise CommandError(
+                    f'Пользователь {options["username"]} не найден.{hint}'
+                )
+        speedup = options['speedup']
+        origin = entries[0]['time']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            futures = []
+            for entry in entries:
+                if speedup > 0:
+                    delay = ((entry['time'] - origin) / speedup
+                             - (time.perf_counter() - start))
+                    if delay > 0:
+                        time.sleep(delay)
+                futures.append(executor.submit(self.send, entry))
+            results = [future.result() for future in futures]
+        summary = traffic.summarize(results, time.perf_counter() - start)
+        self.report(summary)
+
+    def send(self, entry):
+        try:
+            path = reverse(entry['route'], kwargs=entry['kwargs'])
+        except NoReverseMatch:
+            return entry['route'], None, 0.0
+        data = None
+        if entry['method'] in WRITE_METHODS:
+            # Содержимое не записывается, воспроизводим только его размер.
+            data = {'text': 'x' * max(entry['request_size'] - 12, 1)}
+        start = time.perf_counter()
+        try:
+            if self.options['target']:
+                status = self.send_http(entry, path, data)
+            else:
+                status = self.send_local(entry, path, data)
+        except Exception:
+            status = None
+        finally:
+            connections.close_all()
+        return entry['route'], status, time.perf_counter() - start
+
+    def send_local(self, entry, path, data):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = APIClient()
+        client.force_authenticate(self.user if entry['auth'] else None)
+        return client.generic(
+            entry['method'], path,
+            json.dumps(data) if data is not None else '',
+            content_type='application/json',
+        ).status_code
+
+    def send_http(self, entry, path, data):
+        request = urllib.request.Request(
+            self.options['target'].rstrip('/') + path,
+            method=entry['method'],
+            data=json.dumps(data).encode() if data is not None else None,
+            headers={'Content-Type': 'application/json'},
+        )
+        if entry['auth'] and self.options['token']:
+            request.add_header('Authorization',
+                               f'Token {self.options["token"]}')
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def report(self, summary):
+        if self.options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(
+            f'{"маршрут":<20} {"запросов":>8} {"rps":>8} {"p50":>8} '
+            f'{"p95":>8} {"p99":>8} {"5xx":>6} {"4xx":>6}'
+        )
+        for route, stats in summary.items():
+            self.stdout.write(
+                f'{route:<20} {stats["requests"]:>8} {stats["rps"]:>8.1f} '
+                f'{stats["p50_ms"]:>8.1f} {stats["p95_ms"]:>8.1f} '
+                f'{stats["p99_ms"]:>8.1f} {stats["error_rate"]:>6.1%} '
+                f'{stats["client_error_rate"]:>6.1%}'
+            )
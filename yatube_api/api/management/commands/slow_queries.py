@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube_api.querylog import aggregate, read
+
+
+class Command(BaseCommand):
+    help = ('Сводка журнала медленных запросов по отпечаткам: число, '
+            'суммарное и максимальное время, представления и план.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=settings.SLOW_QUERY_LOG_PATH)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--no-plan', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            summary = aggregate(read(options['path']))
+        except FileNotFoundError:
+            raise CommandError(f'Журнал {options["path"]} не найден.')
+        for group in summary[:options['limit']]:
+            self.stdout.write(self.style.WARNING(
+                f'{group["fingerprint"]}: {group["count"]} раз, '
+                f'всего {group["total_ms"]:.1f} мс, '
+                f'в среднем {group["avg_ms"]:.1f} мс, '
+                f'максимум {group["max_ms"]:.1f} мс'
+            ))
+            self.stdout.write(f'  {group["sql"]}')
+            if group['views']:
+                self.stdout.write(f'  Вызовы: {", ".join(group["views"])}')
+            if group['plan'] and not options['no_plan']:
+                for row in group['plan']:
+                    self.stdout.write(f'    {row}')
@@ -0,0 +1,136 @@
+import mimetypes
+import os
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.views import APIView
+
+from posts.models import ArchivedPost, Post
+
+CHUNK_SIZE = 64 * 1024
+
+
+class IgnoreAcceptNegotiation(BaseContentNegotiation):
+    # Клиенты запрашивают image/*, а ошибки всё равно отдаются в JSON.
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def parse_range(header, size):
+    """Возвращает (start, end) для единственного диапазона ``bytes=``.
+
+    ``None`` — заголовок не поддерживается и отдаётся весь файл,
+    ``ValueError`` — диапазон не пересекается с файлом.
+    """
+    unit, _, ranges = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in ranges:
+        return None
+    start, _, end = ranges.strip().partition('-')
+    try:
+        if not start:
+            length = int(end)
+            start = max(size - length, 0)
+            end = size - 1 if length > 0 else -1
+        else:
+            start = int(start)
+            end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    # Пустой файл не удовлетворяет никакому диапазону, в том числе
+    # суффиксному.
+    if start >= size or end < start:
+        raise ValueError
+    return start, min(end, size - 1)
+
+
+def file_range(file, start, length):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class MediaView(APIView):
+    """Отдаёт картинки постов только аутентифицированным пользователям.
+
+    При ``MEDIA_ACCEL_BACKEND`` передача файла делегируется фронтовому
+    прокси, иначе файл отдаётся через ``FileResponse`` (sendfile у
+    WSGI-сервера) с поддержкой Range и сильными ETag.
+    """
+    content_negotiation_class = IgnoreAcceptNegotiation
+
+    def get(self, request, path):
+        if not (Post.objects.filter(image=path).exists()
+                or ArchivedPost.objects.filter(image=path).exists()):
+            raise Http404
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+            stat = os.stat(full_path)
+        except (SuspiciousFileOperation, OSError):
+            raise Http404
+        content_type = (mimetypes.guess_type(full_path)[0]
+                        or 'application/octet-stream')
+
+        backend = settings.MEDIA_ACCEL_BACKEND
+        if backend == 'x-accel-redirect':
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = quote(
+                settings.MEDIA_ACCEL_PREFIX + path
+            )
+            return response
+        if backend == 'x-sendfile':
+            response = HttpResponse(content_type=content_type)
+            response['X-Sendfile'] = full_path
+            return response
+        return self.serve(request, full_path, stat, content_type)
+
+    def serve(self, request, full_path, stat, content_type):
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        last_modified = int(stat.st_mtime)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        file = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                file_range(file, start, end - start + 1),
+                status=206, content_type=content_type
+            )
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,91 @@
+from django.db import transaction
+from rest_framework.response import Response
+
+from . import fragments
+from .compiled import get_plan
+
+
+class FragmentCacheMixin:
+    """Собирает объекты выборки из закешированных фрагментов.
+
+    Фрагменты сериализуются без ``request`` в контексте, поэтому ссылки
+    на файлы в кеше хранятся относительными и дополняются при выдаче.
+    Промахи по возможности собираются скомпилированным планом чтения.
+    """
+    list_select_related = ()
+    fragment_file_fields = ()
+
+    def get_list_select_related(self):
+        return self.list_select_related
+
+    def get_fragment_file_fields(self):
+        return self.fragment_file_fields
+
+    def fragment_response(self, queryset):
+        rows = queryset.values_list('pk', 'version')
+        page = self.paginate_queryset(rows)
+        data = self.get_fragments(queryset, rows if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def get_fragments(self, queryset, rows):
+        """Собирает объекты по парам ``(pk, version)`` в их порядке."""
+        versions = dict(rows)
+        pks = list(versions)
+        model = queryset.model
+        found = fragments.get_fragments(model, versions)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            fresh = {
+                item['id']: item
+                for item in self.serialize_objects(
+                    queryset.filter(pk__in=missing)
+                )
+            }
+            fragments.set_fragments(model, fresh)
+            found.update(fresh)
+        return [self.finalize_fragment(found[pk]) for pk in pks if pk in found]
+
+    def serialize_objects(self, queryset):
+        plan = get_plan(self.get_serializer_class())
+        if plan is not None:
+            return plan.serialize(queryset)
+        return self.get_serializer_class()(
+            queryset.select_related(*self.get_list_select_related()),
+            many=True, context={'view': self}
+        ).data
+
+    def finalize_fragment(self, data):
+        data = dict(data)
+        for field in self.get_fragment_file_fields():
+            if data.get(field):
+                data[field] = self.request.build_absolute_uri(data[field])
+        return data
+
+
+class FragmentCacheListMixin(FragmentCacheMixin):
+    """Список из закешированных фрагментов объектов."""
+
+    def list(self, request, *args, **kwargs):
+        return self.fragment_response(
+            self.filter_queryset(self.get_queryset())
+        )
+
+
+class AtomicWriteMixin:
+    """Изменение объекта и записи, сделанные его сигналами (события
+    outbox, счётчики), фиксируются одной транзакцией.
+    """
+
+    def create(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
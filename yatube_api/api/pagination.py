@@ -0,0 +1,55 @@
+from functools import partial
+
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from posts.counts import get_count, is_approximate
+
+
+class CountedPaginator(Paginator):
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        if self.known_count is not None:
+            return self.known_count
+        return super().count
+
+
+class CachedCountPagination(PageNumberPagination):
+    """Постраничный вывод с количеством из счётчиков и кеша.
+
+    Пагинация включается параметром ``page_size``, без него список
+    отдаётся целиком, как и раньше.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    exact_count_query_param = 'exact_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.get_page_size(request):
+            return None
+        scope = getattr(view, 'get_count_scope', lambda: None)()
+        self.exact = request.query_params.get(
+            self.exact_count_query_param
+        ) in ('1', 'true')
+        count = None
+        if scope is not None:
+            count = get_count(queryset, scope, exact=self.exact)
+        self.django_paginator_class = partial(CountedPaginator, count=count)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        count = self.page.paginator.count
+        return Response({
+            'count': count,
+            'approximate': is_approximate(count, self.exact),
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
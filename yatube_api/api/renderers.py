@@ -0,0 +1,17 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class EventStreamRenderer(BaseRenderer):
+    """``text/event-stream``: сами потоки отдаются ``StreamingHttpResponse``,
+    рендерер нужен для согласования типа и ответов с ошибками.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return f'event: error\ndata: {json.dumps(data)}\n\n'.encode()
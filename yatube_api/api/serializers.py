@@ -1,17 +1,44 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from posts.models import Post, Group, Comment
+from . import tokens
+
+from posts.groups import group_map
+from posts.models import (ArchivedComment, ArchivedPost, Comment, Group,
+                          GroupStats, Post, UserStats)
+
+
+class GroupField(serializers.SlugRelatedField):
+    """Принимает группу по slug или id, отдаёт её название."""
+    default_error_messages = {
+        'does_not_exist': 'Группа «{value}» не найдена.',
+        'invalid': 'Укажите slug или id группы.',
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'title')
+        kwargs.setdefault('queryset', Group.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, (str, int)) or isinstance(data, bool):
+            self.fail('invalid')
+        group = group_map.resolve(data)
+        if group is None:
+            self.fail('does_not_exist', value=data)
+        return group
 
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(read_only=True,
                                           slug_field='username')
-    group = serializers.SlugRelatedField(read_only=True,
-                                         slug_field='title')
+    group = GroupField(required=False, allow_null=True)
 
     class Meta:
         model = Post
         fields = '__all__'
+        read_only_fields = ('version',)
 
 
 class GroupSerializer(serializers.ModelSerializer):
@@ -21,11 +48,85 @@ class GroupSerializer(serializers.ModelSerializer):
         fields = ('id', 'title', 'slug', 'description')
 
 
+class GroupStatsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = GroupStats
+        fields = ('posts_count', 'comments_count', 'authors_count',
+                  'last_activity')
+
+
+class UserStatsSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = UserStats
+        fields = ('posts_count', 'comments_count', 'last_post_at',
+                  'last_comment_at')
+
+
+class UserSerializer(serializers.ModelSerializer):
+    stats = serializers.SerializerMethodField()
+
+    class Meta:
+        model = get_user_model()
+        # Публичный профиль: без имени и фамилии.
+        fields = ('id', 'username', 'stats')
+
+    def get_stats(self, user):
+        # Строки может не быть у пользователей, созданных в обход сигналов.
+        user_stats = getattr(user, 'stats', None) or UserStats(user=user)
+        return UserStatsSerializer(user_stats).data
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.SlugRelatedField(read_only=True,
                                           slug_field='username')
 
     class Meta:
         model = Comment
-        fields = ('id', 'author', 'post', 'text', 'created')
-        read_only_fields = ('id', 'post',)
+        fields = ('id', 'author', 'post', 'parent', 'depth', 'text',
+                  'created', 'version')
+        read_only_fields = ('id', 'post', 'depth', 'version')
+
+    def validate_parent(self, parent):
+        if self.instance is not None and parent != self.instance.parent:
+            raise serializers.ValidationError(
+                'Ответ нельзя перенести к другому комментарию.'
+            )
+        if parent is not None and parent.depth >= settings.COMMENT_MAX_DEPTH:
+            raise serializers.ValidationError(
+                'Превышена максимальная вложенность ответов.'
+            )
+        return parent
+
+
+class ArchivedPostSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(read_only=True,
+                                          slug_field='username')
+    group = serializers.SlugRelatedField(read_only=True,
+                                         slug_field='title')
+
+    class Meta:
+        model = ArchivedPost
+        exclude = ('archived_at',)
+
+
+class ArchivedCommentSerializer(serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(read_only=True,
+                                          slug_field='username')
+
+    class Meta:
+        model = ArchivedComment
+        fields = ('id', 'author', 'post', 'parent', 'depth', 'text',
+                  'created', 'version')
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            attrs['payload'] = tokens.verify_refresh(attrs['refresh'])
+        except tokens.InvalidToken as error:
+            raise serializers.ValidationError({'refresh': [str(error)]})
+        return attrs
@@ -0,0 +1,249 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from posts import counts, outbox, stats, trending
+from posts.content_filter import content_filter, flagged_phrases
+from posts.archive import is_archiving
+from posts.groups import group_map
+from posts.models import (BannedPhrase, Comment, ContentFlag, Group, Post,
+                          StoredImage, UserStats)
+from . import streams
+from .fragments import invalidate_fragments
+
+User = get_user_model()
+
+
+def versions(queryset):
+    return dict(queryset.values_list('pk', 'version'))
+
+
+# Новая версия объекта читается по новому ключу, поэтому старые фрагменты
+# не мешают; их освобождаем после фиксации транзакции.
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def drop_previous_fragment(sender, instance, created, **kwargs):
+    if not created:
+        stale = {instance.pk: instance.version - 1}
+        transaction.on_commit(lambda: invalidate_fragments(sender, stale))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def drop_deleted_fragment(sender, instance, **kwargs):
+    stale = {instance.pk: instance.version}
+    transaction.on_commit(lambda: invalidate_fragments(sender, stale))
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    stats.user_deleting(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    stats.user_deleted(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    instance._old_username = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_fragments(sender, instance, created, **kwargs):
+    old_username = getattr(instance, '_old_username', None)
+    if created or old_username in (None, instance.username):
+        return
+
+    def invalidate():
+        invalidate_fragments(Post, versions(
+            Post.objects.filter(author=instance)
+        ))
+        invalidate_fragments(Comment, versions(
+            Comment.objects.filter(author=instance)
+        ))
+    transaction.on_commit(invalidate)
+
+
+@receiver(pre_save, sender=Group)
+def remember_old_title(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._old_title = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('title', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_fragments(sender, instance, created, **kwargs):
+    old_title = getattr(instance, '_old_title', None)
+    if created or old_title in (None, instance.title):
+        return
+    transaction.on_commit(lambda: invalidate_fragments(
+        Post, versions(Post.objects.filter(group=instance))
+    ))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_fragments(sender, instance, **kwargs):
+    # SET_NULL обновляет посты запросом без сигналов, а название группы
+    # есть в их фрагментах.
+    stale = versions(Post.objects.filter(group=instance))
+    transaction.on_commit(lambda: invalidate_fragments(Post, stale))
+
+
+@receiver((post_save, post_delete), sender=Group)
+def invalidate_group_map(sender, **kwargs):
+    transaction.on_commit(group_map.invalidate)
+
+
+@receiver((post_save, post_delete), sender=BannedPhrase)
+def rebuild_content_filter(sender, **kwargs):
+    transaction.on_commit(content_filter.invalidate)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def flag_content(sender, instance, created, raw=False, update_fields=None,
+                 **kwargs):
+    if raw or (update_fields is not None and 'text' not in update_fields):
+        return
+    # Повторное сохранение без правки текста не отмечает его снова.
+    changed = created or instance.text != instance._initial_text
+    instance._initial_text = instance.text
+    if not changed:
+        return
+    phrases = flagged_phrases(instance.text)
+    if phrases:
+        ContentFlag.objects.create(
+            phrases=sorted(phrases),
+            **{sender._meta.model_name: instance}
+        )
+
+
+@receiver(post_init, sender=Post)
+@receiver(post_init, sender=Comment)
+def remember_text(sender, instance, **kwargs):
+    instance._initial_text = instance.__dict__.get('text')
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    # Берём сырые значения, чтобы не загружать отложенные поля.
+    value = instance.__dict__.get('image')
+    instance._initial_image = getattr(value, 'name', value)
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+def update_image_refs(old_name, new_name):
+    if old_name == new_name:
+        return
+    if new_name:
+        StoredImage.retain(new_name)
+    if old_name:
+        StoredImage.release(old_name)
+
+
+def update_author_counts(author_id, delta):
+    counts.adjust_count(counts.author_posts_scope(author_id), delta)
+
+
+def update_group_counts(old_group_id, new_group_id):
+    if old_group_id:
+        counts.adjust_count(counts.group_posts_scope(old_group_id), -1)
+    if new_group_id:
+        counts.adjust_count(counts.group_posts_scope(new_group_id), 1)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_image = None if created else instance._initial_image
+    old_group_id = None if created else instance._initial_group_id
+    update_image_refs(old_image, instance.image.name)
+    if created:
+        counts.adjust_count(counts.posts_scope(), 1)
+        update_author_counts(instance.author_id, 1)
+        stats.post_created(instance)
+    if old_group_id != instance.group_id:
+        update_group_counts(old_group_id, instance.group_id)
+        if not created:
+            stats.post_group_changed(instance, old_group_id)
+    outbox.record('post', instance, 'created' if created else 'updated',
+                  author_id=instance.author_id, group_id=instance.group_id)
+    if created and instance.group_id:
+        channel = streams.group_posts_channel(instance.group_id)
+        transaction.on_commit(lambda: streams.get_broker().notify(
+            channel, Post, instance.pk
+        ))
+    remember_post_state(sender, instance)
+
+
+# При переносе в архив пост остаётся в статистике и ссылается на картинку,
+# из горячих выборок и их счётчиков он уходит.
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    if not is_archiving():
+        stats.post_deleting(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    update_group_counts(instance.group_id, None)
+    counts.adjust_count(counts.posts_scope(), -1)
+    update_author_counts(instance.author_id, -1)
+    if not is_archiving():
+        update_image_refs(instance._initial_image, None)
+        stats.post_deleted(instance)
+        outbox.record('post', instance, 'deleted',
+                      author_id=instance.author_id,
+                      group_id=instance.group_id)
+
+
+def comment_payload(comment):
+    return {'post_id': comment.post_id, 'parent_id': comment.parent_id,
+            'author_id': comment.author_id}
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counts.adjust_count(counts.post_comments_scope(instance.post_id), 1)
+        if instance.parent_id is None:
+            counts.adjust_count(counts.post_threads_scope(instance.post_id),
+                                1)
+        stats.comment_created(instance)
+        trending.record_comment(instance.post_id, instance.created)
+        channel = streams.post_comments_channel(instance.post_id)
+        transaction.on_commit(lambda: streams.get_broker().notify(
+            channel, Comment, instance.pk
+        ))
+    outbox.record('comment', instance, 'created' if created else 'updated',
+                  **comment_payload(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counts.adjust_count(counts.post_comments_scope(instance.post_id), -1)
+    if instance.parent_id is None:
+        counts.adjust_count(counts.post_threads_scope(instance.post_id), -1)
+    if is_archiving():
+        return
+    stats.comment_deleted(instance)
+    if instance.post_id not in stats.deleting_posts():
+        trending.record_comment(instance.post_id, instance.created, -1)
+    outbox.record('comment', instance, 'deleted',
+                  **comment_payload(instance))
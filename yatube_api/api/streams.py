@@ -0,0 +1,239 @@
+import json
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from posts.models import Comment, OutboxEvent, Post
+from .compiled import get_plan
+from .serializers import CommentSerializer, PostSerializer
+
+
+def post_comments_channel(post_id):
+    return f'post:{post_id}:comments'
+
+
+def group_posts_channel(group_id):
+    return f'group:{group_id}:posts'
+
+
+def render_events(model, pks):
+    """Пары ``(id, json)``: объект сериализуется один раз для всех
+    подписчиков.
+    """
+    serializer_class = {Comment: CommentSerializer, Post: PostSerializer}
+    plan = get_plan(serializer_class[model])
+    return [
+        (item['id'], json.dumps(item, cls=DjangoJSONEncoder,
+                                ensure_ascii=False))
+        for item in plan.serialize(
+            model.objects.filter(pk__in=pks).order_by('pk')
+        )
+    ]
+
+
+class Subscription:
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Медленный клиент догонит пропущенное из базы.
+            self.overflowed = True
+
+
+class LocalBroker:
+    """Рассылка событий подписчикам внутри процесса.
+
+    Ждущий подписчик блокируется на своей очереди и не тратит ни
+    процессор, ни запросы к базе.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    @contextmanager
+    def subscribe(self, channel):
+        subscription = Subscription(settings.SSE_BUFFER_SIZE)
+        with self.lock:
+            self.subscriptions[channel].add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self.lock:
+                self.subscriptions[channel].discard(subscription)
+                if not self.subscriptions[channel]:
+                    del self.subscriptions[channel]
+
+    def has_subscribers(self, channel):
+        return channel in self.subscriptions
+
+    def publish(self, channel, events):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            for event in events:
+                subscription.put(event)
+
+    def notify(self, channel, model, pk):
+        """Вызывается после фиксации транзакции с новым объектом."""
+        if self.has_subscribers(channel):
+            self.publish(channel, render_events(model, [pk]))
+
+
+class OutboxBroker(LocalBroker):
+    """Брокер для нескольких процессов: новые объекты берутся из outbox,
+    который читает один фоновый поток на процесс.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.poller = None
+
+    @contextmanager
+    def subscribe(self, channel):
+        with self.lock:
+            if self.poller is None:
+                self.poller = threading.Thread(target=self.poll, daemon=True)
+                self.poller.start()
+        with super().subscribe(channel) as subscription:
+            yield subscription
+
+    def notify(self, channel, model, pk):
+        pass
+
+    def poll(self):
+        last_id = self.latest_id()
+        while True:
+            time.sleep(settings.SSE_POLL_INTERVAL)
+            try:
+                last_id = self.poll_step(last_id)
+            finally:
+                connections.close_all()
+
+    def latest_id(self):
+        return OutboxEvent.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def poll_step(self, last_id):
+        """Один шаг опроса; возвращает новую позицию в outbox."""
+        if not self.subscriptions:
+            # События без подписчиков никому не нужны: позиция двигается,
+            # чтобы первому подписчику не раздать накопившийся хвост.
+            return self.latest_id()
+        return self.poll_once(last_id)
+
+    def poll_once(self, last_id):
+        events = list(OutboxEvent.objects.filter(
+            pk__gt=last_id, event_type='created',
+            aggregate_type__in=('post', 'comment')
+        ).order_by('pk').values_list('pk', 'aggregate_type',
+                                     'aggregate_id', 'payload')[:1000])
+        channels = defaultdict(lambda: defaultdict(list))
+        for _, aggregate_type, aggregate_id, payload in events:
+            if aggregate_type == 'comment':
+                channel = post_comments_channel(payload['post_id'])
+                model = Comment
+            elif payload.get('group_id'):
+                channel = group_posts_channel(payload['group_id'])
+                model = Post
+            else:
+                continue
+            if self.has_subscribers(channel):
+                channels[model][channel].append(aggregate_id)
+        for model, by_channel in channels.items():
+            rendered = dict(render_events(
+                model, [pk for pks in by_channel.values() for pk in pks]
+            ))
+            for channel, pks in by_channel.items():
+                self.publish(channel, [(pk, rendered[pk]) for pk in pks
+                                       if pk in rendered])
+        return events[-1][0] if events else last_id
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.SSE_BROKER)()
+
+
+def format_event(pk, data):
+    return f'id: {pk}\ndata: {data}\n\n'
+
+
+def event_stream(channel, backfill, last_id):
+    """Поток SSE: сначала пропущенное после ``last_id`` из базы, затем
+    новые события; при простое — комментарии-пульс.
+    """
+    deadline = time.monotonic() + settings.SSE_MAX_DURATION
+    # Подписываемся до чтения базы, чтобы не потерять события между ними.
+    with get_broker().subscribe(channel) as subscription:
+        yield f'retry: {settings.SSE_RETRY_MS}\n\n'
+        events = render_backfill(backfill, last_id)
+        while True:
+            for pk, data in events:
+                if last_id is None or pk > last_id:
+                    yield format_event(pk, data)
+                    last_id = pk
+            if time.monotonic() > deadline:
+                # Клиент переподключится с Last-Event-ID.
+                return
+            try:
+                event = subscription.queue.get(timeout=settings.SSE_HEARTBEAT)
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                events = ()
+                continue
+            if subscription.overflowed:
+                subscription.overflowed = False
+                since = event[0] - 1 if last_id is None else last_id
+                events = render_backfill(backfill, since)
+            else:
+                events = (event,)
+
+
+def render_backfill(backfill, last_id):
+    if last_id is None:
+        return ()
+    queryset = backfill.filter(pk__gt=last_id).order_by('pk')
+    pks = list(queryset.values_list('pk', flat=True)
+               [:settings.SSE_BACKFILL_LIMIT])
+    try:
+        return render_events(queryset.model, pks) if pks else ()
+    finally:
+        # Соединение не держим, пока клиент ждёт событий.
+        connections.close_all()
+
+
+def last_event_id(request):
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.GET.get(
+        'last_event_id'
+    )
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def event_stream_response(request, channel, backfill):
+    response = StreamingHttpResponse(
+        event_stream(channel, backfill, last_event_id(request)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,106 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.utils import timezone
+
+from posts.models import RevokedToken
+
+ACCESS_SALT = 'api.tokens.access'
+REFRESH_SALT = 'api.tokens.refresh'
+
+User = get_user_model()
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def get_denylist():
+    return caches[settings.SIGNED_TOKEN_DENYLIST_CACHE]
+
+
+def denylist_key(jti):
+    return f'token:denied:{jti}'
+
+
+def issue_tokens(user):
+    """Выдаёт пару подписанных токенов: короткий access и refresh."""
+    access = signing.dumps({
+        'uid': user.pk,
+        'usr': user.get_username(),
+        'stf': user.is_staff,
+        'jti': uuid.uuid4().hex,
+    }, salt=ACCESS_SALT)
+    refresh = signing.dumps({
+        'uid': user.pk,
+        'jti': uuid.uuid4().hex,
+    }, salt=REFRESH_SALT)
+    return {'access': access, 'refresh': refresh}
+
+
+def verify(token, salt, max_age, is_revoked):
+    try:
+        payload = signing.loads(token, salt=salt, max_age=max_age)
+    except signing.SignatureExpired:
+        raise InvalidToken('Срок действия токена истёк.')
+    except signing.BadSignature:
+        raise InvalidToken('Недействительный токен.')
+    if is_revoked(payload['jti']):
+        raise InvalidToken('Токен отозван.')
+    return payload
+
+
+def verify_access(token):
+    """Проверка access-токена без запросов к базе."""
+    return verify(token, ACCESS_SALT, settings.SIGNED_TOKEN_ACCESS_TTL,
+                  lambda jti: get_denylist().get(denylist_key(jti)))
+
+
+def verify_refresh(token):
+    return verify(
+        token, REFRESH_SALT, settings.SIGNED_TOKEN_REFRESH_TTL,
+        lambda jti: RevokedToken.objects.filter(jti=jti).exists()
+    )
+
+
+def deny(payload, salt):
+    """Отзывает токен; ``False``, если он уже был отозван раньше.
+
+    Access-токен попадает в кеш не дольше своего короткого срока жизни.
+    Refresh-токен записывается в таблицу: вставка строки с уникальным
+    ``jti`` атомарна, поэтому обмен проверяет результат и не выдаёт
+    вторую пару.
+    """
+    if salt == ACCESS_SALT:
+        return get_denylist().add(denylist_key(payload['jti']), True,
+                                  settings.SIGNED_TOKEN_ACCESS_TTL)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                jti=payload['jti'],
+                expires=timezone.now() + timedelta(
+                    seconds=settings.SIGNED_TOKEN_REFRESH_TTL
+                ),
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def purge_revoked():
+    """Удаляет записи об истёкших токенах, возвращает их число."""
+    return RevokedToken.objects.filter(expires__lt=timezone.now()).delete()[0]
+
+
+def token_user(payload):
+    """Пользователь из полей токена, без обращения к базе."""
+    user = User(pk=payload['uid'], is_staff=payload['stf'], is_active=True)
+    setattr(user, User.USERNAME_FIELD, payload['usr'])
+    user._state.adding = False
+    user._state.db = DEFAULT_DB_ALIAS
+    return user
@@ -0,0 +1,65 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import ImageFile
+from rest_framework import serializers
+
+# Заголовка картинки в первых килобайтах достаточно, чтобы узнать размеры.
+HEADER_PROBE_SIZE = 64 * 1024
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Потоково проверяет размер и разрешение картинки и считает её хеш.
+
+    Слишком большой файл отклоняется на первом лишнем чанке, не дочитывая
+    тело запроса.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        # Запас на остальные поля формы.
+        if content_length > settings.IMAGE_UPLOAD_MAX_SIZE + 64 * 1024:
+            self.reject('Размер файла превышает допустимый.')
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.parser = ImageFile.Parser()
+        self.probing = True
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.reject('Размер файла превышает допустимый.')
+        self.hasher.update(raw_data)
+        if self.probing:
+            self.probe(raw_data)
+        self.file.write(raw_data)
+
+    def probe(self, raw_data):
+        try:
+            self.parser.feed(raw_data)
+        except Exception:
+            # Неверный формат отклонит валидация ImageField.
+            self.probing = False
+            return
+        image = self.parser.image
+        if image is not None:
+            self.probing = False
+            max_width, max_height = settings.IMAGE_UPLOAD_MAX_DIMENSIONS
+            if image.width > max_width or image.height > max_height:
+                self.reject('Разрешение картинки превышает допустимое.')
+        elif self.size >= HEADER_PROBE_SIZE:
+            self.probing = False
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.content_hash = self.hasher.hexdigest()
+        return file
+
+    def reject(self, message):
+        if getattr(self, 'file', None) is not None:
+            self.file.close()
+        raise serializers.ValidationError({'image': [message]})
@@ -2,16 +2,23 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
 
-from .views import PostViewSet, GroupViewSet, CommentViewSet
+from .views import (CommentViewSet, GroupViewSet, PostViewSet,
+                    TokenObtainView, TokenRefreshView, TokenRevokeView,
+                    UserViewSet)
 
 
 router = DefaultRouter()
 router.register('posts', PostViewSet, basename='posts')
 router.register('groups', GroupViewSet, basename='groups')
+router.register('users', UserViewSet, basename='users')
 router.register('posts/(?P<post_id>\\d+)/comments', CommentViewSet,
                 basename='comments')
 
 urlpatterns = [
     path('v1/', include(router.urls)),
-    path('v1/api-token-auth/', obtain_auth_token, name='auth_token')
+    path('v1/api-token-auth/', obtain_auth_token, name='auth_token'),
+    path('v1/token/', TokenObtainView.as_view(), name='token_obtain'),
+    path('v1/token/refresh/', TokenRefreshView.as_view(),
+         name='token_refresh'),
+    path('v1/token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
 ]
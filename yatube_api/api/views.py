@@ -1,33 +1,359 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions, viewsets
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from posts.models import Post, Group
-from .serializers import PostSerializer, CommentSerializer, GroupSerializer
+from posts import counts
+from posts.archive import get_archived_post
+from posts.models import Post, Group, GroupStats, path_segment
+from posts.trending import trending as trending_posts
+from .concurrency import VersionedUpdateMixin
+from .idempotency import IdempotentCreateMixin
+from .mixins import (AtomicWriteMixin, FragmentCacheListMixin,
+                     FragmentCacheMixin)
+from .pagination import CachedCountPagination
+from .renderers import EventStreamRenderer
+from . import streams, tokens
+from .serializers import (ArchivedCommentSerializer, ArchivedPostSerializer,
+                          CommentSerializer, GroupSerializer,
+                          GroupStatsSerializer, PostSerializer,
+                          RefreshTokenSerializer, UserSerializer)
+from .throttling import ArchiveRateThrottle
 from .permissions import IsAuthorOrReadOnly
+from .uploads import BoundedImageUploadHandler
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all()
+class ArchiveFallbackMixin:
+    # Архив читается медленнее и отдельно ограничен по частоте запросов.
+
+    def get_archived_post(self, pk):
+        throttle = ArchiveRateThrottle()
+        if not throttle.allow_request(self.request, self):
+            self.throttled(self.request, throttle.wait())
+        archived = get_archived_post(pk)
+        if archived is None:
+            raise Http404
+        return archived
+
+    def archived_response(self, data):
+        return Response(data, headers={'X-Archived': 'true'})
+
+
+def nest(items):
+    """Собирает плоский список комментариев в порядке путей в дерево."""
+    nodes, roots = {}, []
+    for item in items:
+        item = nodes[item['id']] = {**item, 'replies': []}
+        parent = nodes.get(item['parent'])
+        (parent['replies'] if parent else roots).append(item)
+    return roots
+
+
+class PostViewSet(IdempotentCreateMixin, VersionedUpdateMixin,
+                  AtomicWriteMixin, ArchiveFallbackMixin,
+                  FragmentCacheListMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.order_by('pk')
     serializer_class = PostSerializer
     permission_classes = (permissions.IsAuthenticated, IsAuthorOrReadOnly,)
+    pagination_class = CachedCountPagination
+    list_select_related = ('author', 'group')
+    fragment_file_fields = ('image',)
+
+    def get_count_scope(self):
+        return counts.posts_scope()
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            archived = self.get_archived_post(kwargs['pk'])
+            return self.archived_response(ArchivedPostSerializer(
+                archived, context=self.get_serializer_context()
+            ).data)
+
+    @action(detail=False)
+    def trending(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        limit = max(1, min(limit, settings.TRENDING_MAX_SIZE))
+        ranked = trending_posts(limit)
+        scores = dict(ranked)
+        queryset = self.get_queryset()
+        versions = dict(queryset.filter(pk__in=scores).values_list(
+            'pk', 'version'
+        ))
+        data = self.get_fragments(queryset, [
+            (post_id, versions[post_id]) for post_id, _ in ranked
+            if post_id in versions
+        ])
+        for item in data:
+            item['score'] = round(scores[item['id']], 4)
+        return Response(data)
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [BoundedImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
 
-class GroupViewSet(viewsets.ReadOnlyModelViewSet):
+class GroupViewSet(FragmentCacheMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
+    pagination_class = CachedCountPagination
+
+    def get_serializer_class(self):
+        if self.action == 'posts':
+            return PostSerializer
+        return super().get_serializer_class()
+
+    def get_list_select_related(self):
+        if self.action == 'posts':
+            return PostViewSet.list_select_related
+        return super().get_list_select_related()
+
+    def get_fragment_file_fields(self):
+        if self.action == 'posts':
+            return PostViewSet.fragment_file_fields
+        return super().get_fragment_file_fields()
+
+    def get_count_scope(self):
+        if self.action == 'posts':
+            return counts.group_posts_scope(self.group.pk)
+        return None
+
+    def get_object(self):
+        """Группа по slug или id; slug проверяется первым, чтобы группу
+        с числовым slug не закрывала группа с таким id.
+        """
+        value = self.kwargs['pk']
+        queryset = self.filter_queryset(self.get_queryset())
+        group = queryset.filter(slug=value).first()
+        if group is None and value.isdigit():
+            group = queryset.filter(pk=value).first()
+        if group is None:
+            raise Http404
+        self.check_object_permissions(self.request, group)
+        return group
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        group = self.get_object()
+        group_stats = (GroupStats.objects.filter(group=group).first()
+                       or GroupStats(group=group))
+        return Response(GroupStatsSerializer(group_stats).data)
+
+    @action(detail=True)
+    def posts(self, request, pk=None):
+        """Посты группы, новые первыми."""
+        self.group = self.get_object()
+        return self.fragment_response(
+            Post.objects.filter(group=self.group).order_by('-pub_date', '-pk')
+        )
+
+    @action(detail=True,
+            renderer_classes=(EventStreamRenderer, JSONRenderer))
+    def stream(self, request, pk=None):
+        """Новые посты группы в формате Server-Sent Events."""
+        group = self.get_object()
+        return streams.event_stream_response(
+            request, streams.group_posts_channel(group.pk),
+            Post.objects.filter(group=group)
+        )
+
+
+class UserViewSet(FragmentCacheMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = get_user_model().objects.filter(
+        is_active=True
+    ).select_related('stats').order_by('pk')
+    serializer_class = UserSerializer
+    pagination_class = CachedCountPagination
+    lookup_field = 'username'
+    lookup_value_regex = r'[\w.@+-]+'
+
+    def get_serializer_class(self):
+        if self.action == 'posts':
+            return PostSerializer
+        return super().get_serializer_class()
 
+    def get_list_select_related(self):
+        if self.action == 'posts':
+            return PostViewSet.list_select_related
+        return super().get_list_select_related()
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def get_fragment_file_fields(self):
+        if self.action == 'posts':
+            return PostViewSet.fragment_file_fields
+        return super().get_fragment_file_fields()
+
+    def get_count_scope(self):
+        if self.action == 'posts':
+            return counts.author_posts_scope(self.author.pk)
+        return None
+
+    @action(detail=True)
+    def posts(self, request, username=None):
+        """Посты пользователя, новые первыми, по индексу (author, pub_date)."""
+        self.author = self.get_object()
+        return self.fragment_response(
+            Post.objects.filter(author=self.author).order_by('-pub_date',
+                                                             '-pk')
+        )
+
+
+class CommentViewSet(IdempotentCreateMixin, VersionedUpdateMixin,
+                     AtomicWriteMixin, ArchiveFallbackMixin,
+                     FragmentCacheListMixin, viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = (permissions.IsAuthenticated, IsAuthorOrReadOnly)
+    pagination_class = CachedCountPagination
+    list_select_related = ('author',)
+
+    def get_count_scope(self):
+        if self.action == 'tree':
+            return counts.post_threads_scope(self.kwargs.get('post_id'))
+        return counts.post_comments_scope(self.kwargs.get('post_id'))
+
+    def list(self, request, *args, **kwargs):
+        try:
+            return super().list(request, *args, **kwargs)
+        except Http404:
+            pass
+        archived = self.get_archived_post(kwargs['post_id'])
+        return self.archived_response(ArchivedCommentSerializer(
+            archived.comments.select_related('author').order_by('pk'),
+            many=True
+        ).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pass
+        archived = self.get_archived_post(kwargs['post_id'])
+        comment = get_object_or_404(archived.comments, pk=kwargs['pk'])
+        return self.archived_response(
+            ArchivedCommentSerializer(comment).data
+        )
+
+    @action(detail=False)
+    def tree(self, request, post_id=None):
+        """Ветки комментариев поста; страница — комментарии верхнего
+        уровня вместе со всеми ответами до глубины ``depth``.
+        """
+        depth = self.get_tree_depth()
+        try:
+            comments = self.get_queryset()
+        except Http404:
+            archived = self.get_archived_post(post_id)
+            return self.archived_response(nest(ArchivedCommentSerializer(
+                archived.comments.filter(depth__lte=depth)
+                .select_related('author').order_by('path'),
+                many=True
+            ).data))
+        roots = comments.filter(parent=None).values_list('pk', flat=True)
+        page = self.paginate_queryset(roots)
+        nodes = comments.filter(depth__lte=depth).order_by('path')
+        if page is not None:
+            # Корни страницы идут подряд, поэтому их ветки занимают один
+            # диапазон путей.
+            nodes = nodes.filter(
+                path__gte=path_segment(page[0]),
+                path__lt=path_segment(page[-1]) + '~'
+            ) if page else nodes.none()
+        data = nest(self.serialize_objects(nodes))
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=True)
+    def subtree(self, request, post_id=None, pk=None):
+        comment = self.get_object()
+        nodes = comment.subtree().filter(
+            depth__lte=comment.depth + self.get_tree_depth()
+        ).order_by('path')
+        return Response(nest(self.serialize_objects(nodes))[0])
+
+    @action(detail=False,
+            renderer_classes=(EventStreamRenderer, JSONRenderer))
+    def stream(self, request, post_id=None):
+        """Новые комментарии поста в формате Server-Sent Events."""
+        post = get_object_or_404(Post, pk=post_id)
+        return streams.event_stream_response(
+            request, streams.post_comments_channel(post.pk),
+            post.comments.all()
+        )
+
+    def get_tree_depth(self):
+        try:
+            depth = int(self.request.query_params.get(
+                'depth', settings.COMMENT_TREE_DEPTH
+            ))
+        except ValueError:
+            depth = settings.COMMENT_TREE_DEPTH
+        return max(0, min(depth, settings.COMMENT_MAX_DEPTH))
 
     def get_queryset(self):
         post = get_object_or_404(Post, pk=self.kwargs.get('post_id'))
-        return post.comments.all()
+        return post.comments.order_by('pk')
 
     def perform_create(self, serializer):
         post = get_object_or_404(Post, pk=self.kwargs.get('post_id'))
+        parent = serializer.validated_data.get('parent')
+        if parent is not None and parent.post_id != post.pk:
+            raise ValidationError(
+                {'parent': ['Комментарий относится к другому посту.']}
+            )
         serializer.save(author=self.request.user, post=post)
+
+
+class TokenObtainView(APIView):
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        serializer = AuthTokenSerializer(data=request.data,
+                                         context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        return Response(tokens.issue_tokens(serializer.validated_data['user']))
+
+
+class TokenRefreshView(APIView):
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payload = serializer.validated_data['payload']
+        user = get_user_model().objects.filter(
+            pk=payload['uid'], is_active=True
+        ).first()
+        if user is None:
+            raise AuthenticationFailed('Пользователь неактивен.')
+        if not tokens.deny(payload, tokens.REFRESH_SALT):
+            raise ValidationError({'refresh': ['Токен отозван.']})
+        return Response(tokens.issue_tokens(user))
+
+
+class TokenRevokeView(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tokens.deny(serializer.validated_data['payload'],
+                    tokens.REFRESH_SALT)
+        if isinstance(request.auth, dict):
+            tokens.deny(request.auth, tokens.ACCESS_SALT)
+        return Response(status=204)
@@ -1,15 +1,78 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from .models import BannedPhrase, Comment, ContentFlag, Group, Post
+
+
+class CachedCountPaginator(Paginator):
+    # COUNT(*) по выборке changelist кешируется на COUNT_CACHE_TIMEOUT.
 
-from .models import Comment, Group, Post
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None:
+            return super().count
+        key = 'count:admin:' + hashlib.md5(
+            str(query).encode()
+        ).hexdigest()
+        cache = caches[settings.COUNT_CACHE_ALIAS]
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+        return count
 
 
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author')
+    list_select_related = ('author', 'group')
+    search_fields = ('text',)
+    date_hierarchy = 'pub_date'
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
     search_fields = ('text',)
-    list_filter = ('pub_date',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('author', 'post', 'parent')
+    paginator = CachedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+    empty_value_display = '-пусто-'
+
+
+class BannedPhraseAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'phrase', 'action')
+    list_filter = ('action',)
+    search_fields = ('phrase',)
+
+
+class ContentFlagAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'created', 'post', 'comment', 'phrases')
+    list_select_related = ('post', 'comment')
+    raw_id_fields = ('post', 'comment')
+    date_hierarchy = 'created'
     empty_value_display = '-пусто-'
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(BannedPhrase, BannedPhraseAdmin)
+admin.site.register(ContentFlag, ContentFlagAdmin)
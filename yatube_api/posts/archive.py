@@ -0,0 +1,103 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+
+ARCHIVE_MODELS = {'archivedpost', 'archivedcomment'}
+
+_local = threading.local()
+
+
+def is_archiving():
+    return getattr(_local, 'archiving', False)
+
+
+@contextmanager
+def archiving():
+    """Удаление из горячих таблиц при переносе в архив, а не удаление."""
+    _local.archiving = True
+    try:
+        yield
+    finally:
+        _local.archiving = False
+
+
+def is_archive_model(model):
+    return (model._meta.app_label == 'posts'
+            and model._meta.model_name in ARCHIVE_MODELS)
+
+
+class ArchiveRouter:
+    """Направляет архивные таблицы в базу ``ARCHIVE_DATABASE``."""
+
+    def db_for_read(self, model, **hints):
+        if is_archive_model(model):
+            return settings.ARCHIVE_DATABASE
+        instance = hints.get('instance')
+        if instance is not None and is_archive_model(type(instance)):
+            # Авторы и группы архивных постов лежат в основной базе.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_archive_model(type(obj1)) or is_archive_model(type(obj2)):
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'posts' and model_name in ARCHIVE_MODELS:
+            return db == settings.ARCHIVE_DATABASE
+        if (db == settings.ARCHIVE_DATABASE
+                and settings.ARCHIVE_DATABASE != DEFAULT_DB_ALIAS):
+            return False
+        return None
+
+
+def archive_batch(cutoff, batch_size):
+    """Переносит в архив пачку постов старше ``cutoff`` с комментариями.
+
+    Сначала пишет архив, потом удаляет горячие строки: при сбое между
+    шагами повторный запуск допишет архив без дублей.
+    """
+    ids = list(
+        Post.objects.filter(pub_date__lt=cutoff)
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0, 0
+    archive_db = settings.ARCHIVE_DATABASE
+    posts = Post.objects.filter(pk__in=ids)
+    comments = Comment.objects.filter(post_id__in=ids)
+    with transaction.atomic(), transaction.atomic(using=archive_db):
+        ArchivedPost.objects.using(archive_db).bulk_create(
+            (ArchivedPost(id=post.id, text=post.text, pub_date=post.pub_date,
+                          author_id=post.author_id, image=post.image.name,
+                          group_id=post.group_id, version=post.version)
+             for post in posts),
+            ignore_conflicts=True
+        )
+        archived_comments = [
+            ArchivedComment(id=comment.id, author_id=comment.author_id,
+                            post_id=comment.post_id,
+                            parent_id=comment.parent_id, path=comment.path,
+                            depth=comment.depth, text=comment.text,
+                            created=comment.created, version=comment.version)
+            for comment in comments
+        ]
+        ArchivedComment.objects.using(archive_db).bulk_create(
+            archived_comments, ignore_conflicts=True
+        )
+        with archiving():
+            posts.delete()
+    return len(ids), len(archived_comments)
+
+
+def get_archived_post(pk):
+    return ArchivedPost.objects.select_related('author', 'group').filter(
+        pk=pk
+    ).first()
@@ -0,0 +1,179 @@
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from .versions import VersionCheck
+
+REJECT = 'reject'
+FLAG = 'flag'
+VERSION_NAME = 'content_filter'
+SPACES = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Регистр, «ё» и пробелы не влияют на совпадение; длина строки при
+    этом может измениться, поэтому текст сравнивается только нормализованным.
+    """
+    return SPACES.sub(' ', text.casefold().replace('ё', 'е')).strip()
+
+
+class Automaton:
+    """Автомат Ахо — Корасик: все фразы ищутся за один проход по тексту.
+
+    Состояния хранятся списками: переходы, суффиксные ссылки и найденные
+    в состоянии фразы (вместе с фразами по суффиксным ссылкам).
+    """
+
+    def __init__(self, phrases):
+        self.phrases = list(phrases)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for index, phrase in enumerate(self.phrases):
+            state = 0
+            for char in phrase:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = next_state
+            self.out[state] += (index,)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                fail = self.goto[fail].get(char, 0)
+                self.fail[next_state] = fail
+                self.out[next_state] += self.out[fail]
+
+    def finditer(self, text):
+        """Пары ``(индекс фразы, позиция конца)`` всех вхождений."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                yield index, position + 1
+
+
+def is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class ContentFilter:
+    """Собранный автомат и действие для каждой фразы."""
+
+    def __init__(self, phrases, whole_words=True):
+        normalized = {}
+        for phrase, action in phrases:
+            phrase = normalize(phrase)
+            if phrase and normalized.get(phrase) != REJECT:
+                normalized[phrase] = action
+        self.actions = normalized
+        self.automaton = Automaton(normalized)
+        self.whole_words = whole_words
+
+    def matches(self, text):
+        text = normalize(text)
+        phrases = self.automaton.phrases
+        found = set()
+        for index, end in self.automaton.finditer(text):
+            phrase = phrases[index]
+            start = end - len(phrase)
+            if self.whole_words and (
+                    (start and is_word_char(text[start - 1]))
+                    or (end < len(text) and is_word_char(text[end]))):
+                continue
+            found.add(phrase)
+        return found
+
+    def check(self, text):
+        """Фразы, найденные в тексте, по действиям."""
+        result = {REJECT: set(), FLAG: set()}
+        for phrase in self.matches(text):
+            result[self.actions[phrase]].add(phrase)
+        return result
+
+
+class FilterHolder:
+    """Фильтр процесса; пересобирается при смене метки версии в базе.
+
+    Новый автомат строится в стороне и подменяется одним присваиванием,
+    так что проверки во время пересборки идут по старому. Метку процесс
+    сверяет не чаще раза в ``VERSION_STAMP_CHECK_SECONDS``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.version = None
+        self.stamp = VersionCheck(VERSION_NAME)
+        self.filter = ContentFilter(())
+
+    def get(self):
+        version = self.stamp.current()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.filter = self.build()
+                    self.version = version
+        return self.filter
+
+    def check(self, text):
+        """Результат ``ContentFilter.check`` с запоминанием последнего
+        текста потока: валидатор и сигнал после сохранения проверяют один
+        и тот же текст, и сканируется он один раз.
+        """
+        current = self.get()
+        last = getattr(self.local, 'last', None)
+        if last is not None and last[0] is current and last[1] == text:
+            return last[2]
+        result = current.check(text)
+        self.local.last = (current, text, result)
+        return result
+
+    def build(self):
+        from .models import BannedPhrase
+
+        return ContentFilter(
+            BannedPhrase.objects.values_list('phrase', 'action'),
+            whole_words=settings.CONTENT_FILTER_WHOLE_WORDS,
+        )
+
+    def invalidate(self):
+        self.version = None
+        self.stamp.bump()
+
+    def forget(self):
+        """Следующее обращение перечитает метку и фразы из базы."""
+        self.version = None
+        self.stamp.forget()
+
+
+content_filter = FilterHolder()
+
+
+def reject_banned_phrases(value):
+    rejected = content_filter.check(value)[REJECT]
+    if rejected:
+        raise ValidationError(
+            'Текст содержит запрещённые фразы: %(phrases)s.',
+            code='banned_phrases',
+            params={'phrases': ', '.join(sorted(rejected))},
+        )
+
+
+def flagged_phrases(text):
+    return content_filter.check(text)[FLAG]
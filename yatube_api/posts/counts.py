@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def posts_scope():
+    return 'posts'
+
+
+def group_posts_scope(group_id):
+    return f'posts:group:{group_id}'
+
+
+def author_posts_scope(author_id):
+    return f'posts:author:{author_id}'
+
+
+def post_comments_scope(post_id):
+    return f'comments:post:{post_id}'
+
+
+def post_threads_scope(post_id):
+    return f'threads:post:{post_id}'
+
+
+def count_key(scope):
+    return f'count:{scope}'
+
+
+def get_cache():
+    return caches[settings.COUNT_CACHE_ALIAS]
+
+
+def is_approximate(count, exact=False):
+    return not exact and count >= settings.EXACT_COUNT_THRESHOLD
+
+
+def get_count(queryset, scope, exact=False):
+    """Возвращает число объектов выборки, по возможности без COUNT(*).
+
+    Точный подсчёт выполняется, если его запросили, если значения нет в
+    кеше или если выборка меньше ``settings.EXACT_COUNT_THRESHOLD``.
+    """
+    cache = get_cache()
+    key = count_key(scope)
+    if not exact:
+        count = cache.get(key)
+        if count is not None and is_approximate(count):
+            return count
+    count = queryset.count()
+    cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def adjust_count(scope, delta):
+    """Сдвигает закешированный счётчик после фиксации транзакции.
+
+    При откате изменение к счётчику не применяется.
+    """
+    def adjust():
+        try:
+            get_cache().incr(count_key(scope), delta)
+        except ValueError:
+            # Счётчика нет в кеше: его посчитают при следующем запросе.
+            pass
+    transaction.on_commit(adjust)
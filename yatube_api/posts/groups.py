@@ -0,0 +1,62 @@
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Group
+from .versions import VersionCheck
+
+VERSION_NAME = 'groups:map'
+
+
+class GroupMap:
+    """Группы процесса по slug и id для разбора ссылок без запросов.
+
+    Сигналы ``Group`` сбрасывают карту и меняют метку версии в базе,
+    по которой свои карты перечитывают остальные процессы; метку процесс
+    сверяет не чаще раза в ``VERSION_STAMP_CHECK_SECONDS``.
+    """
+    # Порядок полей модели: from_db раскладывает значения по нему.
+    fields = ('id', 'title', 'slug')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.stamp = VersionCheck(VERSION_NAME)
+        self.by_slug = self.by_id = {}
+
+    def load(self):
+        version = self.stamp.current()
+        if version == self.version:
+            return
+        with self.lock:
+            rows = list(Group.objects.values_list(*self.fields))
+            self.by_id = {row[0]: row for row in rows}
+            self.by_slug = {row[2]: row for row in rows}
+            self.version = version
+
+    def resolve(self, value):
+        """Группа по slug или id; ``None``, если такой нет.
+
+        Slug проверяется первым, как и в ``GroupViewSet``. Возвращает
+        экземпляр с отложенными прочими полями.
+        """
+        self.load()
+        value = str(value)
+        row = self.by_slug.get(value)
+        if row is None and value.isdigit():
+            row = self.by_id.get(int(value))
+        if row is None:
+            return None
+        return Group.from_db(DEFAULT_DB_ALIAS, self.fields, row)
+
+    def invalidate(self):
+        self.version = None
+        self.stamp.bump()
+
+    def forget(self):
+        """Следующее обращение перечитает метку и карту из базы."""
+        self.version = None
+        self.stamp.forget()
+
+
+group_map = GroupMap()
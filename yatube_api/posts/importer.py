@@ -0,0 +1,340 @@
+import csv
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from itertools import islice, zip_longest
+
+from django.contrib.auth import get_user_model
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counts, stats, trending
+from .models import (Comment, Group, ImportCheckpoint, Post, StoredImage,
+                     path_segment)
+
+User = get_user_model()
+
+KINDS = ('groups', 'posts', 'comments')
+
+
+class ImportDataError(Exception):
+    pass
+
+
+def read_rows(path):
+    """Построчно читает CSV или NDJSON (по расширению файла)."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ImportDataError(f'Некорректная дата: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@contextmanager
+def keep_dates():
+    """Отключает auto_now_add, чтобы сохранить даты из источника."""
+    fields = [Post._meta.get_field('pub_date'),
+              Comment._meta.get_field('created')]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def fast_writes():
+    """Ослабляет гарантии сброса на диск на время импорта."""
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+def tune_transaction():
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL synchronous_commit TO OFF')
+
+
+def secondary_indexes(model):
+    """Неуникальные индексы таблицы в виде ``(имя, поля)``.
+
+    Поля по убыванию записываются с ``-``, как в ``Meta.indexes``.
+    """
+    columns = {field.column: field.name
+               for field in model._meta.concrete_fields}
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+    return [
+        (name, [
+            ('-' if order == 'DESC' else '') + columns[column]
+            for column, order in zip_longest(info['columns'],
+                                             info.get('orders') or ())
+        ])
+        for name, info in constraints.items()
+        if info['index'] and not info['unique'] and not info['primary_key']
+        and all(column in columns for column in info['columns'])
+    ]
+
+
+def drop_indexes(model_classes):
+    dropped = []
+    with connection.schema_editor() as editor:
+        for model in model_classes:
+            for name, fields in secondary_indexes(model):
+                editor.remove_index(model, models.Index(fields=fields,
+                                                        name=name))
+                dropped.append((model._meta.label, name, fields))
+    return dropped
+
+
+def create_indexes(dropped):
+    from django.apps import apps
+
+    with connection.schema_editor() as editor:
+        for label, name, fields in dropped:
+            editor.add_index(apps.get_model(label),
+                             models.Index(fields=fields, name=name))
+
+
+def fill_paths(batch_size=5000):
+    """Пути комментариям верхнего уровня, вставленным без id."""
+    while True:
+        comments = list(Comment.objects.filter(path='').only('pk')
+                        [:batch_size])
+        if not comments:
+            return
+        for comment in comments:
+            comment.path = path_segment(comment.pk)
+        Comment.objects.bulk_update(comments, ['path'])
+
+
+class Importer:
+    """Массовый импорт групп, постов и комментариев.
+
+    Id постов сохраняются: по ним комментарии ссылаются на посты. Каждая
+    пачка вставляется в своей транзакции вместе со ссылками на картинки,
+    почасовыми счётчиками комментариев и контрольной точкой, поэтому
+    прерванный импорт продолжается без потерь и двойного учёта.
+    """
+
+    def __init__(self, batch_size=5000, checkpoint=None, create_users=False,
+                 defer_indexes=False, report=None):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.create_users = create_users
+        self.defer_indexes = defer_indexes
+        self.report = report or (lambda kind, done, rate: None)
+        self.state = {'done': dict.fromkeys(KINDS, 0), 'dropped': []}
+        if checkpoint:
+            self.state = ImportCheckpoint.objects.filter(
+                name=checkpoint
+            ).values_list('state', flat=True).first() or self.state
+        self.users = dict(User.objects.values_list('username', 'pk'))
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+        self.threads = {}
+        self.window_start = trending.window_start(timezone.now())
+
+    def save_checkpoint(self):
+        if self.checkpoint:
+            ImportCheckpoint.objects.update_or_create(
+                name=self.checkpoint, defaults={'state': self.state}
+            )
+
+    def run(self, sources):
+        """Импортирует файлы ``{'groups': путь, ...}`` и пересчитывает
+        производные данные. Возвращает число строк по видам.
+        """
+        if self.defer_indexes:
+            self.state['dropped'] += drop_indexes((Post, Comment))
+            self.save_checkpoint()
+        with keep_dates(), fast_writes():
+            for kind in KINDS:
+                if sources.get(kind):
+                    self.load(kind, sources[kind])
+        if self.state['dropped']:
+            create_indexes(self.state['dropped'])
+            self.state['dropped'] = []
+            self.save_checkpoint()
+        self.finish()
+        return self.state['done']
+
+    def load(self, kind, path):
+        build = getattr(self, f'build_{kind}')
+        done = self.state['done'][kind]
+        start, imported = time.perf_counter(), 0
+        for batch in batches(islice(read_rows(path), done, None),
+                             self.batch_size):
+            with transaction.atomic():
+                tune_transaction()
+                build(batch)
+                self.state['done'][kind] = done + len(batch)
+                self.save_checkpoint()
+            done += len(batch)
+            imported += len(batch)
+            self.report(kind, done,
+                        imported / (time.perf_counter() - start))
+
+    def user_ids(self, usernames):
+        missing = set(usernames) - self.users.keys()
+        if missing and not self.create_users:
+            raise ImportDataError(
+                f'Нет пользователей: {", ".join(sorted(missing))}'
+            )
+        if missing:
+            users = [User(username=username) for username in missing]
+            for user in users:
+                user.set_unusable_password()
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            self.users.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        return self.users
+
+    def group_id(self, slug):
+        if not slug:
+            return None
+        try:
+            return self.groups[slug]
+        except KeyError:
+            raise ImportDataError(f'Нет группы: {slug}')
+
+    def build_groups(self, rows):
+        Group.objects.bulk_create(
+            (Group(title=row['title'], slug=row['slug'],
+                   description=row.get('description', ''))
+             for row in rows if row['slug'] not in self.groups),
+            ignore_conflicts=True
+        )
+        self.groups.update(Group.objects.filter(
+            slug__in=[row['slug'] for row in rows]
+        ).values_list('slug', 'pk'))
+
+    def build_posts(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        posts, images = [], Counter()
+        for row in rows:
+            image = row.get('image') or None
+            posts.append(Post(
+                id=row.get('id') or None, text=row['text'],
+                pub_date=parse_date(row.get('pub_date')),
+                author_id=users[row['author']],
+                group_id=self.group_id(row.get('group')), image=image,
+            ))
+            if image:
+                images[image] += 1
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+        for name, refs in images.items():
+            updated = StoredImage.objects.filter(name=name).update(
+                refs=F('refs') + refs
+            )
+            if not updated:
+                StoredImage.objects.create(name=name, refs=refs)
+
+    def thread_positions(self, rows):
+        """Пути и глубины родителей из пачки: из памяти или одним
+        запросом для родителей из прошлых запусков.
+        """
+        parents = {int(row['parent']) for row in rows if row.get('parent')}
+        missing = parents - self.threads.keys()
+        self.threads.update(
+            (pk, (path, depth)) for pk, path, depth in Comment.objects.filter(
+                pk__in=missing
+            ).values_list('pk', 'path', 'depth')
+        )
+        return self.threads
+
+    def build_comments(self, rows):
+        users = self.user_ids(row['author'] for row in rows)
+        threads = self.thread_positions(rows)
+        comments, buckets = [], Counter()
+        for row in rows:
+            comment = Comment(
+                id=row.get('id') or None, text=row['text'],
+                post_id=int(row['post']), author_id=users[row['author']],
+                created=parse_date(row.get('created')),
+            )
+            if row.get('parent'):
+                if comment.id is None:
+                    raise ImportDataError('Для ответов нужен id комментария.')
+                comment.parent_id = int(row['parent'])
+                try:
+                    path, depth = threads[comment.parent_id]
+                except KeyError:
+                    raise ImportDataError(
+                        f'Нет комментария {comment.parent_id}'
+                    )
+                comment.depth = depth + 1
+            else:
+                path = ''
+            if comment.id is not None:
+                comment.path = path + path_segment(int(comment.id))
+                threads[int(comment.id)] = (comment.path, comment.depth)
+            comments.append(comment)
+            if comment.created >= self.window_start:
+                buckets[comment.post_id,
+                        trending.bucket_hour(comment.created)] += 1
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        trending.record_buckets(buckets)
+        keys = [counts.count_key(scope(post_id))
+                for post_id in {comment.post_id for comment in comments}
+                for scope in (counts.post_comments_scope,
+                              counts.post_threads_scope)]
+        transaction.on_commit(lambda: counts.get_cache().delete_many(keys))
+
+    def finish(self):
+        """Пересчитывает то, что при поштучном сохранении ведут сигналы."""
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [User, Group, Post, Comment]):
+                cursor.execute(sql)
+        fill_paths()
+        stats.rebuild()
+        stats.rebuild_users()
+        counts.get_cache().delete_many(
+            [counts.count_key(counts.posts_scope())]
+            + [counts.count_key(counts.group_posts_scope(group_id))
+               for group_id in self.groups.values()]
+            + [counts.count_key(counts.author_posts_scope(user_id))
+               for user_id in self.users.values()]
+        )
+        trending.rebuild()
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = ('Переносит старые посты с комментариями в архивные таблицы '
+            'пачками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Возраст поста в днях для переноса.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Пауза между пачками в секундах.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total_posts = total_comments = 0
+        while True:
+            posts, comments = archive_batch(cutoff, options['batch_size'])
+            if not posts:
+                break
+            total_posts += posts
+            total_comments += comments
+            self.stdout.write(f'Перенесено постов: {total_posts}, '
+                              f'комментариев: {total_comments}')
+            time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {total_posts} постов, {total_comments} комментариев.'
+        ))
@@ -0,0 +1,63 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.content_filter import REJECT, ContentFilter, normalize
+
+
+def random_word(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает автомат Ахо — Корасик с проверкой каждой фразы '
+            'через `in` на случайных фразах и текстах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--phrases', type=int, default=20000)
+        parser.add_argument('--text-length', type=int, default=2000,
+                            help='Длина текста в словах.')
+        parser.add_argument('--texts', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        phrases = {
+            ' '.join(random_word(rng) for _ in range(rng.randint(1, 3)))
+            for _ in range(options['phrases'])
+        }
+        texts = [
+            ' '.join(random_word(rng)
+                     for _ in range(options['text_length']))
+            for _ in range(options['texts'])
+        ]
+
+        start = time.perf_counter()
+        content_filter = ContentFilter(
+            ((phrase, REJECT) for phrase in phrases), whole_words=False
+        )
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = [content_filter.matches(text) for text in texts]
+        automaton = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive = []
+        for text in texts:
+            text = normalize(text)
+            naive.append({phrase for phrase in phrases if phrase in text})
+        baseline = time.perf_counter() - start
+
+        assert fast == naive, 'Результаты автомата и перебора расходятся.'
+        per_text = 1000 / len(texts)
+        self.stdout.write(
+            f'Фраз: {len(phrases)}, сборка автомата: {build:.2f} с\n'
+            f'Автомат: {automaton * per_text:.2f} мс на текст\n'
+            f'Перебор: {baseline * per_text:.2f} мс на текст'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {baseline / automaton:.1f}x'
+        ))
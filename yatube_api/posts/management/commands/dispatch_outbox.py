@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import outbox
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Доставляет события outbox пачками и публикует метрики '
+            'очереди.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', help='file:<путь>, http(s)://<адрес>.')
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза при пустой очереди в секундах.')
+        parser.add_argument('--max-backoff', type=float, default=60.0)
+        parser.add_argument('--once', action='store_true',
+                            help='Доставить накопленное и выйти.')
+
+    def handle(self, *args, **options):
+        try:
+            sink = outbox.get_sink(options['sink'])
+        except ValueError as error:
+            raise CommandError(error)
+        backoff = options['interval']
+        delivered = failures = 0
+        start = last_purge = time.perf_counter()
+        while True:
+            batch_start = time.perf_counter()
+            try:
+                sent = outbox.dispatch_batch(sink, options['batch_size'])
+            except Exception as error:
+                failures += 1
+                if options['once']:
+                    raise CommandError(f'Ошибка доставки: {error!r}')
+                self.stderr.write(f'Ошибка доставки: {error!r}')
+                time.sleep(backoff)
+                backoff = min(backoff * 2, options['max_backoff'])
+                continue
+            backoff = options['interval']
+            delivered += sent
+            metrics = outbox.metrics(
+                delivered=delivered, failures=failures,
+                batch=sent,
+                batch_seconds=round(time.perf_counter() - batch_start, 3),
+                rate=round(delivered / (time.perf_counter() - start), 1),
+            )
+            outbox.publish(metrics)
+            if sent:
+                self.stdout.write(
+                    f'Доставлено: {delivered}, в очереди: '
+                    f'{metrics["pending"]}, отставание: '
+                    f'{metrics["lag_seconds"]:.1f} с'
+                )
+            elif options['once']:
+                break
+            else:
+                if time.perf_counter() - last_purge > PURGE_INTERVAL:
+                    outbox.purge()
+                    last_purge = time.perf_counter()
+                time.sleep(options['interval'])
+        outbox.purge()
+        self.stdout.write(self.style.SUCCESS(f'Готово: {delivered}.'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import KINDS, Importer, ImportDataError
+
+
+class Command(BaseCommand):
+    help = ('Массово загружает группы, посты и комментарии из CSV или '
+            'NDJSON в обход сигналов и пересчитывает агрегаты.')
+
+    def add_arguments(self, parser):
+        for kind in KINDS:
+            parser.add_argument(f'--{kind}', help=f'Файл: {kind}.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--checkpoint',
+                            help='Имя контрольной точки для продолжения.')
+        parser.add_argument('--create-users', action='store_true',
+                            help='Создавать неизвестных авторов.')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='Строить индексы постов и комментариев '
+                                 'после загрузки.')
+
+    def handle(self, *args, **options):
+        sources = {kind: options[kind] for kind in KINDS if options[kind]}
+        if not sources:
+            raise CommandError('Укажите хотя бы один файл для импорта.')
+        importer = Importer(
+            batch_size=options['batch_size'],
+            checkpoint=options['checkpoint'],
+            create_users=options['create_users'],
+            defer_indexes=options['defer_indexes'],
+            report=self.report,
+        )
+        try:
+            done = importer.run(sources)
+        except ImportDataError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS(
+            'Готово: ' + ', '.join(f'{kind} {done[kind]}' for kind in KINDS)
+        ))
+
+    def report(self, kind, done, rate):
+        self.stdout.write(f'{kind}: {done} строк, {rate:.0f} строк/с')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику групп с нуля или сверяет её.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify', action='store_true',
+            help='Только сверить сохранённые агрегаты с пересчётом.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            stats.rebuild()
+            self.stdout.write(self.style.SUCCESS('Статистика пересчитана.'))
+            return
+        mismatches = stats.verify()
+        for group_id, (stored, expected) in mismatches.items():
+            self.stdout.write(
+                f'Группа {group_id}: сохранено {stored}, ожидалось {expected}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождения в {len(mismatches)} группах.'
+            )
+        self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
@@ -0,0 +1,39 @@
+# Generated by Django 3.2 on 2026-10-19 14:27
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def count_image_refs(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    refs = (Post.objects.exclude(image='').exclude(image__isnull=True)
+            .values('image').annotate(refs=Count('pk')))
+    StoredImage.objects.bulk_create(
+        StoredImage(name=row['image'], refs=row['refs']) for row in refs
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_image_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refs', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to=posts.storage.post_image_path),
+        ),
+        migrations.RunPython(count_image_refs, migrations.RunPython.noop),
+    ]
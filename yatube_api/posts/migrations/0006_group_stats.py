@@ -0,0 +1,77 @@
+# Generated by Django 3.2 on 2026-10-19 14:31
+
+from collections import Counter
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorActivity = apps.get_model('posts', 'GroupAuthorActivity')
+    stats = {pk: GroupStats(group_id=pk)
+             for pk in Group.objects.values_list('pk', flat=True)}
+    activity = Counter()
+    sources = (
+        ('Post', 'group', 'pub_date', 'posts_count'),
+        ('Comment', 'post__group', 'created', 'comments_count'),
+    )
+    for name, group_field, date_field, counter in sources:
+        model = apps.get_model('posts', name)
+        for row in model.objects.exclude(**{group_field: None}).values(
+                group_field, 'author').annotate(total=Count('pk'),
+                                                last=Max(date_field)):
+            group_stats = stats[row[group_field]]
+            setattr(group_stats, counter,
+                    getattr(group_stats, counter) + row['total'])
+            group_stats.last_activity = max(filter(None, (
+                group_stats.last_activity, row['last']
+            )))
+            activity[row[group_field], row['author']] += row['total']
+    for group_id, _ in activity:
+        stats[group_id].authors_count += 1
+    GroupStats.objects.bulk_create(stats.values(), batch_size=1000)
+    GroupAuthorActivity.objects.bulk_create(
+        (GroupAuthorActivity(group_id=group_id, author_id=author_id,
+                             activity=total)
+         for (group_id, author_id), total in activity.items()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0005_post_pub_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.group')),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+                ('authors_count', models.PositiveIntegerField(default=0)),
+                ('last_activity', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorActivity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity', models.PositiveIntegerField(default=0)),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_activity', to=settings.AUTH_USER_MODEL)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_activity', to='posts.group')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthoractivity',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='unique_group_author_activity'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2 on 2026-10-19 14:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_group_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostActivityBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(db_index=True)),
+                ('comments', models.PositiveIntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activity_buckets', to='posts.post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postactivitybucket',
+            constraint=models.UniqueConstraint(fields=('post', 'hour'), name='unique_post_activity_hour'),
+        ),
+    ]
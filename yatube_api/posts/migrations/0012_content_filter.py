@@ -0,0 +1,43 @@
+# Generated by Django 3.2 on 2026-10-19 14:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.content_filter
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BannedPhrase',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrase', models.CharField(max_length=200, unique=True)),
+                ('action', models.CharField(choices=[('reject', 'Отклонять'), ('flag', 'Отмечать для модерации')], default='reject', max_length=16)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='text',
+            field=models.TextField(validators=[posts.content_filter.reject_banned_phrases]),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='text',
+            field=models.TextField(validators=[posts.content_filter.reject_banned_phrases]),
+        ),
+        migrations.CreateModel(
+            name='ContentFlag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phrases', models.JSONField(default=list)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='posts.comment')),
+                ('post', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='flags', to='posts.post')),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2 on 2026-10-19 15:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    stats = {pk: UserStats(user_id=pk)
+             for pk in User.objects.values_list('pk', flat=True)}
+    # Архив остаётся в счётчиках; архивные строки удалённых
+    # пользователей пропускаем.
+    sources = (
+        ('Post', 'pub_date', 'posts_count', 'last_post_at'),
+        ('ArchivedPost', 'pub_date', 'posts_count', 'last_post_at'),
+        ('Comment', 'created', 'comments_count', 'last_comment_at'),
+        ('ArchivedComment', 'created', 'comments_count', 'last_comment_at'),
+    )
+    for name, date_field, counter, last_field in sources:
+        model = apps.get_model('posts', name)
+        for row in model.objects.values('author').annotate(
+                total=Count('pk'), last=Max(date_field)):
+            user_stats = stats.get(row['author'])
+            if user_stats is None:
+                continue
+            setattr(user_stats, counter,
+                    getattr(user_stats, counter) + row['total'])
+            setattr(user_stats, last_field, max(filter(None, (
+                getattr(user_stats, last_field), row['last']
+            ))))
+    UserStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_content_filter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('comments_count', models.PositiveIntegerField(default=0)),
+                ('last_post_at', models.DateTimeField(blank=True, null=True)),
+                ('last_comment_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_revoked_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('state', models.JSONField()),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
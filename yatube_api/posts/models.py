@@ -1,5 +1,11 @@
+import uuid
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import models, transaction
+
+from .content_filter import FLAG, REJECT, reject_banned_phrases
+from .storage import image_storage, post_image_path
 
 User = get_user_model()
 
@@ -13,34 +19,380 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
-    text = models.TextField()
+class VersionedModel(models.Model):
+    """Модель с номером версии, который растёт при каждом сохранении.
+
+    Версия увеличивается в самом UPDATE, поэтому два одновременных
+    сохранения без If-Match не получат одну и ту же версию.
+    """
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+
+    def _save_table(self, raw=False, cls=None, force_insert=False,
+                    force_update=False, using=None, update_fields=None):
+        if self._state.adding or raw or force_insert:
+            return super()._save_table(raw, cls, force_insert, force_update,
+                                       using, update_fields)
+        self.version = models.F('version') + 1
+        updated = super()._save_table(raw, cls, force_insert, force_update,
+                                      using, update_fields)
+        # Новое значение нужно подписчикам post_save (ETag, outbox).
+        self.version = type(self)._base_manager.using(using).filter(
+            pk=self.pk
+        ).values_list('version', flat=True).get()
+        return updated
+
+
+class Post(VersionedModel):
+    text = models.TextField(validators=[reject_banned_phrases])
     pub_date = models.DateTimeField(
-        'Дата публикации', auto_now_add=True
+        'Дата публикации', auto_now_add=True, db_index=True
     )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='posts'
     )
     image = models.ImageField(
-        upload_to='posts/', null=True, blank=True
+        upload_to=post_image_path, storage=image_storage,
+        null=True, blank=True, db_index=True
     )  # поле для картинки
     group = models.ForeignKey(
         Group, on_delete=models.SET_NULL,
         related_name='posts', blank=True, null=True
     )
 
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', '-pub_date'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date'),
+                         name='post_group_pub_date_idx'),
+        )
+
     def __str__(self):
         return self.text
 
 
-class Comment(models.Model):
+PATH_SEGMENT_LENGTH = 10
+
+
+def path_segment(pk):
+    """Сегмент материализованного пути: id фиксированной ширины, чтобы
+    сортировка по пути давала обход дерева в глубину.
+    """
+    return f'{pk:0{PATH_SEGMENT_LENGTH}d}'
+
+
+class Comment(VersionedModel):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='comments'
     )
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name='comments'
     )
-    text = models.TextField()
+    parent = models.ForeignKey(
+        'self', on_delete=models.CASCADE, related_name='replies',
+        blank=True, null=True
+    )
+    path = models.CharField(max_length=255, blank=True, editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    text = models.TextField(validators=[reject_banned_phrases])
     created = models.DateTimeField(
         'Дата добавления', auto_now_add=True, db_index=True
     )
+
+    class Meta:
+        indexes = (models.Index(fields=('post', 'path'),
+                                name='comment_post_path_idx'),)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.parent_id:
+            self.depth = self.parent.depth + 1
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if adding and not self.path:
+                # Путь содержит собственный id, поэтому дописывается
+                # после вставки.
+                self.path = (self.parent.path if self.parent_id
+                             else '') + path_segment(self.pk)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def subtree(self):
+        """Комментарий и все ответы на него одним запросом по индексу."""
+        return Comment.objects.filter(
+            post_id=self.post_id, path__gte=self.path,
+            path__lt=self.path + '~'
+        )
+
+
+class StoredImage(models.Model):
+    """Счётчик ссылок постов на файл в общем хранилище картинок."""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def retain(cls, name):
+        stored, created = cls.objects.get_or_create(
+            name=name, defaults={'refs': 1}
+        )
+        if not created:
+            cls.objects.filter(pk=stored.pk).update(refs=models.F('refs') + 1)
+
+    @classmethod
+    def release(cls, name):
+        # Строка с refs=0 живёт до удаления файла: на ней сходятся
+        # блокировки удаления и повторной загрузки того же содержимого.
+        cls.objects.filter(name=name, refs__gt=0).update(
+            refs=models.F('refs') - 1
+        )
+        if cls.objects.filter(name=name, refs=0).exists():
+            transaction.on_commit(lambda: cls.delete_file(name))
+
+    @classmethod
+    def delete_file(cls, name):
+        with transaction.atomic():
+            stored = cls.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if stored is None or stored.refs:
+                # На файл снова сослались после освобождения.
+                return
+            try:
+                image_storage.delete(name)
+            except SuspiciousFileOperation:
+                # Путь вне MEDIA_ROOT из старых записей не удаляем.
+                pass
+            stored.delete()
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    authors_count = models.PositiveIntegerField(default=0)
+    last_activity = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Статистика группы {self.group_id}'
+
+
+class GroupAuthorActivity(models.Model):
+    """Число постов и комментариев автора в группе."""
+    group = models.ForeignKey(
+        Group, on_delete=models.CASCADE, related_name='author_activity'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='group_activity'
+    )
+    activity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('group', 'author'),
+                                    name='unique_group_author_activity'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики и время последней активности пользователя."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    last_post_at = models.DateTimeField(null=True, blank=True)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Статистика пользователя {self.user_id}'
+
+
+class PostActivityBucket(models.Model):
+    """Число комментариев к посту за один час."""
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='activity_buckets'
+    )
+    hour = models.DateTimeField(db_index=True)
+    comments = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('post', 'hour'),
+                                    name='unique_post_activity_hour'),
+        ]
+
+
+class ArchivedPost(models.Model):
+    """Пост, перенесённый из горячей таблицы; id сохраняется.
+
+    Связи без ограничений в БД: архив может жить в отдельной базе
+    ``ARCHIVE_DATABASE``.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField('Дата публикации', db_index=True)
+    author = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(
+        upload_to=post_image_path, storage=image_storage,
+        null=True, blank=True, db_index=True
+    )
+    group = models.ForeignKey(
+        Group, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='archived_posts', blank=True, null=True
+    )
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    author = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='archived_comments'
+    )
+    post = models.ForeignKey(
+        ArchivedPost, on_delete=models.CASCADE, related_name='comments'
+    )
+    parent = models.ForeignKey(
+        'self', on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='replies', blank=True, null=True
+    )
+    path = models.CharField(max_length=255, blank=True)
+    depth = models.PositiveSmallIntegerField(default=0)
+    text = models.TextField()
+    created = models.DateTimeField('Дата добавления', db_index=True)
+    version = models.PositiveIntegerField(default=1)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+
+class OutboxEvent(models.Model):
+    """Событие об изменении поста или комментария для внешних систем.
+
+    Пишется в той же транзакции, что и само изменение; доставляется
+    командой ``dispatch_outbox``.
+    """
+    aggregate_type = models.CharField(max_length=32)
+    aggregate_id = models.IntegerField()
+    event_type = models.CharField(max_length=32)
+    payload = models.JSONField(default=dict)
+    created = models.DateTimeField(auto_now_add=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('id',), name='outbox_pending_idx',
+                         condition=models.Q(dispatched_at=None)),
+            models.Index(fields=('aggregate_type', 'aggregate_id', 'id'),
+                         name='outbox_aggregate_idx'),
+        )
+
+
+class IdempotencyKey(models.Model):
+    """Ключ идемпотентности POST-запроса и сохранённый ответ на него.
+
+    Пока запрос выполняется, ``status`` пуст; ответ записывается в той же
+    транзакции, что и созданный объект.
+    """
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='idempotency_keys'
+    )
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=('user', 'key'),
+                                    name='unique_user_idempotency_key'),
+        ]
+
+
+class VersionStamp(models.Model):
+    """Метка версии данных, которые процессы держат в памяти.
+
+    Хранится в базе, общей для всех процессов; в отличие от локального
+    кеша, метку не вытесняет и не теряет перезапуск.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    value = models.CharField(max_length=32)
+
+    @classmethod
+    def bump(cls, name):
+        # Случайная метка: после пересоздания строки она не совпадёт
+        # со старой.
+        cls.objects.update_or_create(name=name,
+                                     defaults={'value': uuid.uuid4().hex})
+
+
+class ImportCheckpoint(models.Model):
+    """Контрольная точка массового импорта.
+
+    Пишется в транзакции загруженной пачки: после сбоя импорт продолжается
+    ровно с первой незафиксированной строки.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    state = models.JSONField()
+    updated = models.DateTimeField(auto_now=True)
+
+
+class RevokedToken(models.Model):
+    """Отозванный подписанный токен.
+
+    Уникальность ``jti`` делает ротацию refresh-токена одной вставкой:
+    из двух одновременных обменов одного токена проходит только один.
+    """
+    jti = models.CharField(max_length=32, unique=True)
+    expires = models.DateTimeField(db_index=True)
+
+
+class BannedPhrase(models.Model):
+    ACTIONS = (
+        (REJECT, 'Отклонять'),
+        (FLAG, 'Отмечать для модерации'),
+    )
+    phrase = models.CharField(max_length=200, unique=True)
+    action = models.CharField(max_length=16, choices=ACTIONS,
+                              default=REJECT)
+
+    def __str__(self):
+        return self.phrase
+
+
+class ContentFlag(models.Model):
+    """Пост или комментарий с фразами, отмеченными для модерации."""
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='flags',
+        blank=True, null=True
+    )
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, related_name='flags',
+        blank=True, null=True
+    )
+    phrases = models.JSONField(default=list)
+    created = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import time
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+
+def record(aggregate_type, instance, event_type, **payload):
+    """Добавляет событие в текущую транзакцию."""
+    OutboxEvent.objects.create(
+        aggregate_type=aggregate_type, aggregate_id=instance.pk,
+        event_type=event_type,
+        payload={'id': instance.pk, 'version': instance.version, **payload},
+    )
+
+
+def as_message(event):
+    return {
+        'event_id': event.pk,
+        'aggregate': event.aggregate_type,
+        'aggregate_id': event.aggregate_id,
+        'type': event.event_type,
+        'created': event.created,
+        'payload': event.payload,
+    }
+
+
+class FileSink:
+    """Дописывает события в файл JSON Lines."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, messages):
+        with open(self.path, 'a', encoding='utf-8') as file:
+            for message in messages:
+                file.write(json.dumps(message, cls=DjangoJSONEncoder,
+                                      ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class HttpSink:
+    """Отправляет пачку событий одним POST с JSON-массивом."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, messages):
+        request = urllib.request.Request(
+            self.url, method='POST',
+            data=json.dumps(messages, cls=DjangoJSONEncoder).encode(),
+            headers={'Content-Type': 'application/json'},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def get_sink(spec=None):
+    spec = spec or settings.OUTBOX_SINK
+    if not spec:
+        raise ValueError('Получатель событий не задан: укажите --sink '
+                         'или переменную окружения OUTBOX_SINK.')
+    if spec.startswith(('http://', 'https://')):
+        return HttpSink(spec)
+    if spec.startswith('file:'):
+        return FileSink(spec[len('file:'):])
+    raise ValueError(f'Неизвестный получатель событий: {spec}')
+
+
+def blocked_aggregates(events):
+    """Агрегаты, у которых есть более ранние недоставленные события вне
+    пачки (например, их держит другой обработчик): порядок важнее.
+    """
+    ids = [event.pk for event in events]
+    aggregates = {(event.aggregate_type, event.aggregate_id)
+                  for event in events}
+    earlier = OutboxEvent.objects.filter(
+        dispatched_at=None, pk__lt=max(ids)
+    ).exclude(pk__in=ids).values_list('aggregate_type', 'aggregate_id')
+    return aggregates & set(earlier.distinct())
+
+
+def dispatch_batch(sink, batch_size=None):
+    """Доставляет пачку событий по порядку id; возвращает их число.
+
+    Отметка о доставке ставится в той же транзакции после успешной
+    отправки, поэтому при сбое пачка уйдёт повторно: доставка «хотя бы
+    один раз», получатели убирают дубли по ``event_id``.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    ids = []
+    try:
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(dispatched_at=None).order_by('pk')[:batch_size]
+            )
+            if not events:
+                return 0
+            blocked = blocked_aggregates(events)
+            events = [
+                event for event in events
+                if (event.aggregate_type, event.aggregate_id) not in blocked
+            ]
+            ids = [event.pk for event in events]
+            if ids:
+                sink.send([as_message(event) for event in events])
+                OutboxEvent.objects.filter(pk__in=ids).update(
+                    dispatched_at=timezone.now(),
+                    attempts=F('attempts') + 1
+                )
+    except Exception:
+        # Транзакция пачки откатилась, попытку учитываем отдельно.
+        OutboxEvent.objects.filter(pk__in=ids).update(
+            attempts=F('attempts') + 1
+        )
+        raise
+    return len(ids)
+
+
+def purge(days=None):
+    days = settings.OUTBOX_RETENTION_DAYS if days is None else days
+    return OutboxEvent.objects.filter(
+        dispatched_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def metrics(**extra):
+    """Метрики противодавления: очередь и возраст старейшего события по
+    таблице outbox (их может посчитать любой процесс) и показатели
+    обработчика из ``extra``.
+    """
+    pending = OutboxEvent.objects.filter(dispatched_at=None)
+    oldest = pending.aggregate(oldest=Min('created'))['oldest']
+    values = {
+        'pending': pending.count(),
+        'lag_seconds': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0.0
+        ),
+        'updated': time.time(),
+        **extra,
+    }
+    return values
+
+
+def publish(values):
+    """Пишет метрики строкой JSON в журнал ``posts.outbox``, откуда их
+    забирает сборщик логов или агент метрик.
+    """
+    logger.info(json.dumps(values, cls=DjangoJSONEncoder))
@@ -0,0 +1,315 @@
+import threading
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Group,
+                     GroupAuthorActivity, GroupStats, Post, UserStats)
+
+User = get_user_model()
+
+_local = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_local, 'posts'):
+        _local.posts = set()
+    return _local.posts
+
+
+def deleting_users():
+    if not hasattr(_local, 'users'):
+        _local.users = set()
+    return _local.users
+
+
+def added(field, delta):
+    # Расхождение счётчика с данными не должно превращать удаление в
+    # ошибку CHECK: счётчик не опускается ниже нуля.
+    return Greatest(F(field) + delta, 0)
+
+
+def add_author_activity(group_id, author_id, delta):
+    """Прибавляет активность автора в группе; возвращает изменение
+    числа активных авторов группы (-1, 0 или 1).
+    """
+    activity = GroupAuthorActivity.objects.filter(group_id=group_id,
+                                                  author_id=author_id)
+    updated = activity.filter(activity__gte=-delta).update(
+        activity=F('activity') + delta
+    )
+    if not updated and delta > 0:
+        try:
+            with transaction.atomic():
+                GroupAuthorActivity.objects.create(
+                    group_id=group_id, author_id=author_id, activity=delta
+                )
+            return 1
+        except IntegrityError:
+            # Первую активность автора одновременно записал другой запрос.
+            updated = activity.update(activity=F('activity') + delta)
+    if not updated:
+        return 0
+    current = activity.values_list('activity', flat=True).get()
+    return (current > 0) - (current - delta > 0)
+
+
+@transaction.atomic
+def record_activity(group_id, author_id, posts=0, comments=0, at=None):
+    """Прибавляет посты и комментарии автора к агрегатам группы.
+
+    Строки создаются только для новой активности: при удалении автора
+    каскад может убрать их раньше его постов и комментариев.
+    """
+    delta = posts + comments
+    if delta > 0:
+        GroupStats.objects.get_or_create(group_id=group_id)
+    authors_delta = 0
+    if delta and author_id not in deleting_users():
+        authors_delta = add_author_activity(group_id, author_id, delta)
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=added('posts_count', posts),
+        comments_count=added('comments_count', comments),
+        authors_count=added('authors_count', authors_delta),
+    )
+    if at is not None:
+        GroupStats.objects.filter(
+            Q(last_activity__lt=at) | Q(last_activity__isnull=True),
+            group_id=group_id,
+        ).update(last_activity=at)
+
+
+@transaction.atomic
+def record_user_activity(user_id, posts=0, comments=0, at=None):
+    """Прибавляет посты и комментарии к счётчикам пользователя.
+
+    Строку создаёт только новая запись: при удалении пользователя его
+    статистика может уйти раньше постов, и воссоздавать её нельзя.
+    """
+    if at is not None:
+        UserStats.objects.get_or_create(user_id=user_id)
+    user_stats = UserStats.objects.filter(user_id=user_id)
+    user_stats.update(posts_count=added('posts_count', posts),
+                      comments_count=added('comments_count', comments))
+    if at is None:
+        return
+    field = 'last_post_at' if posts else 'last_comment_at'
+    user_stats.filter(
+        Q(**{f'{field}__lt': at}) | Q(**{f'{field}__isnull': True})
+    ).update(**{field: at})
+
+
+def user_deleting(user):
+    # Автор уходит из всех своих групп сразу; его посты и комментарии
+    # затем вычитаются каскадом без строк активности.
+    deleting_users().add(user.pk)
+    GroupStats.objects.filter(
+        group__in=GroupAuthorActivity.objects.filter(
+            author=user, activity__gt=0
+        ).values('group')
+    ).update(authors_count=added('authors_count', -1))
+
+
+def user_deleted(user):
+    deleting_users().discard(user.pk)
+
+
+def post_created(post):
+    record_user_activity(post.author_id, posts=1, at=post.pub_date)
+    if post.group_id:
+        record_activity(post.group_id, post.author_id, posts=1,
+                        at=post.pub_date)
+
+
+def post_group_changed(post, old_group_id):
+    """Переносит пост и его комментарии из старой группы в новую."""
+    moved = {post.author_id: {'posts': 1, 'comments': 0,
+                              'at': post.pub_date}}
+    for row in post.comments.values('author').annotate(
+            total=Count('pk'), last=Max('created')):
+        author = moved.setdefault(row['author'],
+                                  {'posts': 0, 'comments': 0, 'at': None})
+        author['comments'] = row['total']
+        author['at'] = max(filter(None, (author['at'], row['last'])))
+    for author_id, author in moved.items():
+        if old_group_id:
+            record_activity(old_group_id, author_id,
+                            posts=-author['posts'],
+                            comments=-author['comments'])
+        if post.group_id:
+            record_activity(post.group_id, author_id,
+                            posts=author['posts'],
+                            comments=author['comments'], at=author['at'])
+
+
+def post_deleting(post):
+    # Комментарии удаляются каскадом до поста; вычитаем их одним запросом.
+    deleting_posts().add(post.pk)
+    per_author = post.comments.values('author').annotate(total=Count('pk'))
+    for row in per_author:
+        record_user_activity(row['author'], comments=-row['total'])
+        if post.group_id:
+            record_activity(post.group_id, row['author'],
+                            comments=-row['total'])
+
+
+def post_deleted(post):
+    deleting_posts().discard(post.pk)
+    record_user_activity(post.author_id, posts=-1)
+    if post.group_id:
+        record_activity(post.group_id, post.author_id, posts=-1)
+
+
+def comment_created(comment):
+    record_user_activity(comment.author_id, comments=1, at=comment.created)
+    group_id = comment.post.group_id
+    if group_id:
+        record_activity(group_id, comment.author_id, comments=1,
+                        at=comment.created)
+
+
+def comment_deleted(comment):
+    if comment.post_id in deleting_posts():
+        return
+    record_user_activity(comment.author_id, comments=-1)
+    group_id = Post.objects.filter(
+        pk=comment.post_id
+    ).values_list('group_id', flat=True).first()
+    if group_id:
+        record_activity(group_id, comment.author_id, comments=-1)
+
+
+def activity_sources():
+    """Таблицы постов и комментариев, горячие и архивные.
+
+    Перенос в архив статистику не меняет, поэтому пересчёт учитывает и
+    архив. Он может жить в отдельной базе, так что каждая таблица
+    агрегируется отдельно.
+    """
+    return (
+        (Post.objects.all(), 'group', 'pub_date', 'posts_count'),
+        (ArchivedPost.objects.all(), 'group', 'pub_date', 'posts_count'),
+        (Comment.objects.all(), 'post__group', 'created', 'comments_count'),
+        (ArchivedComment.objects.all(), 'post__group', 'created',
+         'comments_count'),
+    )
+
+
+def compute(group_ids=None):
+    """Считает агрегаты групп с нуля по постам и комментариям."""
+    groups = Group.objects.all()
+    if group_ids is not None:
+        groups = groups.filter(pk__in=group_ids)
+    # Архив ссылается на группы и авторов без ограничений в БД.
+    existing_groups = set(groups.values_list('pk', flat=True))
+    existing_users = set(User.objects.values_list('pk', flat=True))
+
+    stats = defaultdict(lambda: {'posts_count': 0, 'comments_count': 0,
+                                 'authors_count': 0, 'last_activity': None})
+    activity = defaultdict(Counter)
+    for queryset, group_field, date_field, counter in activity_sources():
+        queryset = queryset.exclude(**{group_field: None})
+        if group_ids is not None:
+            queryset = queryset.filter(**{f'{group_field}__in': group_ids})
+        for row in queryset.values(group_field, 'author').annotate(
+                total=Count('pk'), last=Max(date_field)):
+            group_id = row[group_field]
+            if group_id not in existing_groups:
+                continue
+            group = stats[group_id]
+            group[counter] += row['total']
+            group['last_activity'] = max(
+                filter(None, (group['last_activity'], row['last']))
+            )
+            # Удалённые авторы уже вычтены из числа авторов группы.
+            if row['author'] in existing_users:
+                activity[group_id][row['author']] += row['total']
+    for group_id, authors in activity.items():
+        stats[group_id]['authors_count'] = len(authors)
+    for group_id in group_ids or ():
+        # Группы без постов получают нулевые агрегаты.
+        if group_id in existing_groups:
+            stats[group_id]
+    return dict(stats), dict(activity)
+
+
+@transaction.atomic
+def rebuild(group_ids=None):
+    stats, activity = compute(group_ids)
+    stored_stats = GroupStats.objects.all()
+    stored_activity = GroupAuthorActivity.objects.all()
+    if group_ids is not None:
+        stored_stats = stored_stats.filter(group__in=group_ids)
+        stored_activity = stored_activity.filter(group__in=group_ids)
+    stored_stats.delete()
+    stored_activity.delete()
+    GroupStats.objects.bulk_create(
+        GroupStats(group_id=group_id, **values)
+        for group_id, values in stats.items()
+    )
+    GroupAuthorActivity.objects.bulk_create(
+        GroupAuthorActivity(group_id=group_id, author_id=author_id,
+                            activity=total)
+        for group_id, authors in activity.items()
+        for author_id, total in authors.items()
+    )
+
+
+def verify():
+    """Возвращает группы, у которых агрегаты расходятся с пересчётом."""
+    expected, _ = compute()
+    stored = {
+        row.pop('group'): row
+        for row in GroupStats.objects.values(
+            'group', 'posts_count', 'comments_count', 'authors_count',
+            'last_activity'
+        )
+    }
+    empty = {'posts_count': 0, 'comments_count': 0, 'authors_count': 0,
+             'last_activity': None}
+    mismatches = {}
+    for group_id in expected.keys() | stored.keys():
+        actual = stored.get(group_id, empty)
+        counted = expected.get(group_id, empty)
+        # last_activity не уменьшается при удалении, сверяем только счётчики.
+        if any(actual[key] != counted[key] for key in
+               ('posts_count', 'comments_count', 'authors_count')):
+            mismatches[group_id] = (actual, counted)
+    return mismatches
+
+
+USER_LAST_FIELDS = {'posts_count': 'last_post_at',
+                    'comments_count': 'last_comment_at'}
+
+
+def compute_users():
+    """Считает счётчики всех пользователей с нуля, с учётом архива."""
+    stats = {pk: {'posts_count': 0, 'comments_count': 0,
+                  'last_post_at': None, 'last_comment_at': None}
+             for pk in User.objects.values_list('pk', flat=True)}
+    for queryset, _, date_field, counter in activity_sources():
+        last_field = USER_LAST_FIELDS[counter]
+        for row in queryset.values('author').annotate(
+                total=Count('pk'), last=Max(date_field)):
+            user = stats.get(row['author'])
+            if user is None:
+                continue
+            user[counter] += row['total']
+            user[last_field] = max(
+                filter(None, (user[last_field], row['last']))
+            )
+    return stats
+
+
+@transaction.atomic
+def rebuild_users():
+    stats = compute_users()
+    UserStats.objects.all().delete()
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id, **values)
+         for user_id, values in stats.items()),
+        batch_size=1000
+    )
@@ -0,0 +1,86 @@
+import hashlib
+import os
+import uuid
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла определяется его содержимым.
+
+    Повторная загрузка того же содержимого не пишет файл заново.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        lock_refs(name)
+        if os.path.exists(full_path):
+            return name
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = f'{full_path}.{uuid.uuid4().hex}.tmp'
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(content.temporary_file_path(), tmp_path)
+        else:
+            with open(tmp_path, 'wb') as tmp_file:
+                for chunk in content.chunks():
+                    tmp_file.write(chunk)
+        # Параллельная загрузка того же файла перезапишет его тем же
+        # содержимым.
+        os.replace(tmp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def delete(self, name):
+        super().delete(name)
+        # Убираем опустевшие каталоги префиксов, но не сам корень.
+        root = os.path.abspath(self.location)
+        directory = os.path.dirname(self.path(name))
+        while directory.startswith(root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def lock_refs(name):
+    """Блокирует счётчик ссылок на файл до конца текущей транзакции.
+
+    Удаление освобождённого файла берёт ту же блокировку, поэтому файл не
+    пропадёт между проверкой его наличия и записью новой ссылки.
+    """
+    if not transaction.get_connection().in_atomic_block:
+        return
+    stored_image = apps.get_model('posts', 'StoredImage')
+    list(stored_image.objects.select_for_update().filter(
+        name=name
+    ).values_list('pk'))
+
+
+def content_hash(file):
+    digest = getattr(file, 'content_hash', None)
+    if digest is None:
+        hasher = hashlib.sha256()
+        for chunk in file.chunks():
+            hasher.update(chunk)
+        file.seek(0)
+        digest = hasher.hexdigest()
+    return digest
+
+
+def post_image_path(instance, filename):
+    digest = content_hash(instance.image.file)
+    extension = os.path.splitext(filename)[1].lower()
+    return f'posts/{digest[:2]}/{digest}{extension}'
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,145 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import PostActivityBucket
+
+TOP_KEY = 'trending:top'
+
+
+def get_cache():
+    return caches[settings.TRENDING_CACHE_ALIAS]
+
+
+def bucket_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def weight(hour, epoch):
+    """Вес комментария за ``hour`` относительно опорной точки ``epoch``.
+
+    Баллы всех постов затухают одинаково, поэтому их удобно хранить
+    приведёнными к общей опорной точке: тогда порядок постов со временем
+    не меняется и пересчитывать весь топ не нужно.
+    """
+    hours = (hour - epoch).total_seconds() / 3600
+    return 2 ** (hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def window_start(now):
+    return bucket_hour(now) - timedelta(
+        hours=settings.TRENDING_WINDOW_HOURS - 1
+    )
+
+
+def trim(entries):
+    return dict(heapq.nlargest(
+        settings.TRENDING_MAX_SIZE, entries.items(),
+        key=lambda item: item[1][0]
+    ))
+
+
+def rebuild(now=None):
+    """Собирает топ по почасовым счётчикам окна, не читая комментарии."""
+    now = now or timezone.now()
+    epoch = bucket_hour(now)
+    entries = defaultdict(lambda: [0.0, None])
+    buckets = PostActivityBucket.objects.filter(
+        hour__gte=window_start(now), comments__gt=0
+    ).values_list('post_id', 'hour', 'comments')
+    for post_id, hour, comments in buckets.iterator():
+        entry = entries[post_id]
+        entry[0] += comments * weight(hour, epoch)
+        entry[1] = max(filter(None, (entry[1], hour)))
+    top = {'epoch': epoch, 'built': now, 'entries': trim(entries)}
+    get_cache().set(TOP_KEY, top, None)
+    return top
+
+
+def load(now):
+    """Топ из кеша процесса, не старше ``TRENDING_REFRESH_SECONDS``.
+
+    Почасовые счётчики в базе общие для всех процессов, а топ в кеше
+    дополняется каждым процессом только своими комментариями. Регулярная
+    пересборка сводит рейтинги процессов и исправляет потерянные при
+    гонках обновления; заодно опорная точка баллов не устаревает.
+    """
+    top = get_cache().get(TOP_KEY) or {}
+    built = top.get('built')
+    refresh = timedelta(seconds=settings.TRENDING_REFRESH_SECONDS)
+    if built is None or not built <= now < built + refresh:
+        return rebuild(now)
+    return top
+
+
+def record_comment(post_id, created, delta=1):
+    """Учитывает созданный (или удалённый) комментарий в счётчиках и топе.
+
+    Топ обновляется после фиксации транзакции.
+    """
+    add_comments(post_id, bucket_hour(created), delta)
+    transaction.on_commit(lambda: refresh_post(post_id))
+
+
+def add_comments(post_id, hour, delta):
+    """Прибавляет комментарии к почасовому счётчику поста, не опуская его
+    ниже нуля; строку создаёт первый комментарий часа.
+    """
+    buckets = PostActivityBucket.objects.filter(post_id=post_id, hour=hour)
+    if buckets.filter(comments__gte=-delta).update(
+            comments=F('comments') + delta) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            PostActivityBucket.objects.create(post_id=post_id, hour=hour,
+                                              comments=delta)
+    except IntegrityError:
+        # Первый комментарий часа одновременно записал другой запрос.
+        buckets.update(comments=F('comments') + delta)
+
+
+def refresh_post(post_id):
+    now = timezone.now()
+    top = load(now)
+    score, last_hour = 0.0, None
+    for hour, comments in PostActivityBucket.objects.filter(
+            post_id=post_id, hour__gte=window_start(now), comments__gt=0
+    ).values_list('hour', 'comments'):
+        score += comments * weight(hour, top['epoch'])
+        last_hour = max(filter(None, (last_hour, hour)))
+    entries = top['entries']
+    if score > 0:
+        entries[post_id] = [score, last_hour]
+    else:
+        entries.pop(post_id, None)
+    top['entries'] = trim(entries)
+    get_cache().set(TOP_KEY, top, None)
+
+
+def record_buckets(buckets):
+    """Прибавляет комментарии ``{(id поста, час): число}``; для массовой
+    загрузки в обход сигналов. Топ затем пересобирается ``rebuild()``.
+    """
+    for (post_id, hour), comments in buckets.items():
+        add_comments(post_id, hour, comments)
+
+
+def trending(limit, now=None):
+    """Возвращает до ``limit`` пар (id поста, балл) по убыванию балла."""
+    now = now or timezone.now()
+    top = load(now)
+    start = window_start(now)
+    factor = weight(top['epoch'], bucket_hour(now))
+    ranked = sorted(
+        ((post_id, score * factor)
+         for post_id, (score, last_hour) in top['entries'].items()
+         if last_hour >= start),
+        key=lambda item: item[1], reverse=True
+    )
+    return ranked[:limit]
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from django.conf import settings
+
+
+class VersionCheck:
+    """Метка версии ``VersionStamp`` с проверкой не чаще раза в
+    ``VERSION_STAMP_CHECK_SECONDS``.
+
+    Между проверками метка берётся из памяти процесса, так что чтение
+    данных, которые процесс держит у себя, не делает запросов. Изменения
+    из других процессов видны с этой задержкой; свои — сразу.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.value = None
+        self.checked = None
+
+    def current(self):
+        from .models import VersionStamp
+
+        now = time.monotonic()
+        if (self.checked is None or now - self.checked
+                >= settings.VERSION_STAMP_CHECK_SECONDS):
+            with self.lock:
+                # Только чтение: метку создаёт первое изменение.
+                self.value = VersionStamp.objects.filter(
+                    name=self.name
+                ).values_list('value', flat=True).first() or ''
+                self.checked = now
+        return self.value
+
+    def bump(self):
+        from .models import VersionStamp
+
+        VersionStamp.bump(self.name)
+        self.checked = None
+
+    def forget(self):
+        self.checked = None
@@ -0,0 +1,313 @@
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
+
+from . import profiling, traffic
+from .querylog import SlowQueryLogger
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class MiddlewareChain:
+    """Цепочка middleware, собранная так же, как в ``BaseHandler``."""
+
+    def __init__(self, middleware, get_response):
+        self.view_middleware = []
+        self.template_response_middleware = []
+        self.exception_middleware = []
+        handler = get_response
+        for middleware_path in reversed(middleware):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(mw_instance, 'process_view'):
+                self.view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, 'process_template_response'):
+                self.template_response_middleware.append(
+                    mw_instance.process_template_response
+                )
+            if hasattr(mw_instance, 'process_exception'):
+                self.exception_middleware.append(
+                    mw_instance.process_exception
+                )
+            handler = convert_exception_to_response(mw_instance)
+        self.handler = handler
+
+    def __call__(self, request):
+        return self.handler(request)
+
+
+class RouteMiddleware:
+    """Выбирает цепочку middleware по префиксу пути запроса.
+
+    Маршруты берутся из ``MIDDLEWARE_ROUTES``: первый совпавший префикс
+    определяет цепочку, поэтому общий маршрут ``''`` ставится последним.
+    """
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.routes = [
+            (prefix, MiddlewareChain(middleware, get_response))
+            for prefix, middleware in settings.MIDDLEWARE_ROUTES
+        ]
+        self.default = MiddlewareChain((), get_response)
+
+    def get_chain(self, request):
+        for prefix, chain in self.routes:
+            if request.path_info.startswith(prefix):
+                return chain
+        return self.default
+
+    def __call__(self, request):
+        request.middleware_chain = self.get_chain(request)
+        return request.middleware_chain(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        for process_view in request.middleware_chain.view_middleware:
+            response = process_view(request, view_func, view_args,
+                                    view_kwargs)
+            if response is not None:
+                return response
+
+    def process_template_response(self, request, response):
+        chain = request.middleware_chain
+        for process_template_response in chain.template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        for process_exception in request.middleware_chain.exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+
+
+class GzipCodec:
+    name = 'gzip'
+
+    def __init__(self):
+        self._prototypes = {}
+
+    def _compressobj(self, level):
+        # Копия заранее настроенного компрессора дешевле создания нового.
+        prototype = self._prototypes.get(level)
+        if prototype is None:
+            prototype = self._prototypes[level] = zlib.compressobj(
+                level, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+        return prototype.copy()
+
+    def compress(self, data, level):
+        compressor = self._compressobj(level)
+        return compressor.compress(data) + compressor.flush()
+
+    def stream(self, chunks, level):
+        compressor = self._compressobj(level)
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class BrotliCodec:
+    name = 'br'
+
+    def compress(self, data, level):
+        return brotli.compress(data, quality=level)
+
+    def stream(self, chunks, level):
+        compressor = brotli.Compressor(quality=level)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class ZstdCodec:
+    name = 'zstd'
+
+    def __init__(self):
+        # ZstdCompressor переиспользуется, но не потокобезопасен.
+        self._local = threading.local()
+
+    def _compressor(self, level):
+        compressors = self._local.__dict__.setdefault('compressors', {})
+        compressor = compressors.get(level)
+        if compressor is None:
+            compressor = compressors[level] = zstandard.ZstdCompressor(
+                level=level
+            )
+        return compressor
+
+    def compress(self, data, level):
+        return self._compressor(level).compress(data)
+
+    def stream(self, chunks, level):
+        compressor = self._compressor(level).compressobj()
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            data += compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+def _available_codecs():
+    codecs = {}
+    if zstandard is not None:
+        codecs['zstd'] = ZstdCodec()
+    if brotli is not None:
+        codecs['br'] = BrotliCodec()
+    codecs['gzip'] = GzipCodec()
+    return codecs
+
+
+def parse_accept_encoding(header):
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Сжимает ответы gzip, а при наличии библиотек — brotli или zstd.
+
+    Сжимаются только типы из ``COMPRESSION_LEVELS``, где для каждого типа
+    задан уровень каждого кодека; тела меньше ``COMPRESSION_MIN_SIZE``
+    отдаются как есть, потоковые ответы сжимаются по частям.
+    """
+    codecs = _available_codecs()
+
+    def negotiate(self, request, levels):
+        accepted = parse_accept_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        wildcard = accepted.get('*', 0.0)
+        for name, codec in self.codecs.items():
+            if name in levels and accepted.get(name, wildcard) > 0:
+                return codec, levels[name]
+        return None, None
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.status_code == 206 or response.has_header(
+                'Content-Range'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        levels = settings.COMPRESSION_LEVELS.get(content_type.strip())
+        if not levels:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if (not response.streaming
+                and len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        codec, level = self.negotiate(request, levels)
+        if codec is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = codec.stream(
+                response.streaming_content, level
+            )
+            del response['Content-Length']
+        else:
+            compressed = codec.compress(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = codec.name
+        return response
+
+
+class SlowQueryMiddleware:
+    """Журнал медленных SQL-запросов с планом выполнения.
+
+    Порог берётся из ``SLOW_QUERY_THRESHOLD_MS``; ``None`` отключает журнал.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if settings.SLOW_QUERY_THRESHOLD_MS is None:
+            return self.get_response(request)
+        logger = SlowQueryLogger(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(logger))
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос по заголовку ``X-Profile`` от staff-пользователя
+    или выборочно с вероятностью ``PROFILE_SAMPLE_RATE``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if profiling.should_profile(request):
+            response = profiling.profile(request, self.get_response)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+
+class TrafficRecorderMiddleware:
+    """Записывает обезличенные метаданные запросов в ``TRAFFIC_RECORD_PATH``
+    для последующего воспроизведения командой ``replay_traffic``.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.TRAFFIC_RECORD_PATH:
+            return self.get_response(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        traffic.record(traffic.describe(
+            request, response, time.perf_counter() - start
+        ))
+        return response
@@ -0,0 +1,153 @@
+import cProfile
+import io
+import json
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+REQUEST_ID = re.compile(r'^[0-9A-Za-z-]{1,64}$')
+PROFILE_ID = re.compile(r'^[0-9a-f]{32}$')
+EXTENSIONS = ('.prof', '.json')
+
+# tracemalloc глобален для процесса, поэтому профилируем по одному запросу.
+_lock = threading.Lock()
+
+
+def profile_dir():
+    path = Path(settings.PROFILE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def is_staff(request):
+    """Проверяет токен запроса теми же классами аутентификации, что и API."""
+    drf_request = Request(request, authenticators=[
+        authentication() for authentication
+        in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    try:
+        return drf_request.user.is_staff
+    except APIException:
+        return False
+
+
+def should_profile(request):
+    if request.META.get(PROFILE_HEADER):
+        return is_staff(request)
+    rate = settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def request_id(request):
+    """``X-Request-ID`` клиента для сопоставления с логами или ``None``.
+
+    Имя файла профиля из него не строится: клиент мог бы перезаписать
+    чужой профиль, подставив его идентификатор.
+    """
+    value = request.META.get('HTTP_X_REQUEST_ID', '')
+    return value if REQUEST_ID.match(value) else None
+
+
+def profile(request, get_response):
+    """Выполняет запрос под cProfile и tracemalloc и сохраняет результаты.
+
+    Возвращает ``None``, если другой запрос уже профилируется.
+    """
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            if started:
+                tracemalloc.stop()
+    finally:
+        _lock.release()
+    key = uuid.uuid4().hex
+    save(key, profiler, after.compare_to(before, 'lineno'), {
+        'id': key,
+        'request_id': request_id(request),
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+        'peak_memory': peak,
+        'created': time.time(),
+    })
+    response['X-Profile-Id'] = key
+    return response
+
+
+def save(key, profiler, allocations, meta):
+    directory = profile_dir()
+    profiler.dump_stats(directory / f'{key}.prof')
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats('cumulative').print_stats(settings.PROFILE_TOP)
+    meta['stats'] = stream.getvalue()
+    meta['allocations'] = [
+        str(stat) for stat in allocations[:settings.PROFILE_TOP]
+    ]
+    with open(directory / f'{key}.json', 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+    prune(directory)
+
+
+def prune(directory):
+    profiles = sorted(directory.glob('*.json'),
+                      key=lambda path: path.stat().st_mtime)
+    for path in profiles[:-settings.PROFILE_KEEP]:
+        for extension in EXTENSIONS:
+            path.with_suffix(extension).unlink(missing_ok=True)
+
+
+def list_profiles():
+    profiles = []
+    for path in profile_dir().glob('*.json'):
+        with open(path, encoding='utf-8') as file:
+            profiles.append(json.load(file))
+    return sorted(profiles, key=lambda meta: meta['created'], reverse=True)
+
+
+def profile_list(request):
+    return TemplateResponse(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': list_profiles(),
+    })
+
+
+def profile_download(request, key, extension):
+    if not PROFILE_ID.match(key) or f'.{extension}' not in EXTENSIONS:
+        raise Http404
+    path = profile_dir() / f'{key}.{extension}'
+    if not path.exists():
+        raise Http404
+    return FileResponse(open(path, 'rb'), as_attachment=True,
+                        filename=path.name)
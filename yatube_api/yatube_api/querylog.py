@@ -0,0 +1,135 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, NotSupportedError, transaction
+
+LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+
+def normalize(sql):
+    """Заменяет литералы и параметры на ``?``, списки IN — на ``(...)``."""
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:16]
+
+
+def explain(connection, sql, params):
+    """План запроса; ``None``, если бэкенд или запрос его не допускают."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except NotSupportedError:
+        return None
+    _local.explaining = True
+    try:
+        # Отдельный курсор: результаты исходного запроса ещё не прочитаны.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except DatabaseError:
+        return None
+    finally:
+        _local.explaining = False
+
+
+def write(entry):
+    line = json.dumps(entry, ensure_ascii=False)
+    with _write_lock:
+        with open(settings.SLOW_QUERY_LOG_PATH, 'a',
+                  encoding='utf-8') as log:
+            log.write(line + '\n')
+
+
+def read(path):
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            if line.strip():
+                yield json.loads(line)
+
+
+def aggregate(entries):
+    """Сводка по отпечаткам, самые затратные запросы первыми."""
+    groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                  'views': set()})
+    for entry in entries:
+        group = groups[entry['fingerprint']]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['sql'] = entry['sql']
+        group['plan'] = entry.get('plan')
+        if entry.get('view'):
+            group['views'].add(
+                '.'.join(filter(None, (entry['view'], entry.get('action'))))
+            )
+    summary = [
+        {'fingerprint': key, **group, 'views': sorted(group['views']),
+         'avg_ms': group['total_ms'] / group['count']}
+        for key, group in groups.items()
+    ]
+    return sorted(summary, key=lambda group: group['total_ms'], reverse=True)
+
+
+def view_context(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    view = getattr(match.func, 'cls', match.func)
+    actions = getattr(match.func, 'actions', None) or {}
+    return (f'{view.__module__}.{view.__name__}',
+            actions.get(request.method.lower()))
+
+
+class SlowQueryLogger:
+    """Обёртка ``execute_wrapper``, пишущая запросы дольше порога."""
+
+    def __init__(self, request=None):
+        self.request = request
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'explaining', False):
+            return execute(sql, params, many, context)
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = (time.perf_counter() - start) * 1000
+        threshold = settings.SLOW_QUERY_THRESHOLD_MS
+        if threshold is not None and duration >= threshold:
+            self.log(context['connection'], sql, params, many, duration)
+        return result
+
+    def log(self, connection, sql, params, many, duration):
+        view, action = view_context(self.request)
+        plan = None
+        if settings.SLOW_QUERY_EXPLAIN and not many:
+            plan = explain(connection, sql, params)
+        write({
+            'time': time.time(),
+            'duration_ms': round(duration, 3),
+            'fingerprint': fingerprint(sql),
+            'sql': normalize(sql),
+            'view': view,
+            'action': action,
+            'method': getattr(self.request, 'method', None),
+            'path': getattr(self.request, 'path', None),
+            'plan': plan,
+        })
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -23,14 +24,35 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'yatube_api.middleware.CompressionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'yatube_api.middleware.TrafficRecorderMiddleware',
+    'yatube_api.middleware.SlowQueryMiddleware',
+    'yatube_api.middleware.ProfilingMiddleware',
+    'yatube_api.middleware.RouteMiddleware',
+]
+
+# API аутентифицируется только токеном: сессии, CSRF, сообщения и защита
+# от кликджекинга нужны лишь админке.
+API_MIDDLEWARE = []
+
+SITE_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+MIDDLEWARE_ROUTES = [
+    ('/api/', API_MIDDLEWARE),
+    ('/media/', API_MIDDLEWARE),
+    ('', SITE_MIDDLEWARE),
+]
+
+# Middleware админки подключены через MIDDLEWARE_ROUTES.
+SILENCED_SYSTEM_CHECKS = ['admin.E408', 'admin.E409', 'admin.E410']
+
 ROOT_URLCONF = 'yatube_api.urls'
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
@@ -58,6 +80,126 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+    'tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tokens',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Уровни сжатия по типу содержимого: gzip 1-9, br 0-11, zstd 1-22.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVELS = {
+    'application/json': {'zstd': 3, 'br': 4, 'gzip': 6},
+    'text/html': {'zstd': 3, 'br': 5, 'gzip': 6},
+    'text/css': {'zstd': 9, 'br': 9, 'gzip': 9},
+    'application/javascript': {'zstd': 9, 'br': 9, 'gzip': 9},
+}
+
+# Потоки Server-Sent Events: брокер (LocalBroker в одном процессе,
+# OutboxBroker для нескольких), пульс и пауза переподключения, размеры
+# догрузки и очереди подписчика, длительность соединения и опрос outbox.
+# Тип text/event-stream нарочно не входит в COMPRESSION_LEVELS: сжатие
+# задерживало бы события в буфере.
+SSE_BROKER = 'api.streams.LocalBroker'
+SSE_HEARTBEAT = 15
+SSE_RETRY_MS = 3000
+SSE_BACKFILL_LIMIT = 500
+SSE_BUFFER_SIZE = 100
+SSE_MAX_DURATION = 5 * 60
+SSE_POLL_INTERVAL = 1
+
+# Количество объектов для постраничных списков.
+COUNT_CACHE_ALIAS = 'default'
+COUNT_CACHE_TIMEOUT = 5 * 60
+EXACT_COUNT_THRESHOLD = 1000
+
+# Ветки комментариев: максимальная вложенность ответов и глубина дерева
+# в ответе API по умолчанию.
+COMMENT_MAX_DEPTH = 20
+COMMENT_TREE_DEPTH = 5
+
+# Как часто процесс сверяет с базой метки версий данных, которые держит
+# в памяти (карта групп, фильтр фраз), в секундах. Изменения из других
+# процессов становятся видны с этой задержкой.
+VERSION_STAMP_CHECK_SECONDS = 5
+
+# Фильтр запрещённых фраз: поиск только целых слов.
+CONTENT_FILTER_WHOLE_WORDS = True
+
+# Популярные посты: окно и период полураспада в часах, размер топа и
+# период пересборки топа по почасовым счётчикам в секундах.
+TRENDING_CACHE_ALIAS = 'default'
+TRENDING_WINDOW_HOURS = 48
+TRENDING_HALF_LIFE_HOURS = 6
+TRENDING_MAX_SIZE = 100
+TRENDING_REFRESH_SECONDS = 60
+
+# Подписанные токены: время жизни в секундах. Отозванные refresh-токены
+# хранятся в таблице RevokedToken, а access-токены проверяются без базы
+# по кешу SIGNED_TOKEN_DENYLIST_CACHE. Чтобы отзыв видели все процессы,
+# в продакшене этот кеш должен быть общим (Redis, Memcached); иначе
+# отозванный access-токен в других процессах живёт до конца своего TTL.
+SIGNED_TOKEN_ACCESS_TTL = 5 * 60
+SIGNED_TOKEN_REFRESH_TTL = 7 * 24 * 60 * 60
+SIGNED_TOKEN_DENYLIST_CACHE = 'tokens'
+
+# Ответы на POST с заголовком Idempotency-Key хранятся в базе: срок жизни
+# ключа и время, после которого незавершённый запрос считается брошенным.
+IDEMPOTENCY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 10
+
+# Журнал медленных запросов: порог в миллисекундах (None — выключен),
+# файл в формате JSON Lines и сбор плана выполнения. По умолчанию журнал
+# выключен; порог и путь задаются переменными окружения.
+SLOW_QUERY_THRESHOLD_MS = (
+    int(os.environ['SLOW_QUERY_THRESHOLD_MS'])
+    if os.environ.get('SLOW_QUERY_THRESHOLD_MS') else None
+)
+SLOW_QUERY_LOG_PATH = os.environ.get(
+    'SLOW_QUERY_LOG_PATH', BASE_DIR / 'slow_queries.log'
+)
+SLOW_QUERY_EXPLAIN = True
+
+# Профили запросов: доля случайно профилируемых запросов, каталог,
+# число хранимых профилей и строк в сводках.
+PROFILE_SAMPLE_RATE = 0
+PROFILE_DIR = BASE_DIR / 'profiles'
+PROFILE_KEEP = 200
+PROFILE_TOP = 30
+
+# Запись трафика для replay_traffic: путь к файлу JSON Lines или None.
+TRAFFIC_RECORD_PATH = None
+
+# Outbox событий: получатель (file:<путь> или http(s)://<адрес>)
+# из переменной окружения, размер пачки и срок хранения доставленных
+# событий в днях. Без получателя dispatch_outbox требует --sink.
+OUTBOX_SINK = os.environ.get('OUTBOX_SINK')
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_RETENTION_DAYS = 7
+
+# Прогрев воркера в wsgi.py до приёма трафика.
+WARMUP_ON_STARTUP = True
+WARMUP_FRAGMENTS = 100
+
+# Архив старых постов: отдельная база или та же, что и основная.
+ARCHIVE_DATABASE = 'default'
+ARCHIVE_AFTER_DAYS = 365
+
+DATABASE_ROUTERS = ['posts.archive.ArchiveRouter']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -88,11 +230,23 @@ STATIC_URL = '/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# None — файлы отдаёт Django; 'x-accel-redirect' (nginx) или 'x-sendfile'
+# (Apache, lighttpd) — передача файла фронтовому прокси.
+MEDIA_ACCEL_BACKEND = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+IMAGE_UPLOAD_MAX_DIMENSIONS = (4096, 4096)
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.SignedTokenAuthentication',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'archive': '120/min',
+    },
 }
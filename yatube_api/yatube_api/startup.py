@@ -0,0 +1,127 @@
+import json
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _walk_patterns(patterns):
+    for pattern in patterns:
+        yield pattern
+        if hasattr(pattern, 'url_patterns'):
+            yield from _walk_patterns(pattern.url_patterns)
+
+
+def compile_urls():
+    from django.urls import get_resolver
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for pattern in _walk_patterns(resolver.url_patterns):
+        pattern.pattern.regex
+
+
+def build_serializers():
+    from api.compiled import get_plan
+    from api.urls import router
+    for _, viewset, _ in router.registry:
+        serializer_class = getattr(viewset, 'serializer_class', None)
+        if serializer_class is not None:
+            serializer_class().fields
+            get_plan(serializer_class)
+
+
+def prime_caches():
+    from django.conf import settings
+
+    from api import fragments
+    from api.serializers import PostSerializer
+    from posts.groups import group_map
+    from posts.models import Post
+
+    group_map.load()
+    limit = getattr(settings, 'WARMUP_FRAGMENTS', 0)
+    if not limit:
+        return
+    posts = Post.objects.select_related('author', 'group').order_by('-pk')
+    data = PostSerializer(posts[:limit], many=True).data
+    fragments.set_fragments(Post, {item['id']: item for item in data})
+
+
+WARMUP_STEPS = (
+    ('urls', compile_urls),
+    ('serializers', build_serializers),
+    ('caches', prime_caches),
+)
+
+
+def warmup():
+    """Прогревает процесс до приёма запросов, возвращает время этапов.
+
+    Прогрев только читает базу. Открытые им соединения закрываются, чтобы
+    не достаться по наследству воркерам, которые сервер форкает от
+    прогретого процесса.
+    """
+    from django.db import connections
+
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.warning('Warmup step %s failed', name, exc_info=True)
+        timings[name] = time.perf_counter() - started
+    connections.close_all()
+    return timings
+
+
+def _timed(func, row, key):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            row[key] += time.perf_counter() - started
+    return wrapper
+
+
+def profile_startup():
+    """Замеряет холодный старт; вызывать в свежем интерпретаторе."""
+    import django
+    from django.apps.config import AppConfig
+    from django.conf import settings
+
+    apps = {}
+    original_create = AppConfig.create.__func__
+
+    def create(cls, entry):
+        started = time.perf_counter()
+        app_config = original_create(cls, entry)
+        row = apps[app_config.label] = {
+            'import': time.perf_counter() - started,
+            'models': 0.0,
+            'ready': 0.0,
+        }
+        app_config.import_models = _timed(app_config.import_models, row,
+                                          'models')
+        app_config.ready = _timed(app_config.ready, row, 'ready')
+        return app_config
+
+    stages = {}
+    started = time.perf_counter()
+    settings.INSTALLED_APPS
+    stages['settings'] = time.perf_counter() - started
+    AppConfig.create = classmethod(create)
+    try:
+        started = time.perf_counter()
+        django.setup()
+        stages['setup'] = time.perf_counter() - started
+    finally:
+        AppConfig.create = classmethod(original_create)
+    stages.update(warmup())
+    return {'apps': apps, 'stages': stages}
+
+
+if __name__ == '__main__':
+    json.dump(profile_startup(), sys.stdout)
@@ -0,0 +1,91 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+
+_write_lock = threading.Lock()
+
+
+def anonymize(kwargs):
+    """Числовые идентификаторы оставляет как есть, остальные значения
+    (имя пользователя, slug) заменяет устойчивым хешем.
+
+    Повторы одного значения по-прежнему видны, но при воспроизведении такие
+    адреса отвечают 404.
+    """
+    return {
+        name: value if str(value).isdigit()
+        else salted_hmac('traffic', str(value)).hexdigest()[:16]
+        for name, value in kwargs.items()
+    }
+
+
+def describe(request, response, duration):
+    """Обезличенное описание запроса: без тела, заголовков и пользователя."""
+    match = getattr(request, 'resolver_match', None)
+    return {
+        'time': time.time(),
+        'method': request.method,
+        'route': match.url_name if match else None,
+        'kwargs': anonymize(match.kwargs) if match else {},
+        'auth': 'HTTP_AUTHORIZATION' in request.META,
+        'request_size': int(request.META.get('CONTENT_LENGTH') or 0),
+        'response_size': (
+            len(response.content) if not response.streaming else None
+        ),
+        'status': response.status_code,
+        'duration_ms': round(duration * 1000, 3),
+    }
+
+
+def record(entry):
+    line = json.dumps(entry, ensure_ascii=False)
+    with _write_lock:
+        with open(settings.TRAFFIC_RECORD_PATH, 'a',
+                  encoding='utf-8') as log:
+            log.write(line + '\n')
+
+
+def read(path):
+    with open(path, encoding='utf-8') as log:
+        entries = [json.loads(line) for line in log if line.strip()]
+    return [entry for entry in entries if entry['route']]
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(results, elapsed):
+    """Сводка по маршрутам: пропускная способность, задержки и ошибки.
+
+    ``results`` — кортежи ``(route, status, duration)``, где ``status``
+    равен ``None`` для запросов, завершившихся исключением.
+    """
+    routes = defaultdict(list)
+    for route, status, duration in results:
+        routes[route].append((status, duration))
+    summary = {}
+    for route, items in sorted(routes.items()):
+        durations = [duration * 1000 for _, duration in items]
+        errors = sum(status is None or status >= 500 for status, _ in items)
+        client_errors = sum(
+            status is not None and 400 <= status < 500 for status, _ in items
+        )
+        summary[route] = {
+            'requests': len(items),
+            'rps': len(items) / elapsed if elapsed else 0,
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'p99_ms': percentile(durations, 99),
+            'error_rate': errors / len(items),
+            'client_error_rate': client_errors / len(items),
+        }
+    return summary
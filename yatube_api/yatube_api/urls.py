@@ -1,18 +1,24 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from api.media import MediaView
+from .profiling import profile_download, profile_list
 
 urlpatterns = [
+    path('admin/profiles/', admin.site.admin_view(profile_list),
+         name='profile_list'),
+    path('admin/profiles/<str:key>.<str:extension>',
+         admin.site.admin_view(profile_download), name='profile_download'),
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    re_path(r'^{}(?P<path>.+)$'.format(settings.MEDIA_URL.lstrip('/')),
+            MediaView.as_view(), name='media'),
 ]
 
 
 if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += static(
         settings.STATIC_URL, document_root=settings.STATIC_ROOT
     )